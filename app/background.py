@@ -0,0 +1,160 @@
+# background.py
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.coalesce import RunCoalescer, get_coalescer, run_key
+from app.graph import GraphConfig
+from app.service import NODE_START, RESULT, TOKEN, build_trace, stream_text_editor_agent
+from app.state import RunOptions
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = "pending", "running", "done", "failed", "cancelled"
+
+
+class BackgroundRun:
+    """
+    Runs the agent in a daemon thread and collects its event stream, so a UI can
+    poll progress without blocking its own thread (see ui/streamlit_app.py).
+    snapshot() is safe to call from any thread; the trace in it grows by one
+    block as each iteration completes. Use start_run to share identical runs.
+    """
+
+    def __init__(
+        self,
+        task: str,
+        mode: str,
+        user_text: str,
+        max_iterations: int = 3,
+        graph_config: Optional[GraphConfig] = None,
+        options: Optional[RunOptions] = None,
+        coalescer: Optional[RunCoalescer] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.inputs = {"task": task, "mode": mode, "user_text": user_text, "max_iterations": max_iterations}
+        self.graph_config = graph_config
+        self.options = options
+        self.coalescer = coalescer
+        self.followers = 0                  # other callers sharing this run (see start_run)
+        self.status = PENDING
+        self.node: Optional[str] = None
+        self.live_text = ""
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._steps: List[dict] = []
+        self._trace: List[dict] = []
+        self._trace_steps = 0
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"agent-run-{self.id[:8]}", daemon=True)
+
+    def start(self) -> "BackgroundRun":
+        self.status = RUNNING
+        self.started = time.time()
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """
+        Stops the run after the event in progress; the LLM call underway is not
+        interrupted. A shared run stops once every caller sharing it cancelled.
+        """
+        with self._lock:
+            if self.followers > 0:
+                self.followers -= 1
+                return
+        self._cancel.set()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def join(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        events = stream_text_editor_agent(
+            self.inputs["task"], self.inputs["mode"], self.inputs["user_text"], self.inputs["max_iterations"],
+            graph_config=self.graph_config, options=self.options, on_step=self._on_step,
+        )
+        status, error = DONE, None
+        try:
+            for event in events:
+                if self._cancel.is_set():
+                    status = CANCELLED
+                    break
+                self._on_event(event)
+        except Exception as e:
+            status, error = FAILED, str(e)
+        finally:
+            events.close()
+            with self._lock:
+                self.status, self.error, self.node = status, error, None
+                self.finished = time.time()
+            if self.coalescer is not None:
+                self.coalescer.finish(self)
+
+    def _on_step(self, step: dict):
+        # Every history entry, including both steps of a fused critique-and-edit
+        with self._lock:
+            self._steps.append(step)
+
+    def _on_event(self, event: Dict[str, Any]):
+        with self._lock:
+            if event["type"] == NODE_START:
+                self.node = event["node"]
+                self.live_text = ""
+            elif event["type"] == TOKEN:
+                self.live_text += event["text"]
+            elif event["type"] == RESULT:
+                self.result = event["result"]
+
+    def _current_trace_locked(self) -> List[dict]:
+        if self.result is not None:
+            return self.result["trace"]
+        if self._trace_steps != len(self._steps):
+            self._trace = build_trace(self._steps)
+            self._trace_steps = len(self._steps)
+        return self._trace
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current progress: status, running node, its streamed text so far, the
+        trace of completed iterations, and the result or error once finished.
+        """
+        with self._lock:
+            end = self.finished or time.time()
+            return {
+                "id": self.id,
+                "status": self.status,
+                "node": self.node,
+                "live_text": self.live_text,
+                "trace": list(self._current_trace_locked()),
+                "steps": len(self._steps),
+                "result": self.result,
+                "error": self.error,
+                "elapsed_s": end - self.started if self.started else 0.0,
+            }
+
+
+def start_run(
+    task: str,
+    mode: str,
+    user_text: str,
+    max_iterations: int = 3,
+    graph_config: Optional[GraphConfig] = None,
+    options: Optional[RunOptions] = None,
+    coalescer: Optional[RunCoalescer] = None,
+) -> BackgroundRun:
+    """
+    Starts a BackgroundRun, or returns the one an identical request already
+    started: still in flight, or finished within the memo ttl (see app.coalesce).
+    """
+    coalescer = coalescer or get_coalescer()
+    run, leader = coalescer.share(
+        run_key(task, mode, user_text, max_iterations, graph_config, options),
+        lambda: BackgroundRun(task, mode, user_text, max_iterations, graph_config, options, coalescer),
+    )
+    return run.start() if leader else run
@@ -0,0 +1,175 @@
+# batch.py
+import asyncio
+import json
+import os
+import time
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from app.checkpoints import get_checkpoint_store
+from app.report import JsonlReportWriter, save_report
+from app.graph import GraphConfig
+from app.service import arun_text_editor_agent
+from app.state import RunOptions
+
+
+def load_batch_tasks(path: str, task: Optional[str] = None, max_iterations: int = 3) -> List[Dict[str, Any]]:
+    """
+    Loads batch items from a JSONL manifest or a directory of .txt files.
+
+    Manifest lines: {"id", "task", "mode", "user_text" | "text_file", "max_iterations"};
+    only "task" is required. Directory mode revises every .txt file with `task`.
+    """
+    items: List[Dict[str, Any]] = []
+
+    if os.path.isdir(path):
+        if not task:
+            raise ValueError("--task is required when --batch points to a directory")
+        for name in sorted(os.listdir(path)):
+            if not name.endswith(".txt"):
+                continue
+            with open(os.path.join(path, name), 'r', encoding='utf-8') as f:
+                user_text = f.read()
+            items.append({
+                "id": os.path.splitext(name)[0],
+                "task": task,
+                "mode": "revise",
+                "user_text": user_text,
+                "max_iterations": max_iterations,
+            })
+        return items
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            user_text = entry.get("user_text", "")
+            if entry.get("text_file"):
+                with open(os.path.join(base_dir, entry["text_file"]), 'r', encoding='utf-8') as tf:
+                    user_text = tf.read()
+            items.append({
+                "id": str(entry.get("id", line_no)),
+                "task": entry.get("task") or task,
+                "mode": entry.get("mode") or ("revise" if user_text else "generate"),
+                "user_text": user_text,
+                "max_iterations": int(entry.get("max_iterations", max_iterations)),
+            })
+    return items
+
+
+def _result_path(output_dir: str, item_id: str) -> str:
+    return os.path.join(output_dir, f"{item_id}.result.json")
+
+
+def _write_json_atomic(path: str, data: Any):
+    # The result file marks a document as done, so never leave a partial one behind
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def batch_run_id(output_dir: str, item_id: str) -> str:
+    """
+    Checkpoint thread id of a batch item; tied to the output directory, like its result file.
+    """
+    return f"batch:{os.path.abspath(output_dir)}:{item_id}"
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_batch(
+    items: List[Dict[str, Any]],
+    output_dir: str,
+    concurrency: int = 4,
+    options: Optional[RunOptions] = None,
+    graph_config: Optional[GraphConfig] = None,
+    report: Optional[JsonlReportWriter] = None,
+) -> Dict[str, Any]:
+    """
+    Runs the agent for every item with at most `concurrency` runs in flight.
+    Results and reports are written as each run finishes; items whose result
+    file already exists are skipped, so an interrupted batch can be rerun.
+    With `report`, steps of all documents are appended to that JSONL report as
+    they happen (tagged with the item id) instead of per-document report files.
+    With a checkpoint store configured (see app.checkpoints), a document that
+    was interrupted mid-run resumes after its last completed node; its
+    checkpoints are deleted once the result file is written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    store = get_checkpoint_store()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    latencies: List[float] = []
+    failures: List[Dict[str, str]] = []
+    skipped = 0
+
+    async def process(item: Dict[str, Any]):
+        nonlocal skipped
+        result_path = _result_path(output_dir, item["id"])
+        if os.path.exists(result_path):
+            skipped += 1
+            return
+
+        thread_id = batch_run_id(output_dir, item["id"]) if store else None
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await arun_text_editor_agent(
+                    item["task"], item["mode"], item["user_text"], item["max_iterations"],
+                    graph_config=graph_config, options=options,
+                    on_step=partial(report.write_step, run=item["id"]) if report else None,
+                    thread_id=thread_id,
+                )
+            except Exception as e:
+                failures.append({"id": item["id"], "error": str(e)})
+                print(f"[FAIL] {item['id']}: {e}")
+                return
+            elapsed = time.perf_counter() - start
+
+        latencies.append(elapsed)
+        if report is None:
+            save_report(result["raw_history"], os.path.join(output_dir, f"{item['id']}.report.json"), quiet=True)
+        output = {key: value for key, value in result.items() if key != "raw_history"}
+        output["id"] = item["id"]
+        output["latency_s"] = round(elapsed, 3)
+        _write_json_atomic(result_path, output)
+        if thread_id:
+            await store.adelete_thread(thread_id)
+        print(f"[DONE] {item['id']} in {elapsed:.1f}s ({result['stopped_by']})")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(process(item) for item in items))
+    wall = time.perf_counter() - started
+
+    return {
+        "total": len(items),
+        "completed": len(latencies),
+        "skipped": skipped,
+        "failed": len(failures),
+        "failures": failures,
+        "wall_s": wall,
+        "docs_per_sec": len(latencies) / wall if wall > 0 else 0.0,
+        "p50_s": _percentile(latencies, 50),
+        "p95_s": _percentile(latencies, 95),
+    }
+
+
+def print_batch_summary(summary: Dict[str, Any]):
+    print("\n" + "="*40)
+    print("BATCH SUMMARY")
+    print("="*40)
+    print(f"Documents: {summary['total']} | Completed: {summary['completed']} | "
+          f"Skipped: {summary['skipped']} | Failed: {summary['failed']}")
+    print(f"Wall time: {summary['wall_s']:.1f}s | Throughput: {summary['docs_per_sec']:.2f} docs/sec")
+    print(f"Latency p50: {summary['p50_s']:.1f}s | p95: {summary['p95_s']:.1f}s")
+    for failure in summary["failures"]:
+        print(f"  - {failure['id']}: {failure['error']}")
@@ -0,0 +1,218 @@
+# cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024      # LLM_CACHE_MAX_MB
+DEFAULT_MAX_AGE = 30 * 24 * 3600.0         # LLM_CACHE_MAX_AGE_DAYS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at);
+"""
+
+
+class ResponseCache(BaseCache):
+    """
+    Content-addressed, on-disk LLM response cache backed by SQLite.
+
+    Entries are keyed by a hash of the model settings (model, temperature,
+    response_format, ...) and the serialized prompt messages. The database runs
+    in WAL mode with a busy timeout, so several processes can share one file.
+    Eviction is least-recently-used by total size, plus a maximum entry age.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: float = DEFAULT_MAX_AGE,
+        bypass: bool = False,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # Bypass skips lookups but still stores fresh responses
+        self.bypass = bypass
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "bypassed": 0}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        if self.bypass:
+            self._count("bypassed")
+            return None
+
+        key = self.make_key(prompt, llm_string)
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.max_age:
+            self._count("misses")
+            return None
+
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return _decode(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = self.make_key(prompt, llm_string)
+        value = _encode(return_val)
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, value, len(value), now, now),
+        )
+        self._count("writes")
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Drops expired entries, then least recently used ones until under max_bytes.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            removed = conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age,)
+            ).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+                removed += len(stale)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if removed:
+            self._count("evictions", removed)
+        return removed
+
+    def clear(self, **kwargs: Any) -> None:
+        self._connect().execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        row = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        stats["entries"], stats["bytes"] = row
+        return stats
+
+
+def _encode(generations: Sequence[Generation]) -> str:
+    items = []
+    for gen in generations:
+        message = getattr(gen, "message", None)
+        items.append({
+            "text": gen.text,
+            "usage_metadata": getattr(message, "usage_metadata", None),
+            "response_metadata": getattr(message, "response_metadata", {}) or {},
+        })
+    return json.dumps(items, ensure_ascii=False)
+
+
+def _decode(value: str) -> Sequence[Generation]:
+    generations = []
+    for item in json.loads(value):
+        metadata = dict(item.get("response_metadata") or {})
+        metadata["cache_hit"] = True
+        message = AIMessage(
+            content=item["text"],
+            usage_metadata=item.get("usage_metadata"),
+            response_metadata=metadata,
+        )
+        generations.append(ChatGeneration(message=message))
+    return generations
+
+
+_cache: Optional[ResponseCache] = None
+_cache_configured = False
+_cache_lock = threading.Lock()
+
+
+def configure_response_cache(
+    path: Optional[str],
+    max_bytes: Optional[int] = None,
+    max_age: Optional[float] = None,
+    bypass: bool = False,
+) -> Optional[ResponseCache]:
+    """
+    Enables the response cache at `path` for all subsequently created LLM clients.
+    Passing path=None disables caching.
+    """
+    global _cache, _cache_configured
+    with _cache_lock:
+        _cache = None
+        if path:
+            _cache = ResponseCache(
+                path,
+                max_bytes=max_bytes if max_bytes is not None else DEFAULT_MAX_BYTES,
+                max_age=max_age if max_age is not None else DEFAULT_MAX_AGE,
+                bypass=bypass,
+            )
+        _cache_configured = True
+        return _cache
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Returns the configured cache. Unless configure_response_cache was called,
+    the cache is opt-in via LLM_CACHE_PATH (plus LLM_CACHE_MAX_MB,
+    LLM_CACHE_MAX_AGE_DAYS and LLM_CACHE_BYPASS).
+    """
+    if not _cache_configured:
+        max_mb = os.getenv("LLM_CACHE_MAX_MB")
+        max_days = os.getenv("LLM_CACHE_MAX_AGE_DAYS")
+        configure_response_cache(
+            os.getenv("LLM_CACHE_PATH"),
+            max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else None,
+            max_age=float(max_days) * 24 * 3600 if max_days else None,
+            bypass=os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes"),
+        )
+    return _cache
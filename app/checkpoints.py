@@ -0,0 +1,173 @@
+# checkpoints.py
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+# Runs are checkpointed after every node, so one that dies (or whose LLM call
+# times out) at iteration 3 resumes there instead of starting over. Only the
+# latest checkpoints of a run are needed to resume it; older ones are dropped
+# as new ones are written, and runs idle for longer than max_age are removed.
+DEFAULT_KEEP_LAST = 1                   # CHECKPOINT_KEEP_LAST
+DEFAULT_MAX_AGE = 7 * 24 * 3600.0       # CHECKPOINT_MAX_AGE_DAYS
+
+_RUNS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_updated ON runs(updated_at);
+"""
+
+
+class CheckpointStore(SqliteSaver):
+    """
+    Durable LangGraph checkpointer in a local SQLite file, keyed by run (thread) id.
+
+    Extends SqliteSaver with compaction (keep_last checkpoints per run), age-based
+    garbage collection and async methods, so the same store serves invoke and
+    ainvoke. Like the response cache, the database runs in WAL mode with a busy
+    timeout, so several processes can share one file.
+    """
+
+    def __init__(self, path: str, keep_last: int = DEFAULT_KEEP_LAST, max_age: float = DEFAULT_MAX_AGE):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        # Lets gc() return freed pages to the file system; only applies to new files
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_RUNS_SCHEMA)
+        super().__init__(conn)
+        self.path = path
+        self.keep_last = max(1, keep_last)
+        self.max_age = max_age
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT OR REPLACE INTO runs (thread_id, updated_at) VALUES (?, ?)", (thread_id, time.time())
+            )
+            self._compact(cur, thread_id, checkpoint_ns)
+        return saved
+
+    def _compact(self, cur: sqlite3.Cursor, thread_id: str, checkpoint_ns: str):
+        # Checkpoint ids are time-ordered, as SqliteSaver itself relies on
+        cur.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last - 1),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return
+        oldest_kept = row[0]
+        cur.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (thread_id, checkpoint_ns, oldest_kept),
+        )
+        cur.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (thread_id, checkpoint_ns, oldest_kept),
+        )
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM runs WHERE thread_id = ?", (str(thread_id),))
+
+    def gc(self, max_age: Optional[float] = None) -> int:
+        """
+        Deletes runs not updated for `max_age` seconds (default: the store's
+        max_age), finished or not. Returns the number of runs removed.
+        """
+        cutoff = time.time() - (self.max_age if max_age is None else max_age)
+        with self.cursor() as cur:
+            cur.execute("SELECT thread_id FROM runs WHERE updated_at < ?", (cutoff,))
+            stale = [row[0] for row in cur.fetchall()]
+        for thread_id in stale:
+            self.delete_thread(thread_id)
+        if stale:
+            with self.cursor(transaction=False) as cur:
+                cur.execute("PRAGMA incremental_vacuum")
+        return len(stale)
+
+    def stats(self) -> Dict[str, int]:
+        with self.cursor(transaction=False) as cur:
+            runs = cur.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            checkpoints = cur.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+            writes = cur.execute("SELECT COUNT(*) FROM writes").fetchone()[0]
+        return {"runs": runs, "checkpoints": checkpoints, "writes": writes}
+
+    # SqliteSaver is sync-only; its methods are guarded by a lock, so the async
+    # graph API runs them in worker threads.
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None) -> AsyncIterator[Any]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+_store: Optional[CheckpointStore] = None
+_store_configured = False
+_store_lock = threading.Lock()
+
+
+def configure_checkpoints(
+    path: Optional[str],
+    keep_last: Optional[int] = None,
+    max_age: Optional[float] = None,
+) -> Optional[CheckpointStore]:
+    """
+    Enables checkpointing of runs that are given a run id to the SQLite file at
+    `path`, and removes expired runs from it. Passing path=None disables it.
+    """
+    global _store, _store_configured
+    with _store_lock:
+        _store = None
+        if path:
+            _store = CheckpointStore(
+                path,
+                keep_last=keep_last if keep_last is not None else DEFAULT_KEEP_LAST,
+                max_age=max_age if max_age is not None else DEFAULT_MAX_AGE,
+            )
+            _store.gc()
+        _store_configured = True
+        return _store
+
+
+def get_checkpoint_store() -> Optional[CheckpointStore]:
+    """
+    Returns the configured store. Unless configure_checkpoints was called,
+    checkpointing is opt-in via CHECKPOINT_PATH (plus CHECKPOINT_KEEP_LAST and
+    CHECKPOINT_MAX_AGE_DAYS).
+    """
+    if not _store_configured:
+        keep_last = os.getenv("CHECKPOINT_KEEP_LAST")
+        max_days = os.getenv("CHECKPOINT_MAX_AGE_DAYS")
+        configure_checkpoints(
+            os.getenv("CHECKPOINT_PATH"),
+            keep_last=int(keep_last) if keep_last else None,
+            max_age=float(max_days) * 24 * 3600 if max_days else None,
+        )
+    return _store
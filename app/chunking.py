@@ -0,0 +1,191 @@
+# chunking.py
+import asyncio
+import json
+import re
+from dataclasses import replace
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from app.llm import get_llm
+from app.metrics import ainvoke_llm, run_metrics
+from app.prompts import CHUNK_TASK_SUFFIX, STITCH_SYSTEM_PROMPT
+from app.rules import count_words
+from app.graph import GraphConfig
+from app.history import RunResult
+from app.service import arun_text_editor_agent
+from app.state import RunOptions
+
+DEFAULT_CHUNK_CHARS = 4000
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_HEADING = re.compile(r"^#{1,6}\s")  # Markdown section heading
+
+
+def _paragraphs(text: str) -> List[str]:
+    return [p.strip() for p in _PARAGRAPH_BREAK.split(text) if p.strip()]
+
+
+def split_text(text: str, max_chars: int = DEFAULT_CHUNK_CHARS) -> List[str]:
+    """
+    Splits text into chunks of at most `max_chars` at paragraph boundaries.
+    A heading always starts a new chunk when the current one is already half full,
+    so sections stay together where possible. A single paragraph longer than
+    `max_chars` becomes its own chunk.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+
+    for paragraph in _paragraphs(text):
+        starts_section = bool(_HEADING.match(paragraph))
+        too_big = size + len(paragraph) > max_chars
+        if current and (too_big or (starts_section and size >= max_chars // 2)):
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph) + 2
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+async def _stitch_seam(end: str, start: str, calls: list) -> Optional[Dict[str, str]]:
+    llm = get_llm(json_mode=True, node="stitch")
+    messages = [
+        SystemMessage(content=STITCH_SYSTEM_PROMPT),
+        HumanMessage(content=f"Last paragraph of part A:\n{end}\n\nFirst paragraph of part B:\n{start}")
+    ]
+    response = await ainvoke_llm(llm, messages, calls)
+    try:
+        data = json.loads(response.content)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("end"), str) or not isinstance(data.get("start"), str):
+        return None
+    return {"end": data["end"].strip(), "start": data["start"].strip()}
+
+
+async def stitch_chunks(parts: List[str]) -> Dict[str, Any]:
+    """
+    Smooths the transitions between revised parts. Only the paragraphs adjacent
+    to each seam are sent to the LLM, and all seams are processed concurrently.
+    A seam whose call fails is left as the parts wrote it and listed under
+    "failed_seams".
+    """
+    paragraphs = [_paragraphs(part) or [""] for part in parts]
+    seams = list(range(len(parts) - 1))
+    calls: List[dict] = []
+    failed: List[Dict[str, Any]] = []
+
+    async def stitch(i: int) -> Optional[Dict[str, str]]:
+        try:
+            return await _stitch_seam(paragraphs[i][-1], paragraphs[i + 1][0], calls)
+        except Exception as e:
+            # The revised parts are already paid for; one seam must not discard them
+            failed.append({"seam": i, "error": str(e)})
+            return None
+
+    results = await asyncio.gather(*(stitch(i) for i in seams))
+
+    changed = []
+    touched = set()
+    for i, result in zip(seams, results):
+        end_key, start_key = (i, len(paragraphs[i]) - 1), (i + 1, 0)
+        # A one-paragraph part sits on two seams; keep the first edit only
+        if result is None or end_key in touched or start_key in touched:
+            continue
+        paragraphs[i][-1] = result["end"]
+        paragraphs[i + 1][0] = result["start"]
+        touched.update((end_key, start_key))
+        changed.append(i)
+
+    return {
+        "text": "\n\n".join("\n\n".join(p) for p in paragraphs),
+        "seams": len(seams),
+        "changed_seams": changed,
+        "failed_seams": sorted(failed, key=lambda f: f["seam"]),
+        "calls": calls,
+    }
+
+
+async def arun_long_document(
+    task: str,
+    user_text: str,
+    max_iterations: int = 3,
+    chunk_chars: int = DEFAULT_CHUNK_CHARS,
+    concurrency: int = 8,
+    options: Optional[RunOptions] = None,
+    graph_config: Optional[GraphConfig] = None,
+) -> Dict[str, Any]:
+    """
+    Revises a long document chunk by chunk. Every chunk runs its own
+    Writer -> Critic -> Editor loop in parallel and stops independently; the
+    revised chunks are stitched at their seams and reassembled in order.
+
+    Returns the run_text_editor_agent result structure, with trace blocks and
+    history steps tagged by "chunk", plus a per-chunk summary under "chunks".
+    "stopped_by" is "passed" when every chunk passed, the reason of the chunks
+    that did not when they share one, and "mixed" otherwise.
+    """
+    chunks = split_text(user_text, chunk_chars)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    # A length target in the task is for the whole document; each chunk is held to its share
+    total_words = sum(count_words(chunk) for chunk in chunks) or 1
+
+    async def revise(index: int, chunk: str) -> Dict[str, Any]:
+        chunk_task = task + CHUNK_TASK_SUFFIX.format(index=index + 1, total=len(chunks))
+        chunk_options = replace(options or RunOptions(), length_share=count_words(chunk) / total_words)
+        async with semaphore:
+            return await arun_text_editor_agent(
+                chunk_task, "revise", chunk, max_iterations, graph_config=graph_config, options=chunk_options
+            )
+
+    results = await asyncio.gather(*(revise(i, chunk) for i, chunk in enumerate(chunks)))
+
+    if len(results) > 1:
+        stitched = await stitch_chunks([r["final_text"] for r in results])
+    else:
+        stitched = {"text": results[0]["final_text"] if results else "", "seams": 0, "changed_seams": [], "failed_seams": []}
+
+    raw_history: List[dict] = []
+    for index, result in enumerate(results):
+        raw_history.extend({**step, "chunk": index} for step in result["raw_history"])
+    raw_history.append({
+        "step": "stitch",
+        "seams": stitched["seams"],
+        "changed_seams": stitched["changed_seams"],
+        "failed_seams": stitched["failed_seams"],
+        "calls": stitched.get("calls", []),
+    })
+
+    reasons = {r["stopped_by"] for r in results} - {"passed"}
+    return RunResult({
+        "final_text": stitched["text"],
+        "iterations": max((r["iterations"] for r in results), default=0),
+        "stopped_by": reasons.pop() if len(reasons) == 1 else "mixed" if reasons else "passed",
+        "raw_history": raw_history,
+        "metrics": run_metrics(raw_history),
+        "chunks": [
+            {"chunk": i, "chars": len(chunks[i]), "iterations": r["iterations"], "stopped_by": r["stopped_by"]}
+            for i, r in enumerate(results)
+        ],
+    })
+
+
+def run_long_document(
+    task: str,
+    user_text: str,
+    max_iterations: int = 3,
+    chunk_chars: int = DEFAULT_CHUNK_CHARS,
+    concurrency: int = 8,
+    options: Optional[RunOptions] = None,
+    graph_config: Optional[GraphConfig] = None,
+) -> Dict[str, Any]:
+    """
+    Sync wrapper around arun_long_document.
+    """
+    return asyncio.run(arun_long_document(
+        task, user_text, max_iterations, chunk_chars, concurrency, options, graph_config
+    ))
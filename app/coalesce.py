@@ -0,0 +1,293 @@
+# coalesce.py
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.graph import GraphConfig
+from app.service import arun_text_editor_agent, run_text_editor_agent
+from app.state import RunOptions
+from app.stopping import llm_calls
+
+# Identical requests (same inputs and settings) share one execution while it is
+# in flight, and its result is remembered for a short time afterwards.
+DEFAULT_MEMO_TTL = 30.0         # RUN_MEMO_TTL: seconds a finished result is reused; 0 disables the memo
+DEFAULT_MEMO_ENTRIES = 256      # RUN_MEMO_MAX_ENTRIES
+
+# Final statuses of a shared run handle (app.server.Job, app.background.BackgroundRun)
+DONE, FAILED, CANCELLED = "done", "failed", "cancelled"
+
+
+def run_key(
+    task: str,
+    mode: str,
+    user_text: str,
+    max_iterations: int = 3,
+    graph_config: Optional[GraphConfig] = None,
+    options: Optional[RunOptions] = None,
+) -> str:
+    """
+    Hash of everything that determines a run's result.
+    """
+    payload = {
+        "task": task,
+        "mode": mode,
+        "user_text": user_text or "",
+        "max_iterations": max_iterations,
+        "graph": asdict(graph_config or GraphConfig()),
+        "options": asdict(options or RunOptions()),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def saved_llm_calls(result: Dict[str, Any]) -> int:
+    """
+    LLM calls a reused result would have cost to produce again.
+    """
+    metrics = result.get("metrics")
+    if metrics:
+        return metrics["llm_calls"]
+    return llm_calls(result.get("raw_history", []))
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+class _AsyncFlight:
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+
+
+class RunCoalescer:
+    """
+    Single-flight plus a TTL memo around run_text_editor_agent and its async
+    variant. Callers get independent copies of the shared result; errors are
+    passed to every waiter but never memoized.
+
+    Callers that follow a run's progress (the HTTP jobs of app.server, the UI
+    runs of app.background) share the run's handle instead, through share():
+    a handle has `status`, `finished` (time.time()), `result` and `followers`.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_MEMO_TTL, max_entries: int = DEFAULT_MEMO_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._memo: "OrderedDict[str, tuple]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[tuple, _AsyncFlight] = {}
+        self._handles: "OrderedDict[str, Any]" = OrderedDict()
+        self._stats = {"executions": 0, "coalesced": 0, "memo_hits": 0, "llm_calls_saved": 0}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "memo_entries": len(self._memo), "shared_runs": len(self._handles)}
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
+            self._handles.clear()
+
+    def share(self, key: str, create: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Returns (handle, leader). The handle is that of an identical run still
+        in flight (it gains a follower) or finished successfully within the
+        ttl; otherwise create() makes a new one, which the caller then starts.
+        create() runs under the lock and may raise to refuse the run.
+        """
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None and (handle.status in (FAILED, CANCELLED) or (
+                    handle.status == DONE and time.time() - handle.finished > self.ttl)):
+                del self._handles[key]
+                handle = None
+            if handle is not None:
+                if handle.status == DONE:
+                    self._stats["memo_hits"] += 1
+                    self._stats["llm_calls_saved"] += saved_llm_calls(handle.result)
+                else:
+                    # Counted as saved once the shared run finishes (see finish)
+                    self._stats["coalesced"] += 1
+                    handle.followers += 1
+                self._handles.move_to_end(key)
+                return handle, False
+
+            handle = create()
+            self._handles[key] = handle
+            self._stats["executions"] += 1
+            finished = [k for k, h in self._handles.items() if h.status in (DONE, FAILED, CANCELLED)]
+            for old in finished[:max(0, len(self._handles) - self.max_entries)]:
+                del self._handles[old]
+            return handle, True
+
+    def finish(self, handle):
+        """
+        Called when a shared run ends: counts the calls its followers saved.
+        """
+        if handle.status == DONE:
+            with self._lock:
+                self._stats["llm_calls_saved"] += handle.followers * saved_llm_calls(handle.result)
+
+    def _memo_get_locked(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memo.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._memo[key]
+            return None
+        self._memo.move_to_end(key)
+        return result
+
+    def _remember_locked(self, key: str, result: Dict[str, Any]):
+        if self.ttl <= 0:
+            return
+        self._memo[key] = (time.monotonic(), result)
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.max_entries:
+            self._memo.popitem(last=False)
+
+    def _reused_locked(self, counter: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        self._stats[counter] += 1
+        self._stats["llm_calls_saved"] += saved_llm_calls(result)
+        return copy.deepcopy(result)
+
+    def run(
+        self,
+        task: str,
+        mode: str,
+        user_text: str,
+        max_iterations: int = 3,
+        graph_config: Optional[GraphConfig] = None,
+        options: Optional[RunOptions] = None,
+    ) -> Dict[str, Any]:
+        """
+        Same as run_text_editor_agent, but identical concurrent calls (from any
+        thread) share one execution.
+        """
+        key = run_key(task, mode, user_text, max_iterations, graph_config, options)
+        with self._lock:
+            cached = self._memo_get_locked(key)
+            if cached is not None:
+                return self._reused_locked("memo_hits", cached)
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats["executions"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                return self._reused_locked("coalesced", flight.result)
+
+        try:
+            flight.result = run_text_editor_agent(
+                task, mode, user_text, max_iterations, graph_config=graph_config, options=options
+            )
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None:
+                    self._remember_locked(key, flight.result)
+            flight.done.set()
+        return copy.deepcopy(flight.result)
+
+    async def arun(
+        self,
+        task: str,
+        mode: str,
+        user_text: str,
+        max_iterations: int = 3,
+        graph_config: Optional[GraphConfig] = None,
+        options: Optional[RunOptions] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async variant of run: identical concurrent calls on the same event loop
+        share one execution; the memo is shared with sync callers. A cancelled
+        caller only stops waiting; the execution is cancelled once every
+        caller sharing it is.
+        """
+        key = run_key(task, mode, user_text, max_iterations, graph_config, options)
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            cached = self._memo_get_locked(key)
+            if cached is not None:
+                return self._reused_locked("memo_hits", cached)
+            flight = self._async_flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._async_flights[flight_key] = _AsyncFlight()
+                # The execution is its own task, so cancelling the caller that
+                # started it does not fail the callers that joined it
+                flight.task = loop.create_task(self._aexecute(
+                    flight, flight_key, task, mode, user_text, max_iterations, graph_config, options
+                ))
+                self._stats["executions"] += 1
+            flight.waiters += 1
+
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0
+                if abandoned and self._async_flights.get(flight_key) is flight:
+                    # Later identical calls start afresh instead of joining a cancelled run
+                    del self._async_flights[flight_key]
+            if abandoned:
+                flight.task.cancel()
+            raise
+        if leader:
+            return copy.deepcopy(result)
+        with self._lock:
+            return self._reused_locked("coalesced", result)
+
+    async def _aexecute(self, flight: _AsyncFlight, flight_key: tuple, task, mode, user_text, max_iterations,
+                        graph_config, options) -> Dict[str, Any]:
+        try:
+            result = await arun_text_editor_agent(
+                task, mode, user_text, max_iterations, graph_config=graph_config, options=options
+            )
+        finally:
+            with self._lock:
+                if self._async_flights.get(flight_key) is flight:
+                    del self._async_flights[flight_key]
+        with self._lock:
+            self._remember_locked(flight_key[1], result)
+        return result
+
+
+_default: Optional[RunCoalescer] = None
+_default_lock = threading.Lock()
+
+
+def get_coalescer() -> RunCoalescer:
+    """
+    Process-wide coalescer configured from RUN_MEMO_TTL and RUN_MEMO_MAX_ENTRIES.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RunCoalescer(
+                ttl=float(os.getenv("RUN_MEMO_TTL", DEFAULT_MEMO_TTL)),
+                max_entries=int(os.getenv("RUN_MEMO_MAX_ENTRIES", DEFAULT_MEMO_ENTRIES)),
+            )
+        return _default
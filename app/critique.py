@@ -0,0 +1,175 @@
+# critique.py
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.rubric import ValidationResult
+
+# Critic replies are decoded with orjson when it is installed (several times
+# faster on long reviews), else with the standard library.
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# A reply that is not a valid critique even after local repairs is requested
+# again with a short fix instruction (see app.nodes), at most this many times.
+DEFAULT_PARSE_RETRIES = 1   # CRITIQUE_PARSE_RETRIES
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class CritiqueParseError(ValueError):
+    """
+    Raised when a critic reply is not a valid critique; the message is short
+    enough to be sent back to the model.
+    """
+
+
+def parse_retries() -> int:
+    return int(os.getenv("CRITIQUE_PARSE_RETRIES", DEFAULT_PARSE_RETRIES))
+
+
+def _strip_fence(text: str) -> str:
+    start = text.find("```")
+    body = text[start + 3:]
+    # Drop the language tag line (```json)
+    newline = body.find("\n")
+    if newline != -1 and not body[:newline].strip().startswith("{"):
+        body = body[newline + 1:]
+    end = body.find("```")
+    return body if end == -1 else body[:end]
+
+
+def _scan(text: str):
+    """
+    Walks the JSON object at the start of `text`. Returns (end, stack,
+    in_string, safe): the index just past the object (None if it is cut off),
+    the brackets still open at the end of the text, whether it ends inside a
+    string, and the last (index, stack) at which the text can be closed to a
+    valid object, dropping a partial element.
+    """
+    stack: List[str] = []
+    in_string = escaped = False
+    safe = (0, ())
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+            safe = (i + 1, tuple(stack))
+        elif char in "}]" and stack:
+            stack.pop()
+            if not stack:
+                return i + 1, [], False, safe
+            safe = (i + 1, tuple(stack))
+        elif char == ",":
+            safe = (i, tuple(stack))
+    return None, stack, in_string, safe
+
+
+def _close(text: str, stack) -> str:
+    return text + "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def repair_json(text: str) -> Tuple[List[str], List[str]]:
+    """
+    Local fixes for the ways models break JSON output: a code fence around it,
+    prose before or after it, and a reply cut off by the token limit (open
+    arrays and objects are closed, a partial element such as a cut-off string
+    is dropped).
+    Returns (candidate texts to try in order, repairs applied).
+    """
+    repairs = []
+    if "```" in text:
+        text = _strip_fence(text)
+        repairs.append("code_fence")
+    start = text.find("{")
+    if start == -1:
+        return [], repairs
+    if text[:start].strip():
+        repairs.append("leading_text")
+    text = text[start:]
+
+    end, stack, in_string, safe = _scan(text)
+    if end is not None:
+        if text[end:].strip():
+            repairs.append("trailing_text")
+        return [text[:end]], repairs
+
+    repairs.append("truncated")
+    candidates = []
+    # Keep the last value if closing its brackets makes it valid; a string cut
+    # off mid-way ("No th") is a partial element ...
+    tail = text.rstrip()
+    if tail and tail[-1] not in ",:" and not in_string:
+        candidates.append(_close(tail, stack))
+    # ... else cut back to the last complete element
+    index, safe_stack = safe
+    candidates.append(_close(text[:index].rstrip().rstrip(","), safe_stack))
+    return candidates, repairs
+
+
+def decode_object(text: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Decodes a JSON object reply, repairing it locally if needed.
+    Returns (object, repairs applied); raises CritiqueParseError.
+    """
+    try:
+        data, repairs = _loads(text), []
+    except ValueError:
+        data = None
+        candidates, repairs = repair_json(text or "")
+        for candidate in candidates:
+            try:
+                data = _loads(candidate)
+                break
+            except ValueError:
+                continue
+        if data is None:
+            raise CritiqueParseError("the reply is not valid JSON") from None
+    if not isinstance(data, dict):
+        raise CritiqueParseError("the reply must be a JSON object")
+    return data, repairs
+
+
+def validate_critique(data: Dict[str, Any], base: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Validates a decoded critique against ValidationResult and returns it as a
+    dict. Keys missing from `data` are taken from `base` (the previous
+    evaluation, in incremental critic mode).
+    """
+    try:
+        critique = ValidationResult.model_validate({**(base or {}), **data})
+    except ValidationError as e:
+        problems = [f"'{'.'.join(str(p) for p in err['loc'])}': {err['msg']}" for err in e.errors()[:3]]
+        raise CritiqueParseError("invalid critique: " + "; ".join(problems)) from None
+    return critique.model_dump()
+
+
+def parse_critique(text: str, base: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Decodes and validates a critic reply. Returns (critique, repairs applied).
+    """
+    data, repairs = decode_object(text)
+    return validate_critique(data, base), repairs
+
+
+def new_parse_stats() -> Dict[str, int]:
+    """
+    Per-step counters of critique parsing, summed by app.metrics.run_metrics:
+    reviews parsed, how many needed local repairs or a retry call, and how
+    many could not be parsed at all.
+    """
+    return {"reviews": 0, "repaired": 0, "retries": 0, "failures": 0}
@@ -0,0 +1,298 @@
+# daemon.py
+"""
+Resident worker for the CLI. Keeps the service layer imported, the graphs
+compiled and the pooled LLM clients (with their open HTTPS connections) warm
+in one process, and runs jobs sent over a Unix domain socket, so a
+`python -m app.main` call costs a round trip instead of a cold start.
+
+    python -m app.daemon [--socket PATH] [--workers 4] [--max-queue 100]
+
+app.main connects to the daemon when its socket accepts connections and runs
+in-process otherwise (or with --no-daemon). Runs go through the JobManager of
+app.server, so queueing and coalescing of identical runs work the same way.
+The daemon uses its own environment: API keys, LLM_CACHE_PATH and
+CHECKPOINT_PATH are read when it starts. The CLI sends a fingerprint of the
+settings that change a run (RUN_ENV: endpoint, key, models, retries, stores),
+and the daemon declines runs whose settings differ from its own.
+
+Protocol: one connection per run, newline-delimited JSON. The client sends
+one request, the app.server POST /jobs body plus "stream" (send every
+service event, not only the result). The daemon answers with service events
+ending in {"type": "result"} or {"type": "error"}, or with a single
+{"type": "rejected"} when it cannot take the run; the CLI then runs it
+in-process.
+
+Only the standard library is imported at module level: the client half runs
+in the CLI before anything heavy is loaded (see tests/test_cli_startup.py).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+from typing import Any, Dict, Iterator, Optional
+
+# Add project root to sys path to allow running as module
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUE = 100
+CONNECT_TIMEOUT = 0.5       # seconds; a live daemon accepts at once
+
+REJECTED, ERROR, RESULT = "rejected", "error", "result"
+
+# Environment read while a run executes; besides these, every OPENAI_MODEL_<NODE>
+RUN_ENV = (
+    "OPENAI_API_KEY", "OPENAI_BASE_URL", "OPENAI_MODEL", "CRITIC_ESCALATION_THRESHOLD",
+    "CRITIC_ESCALATION_BAND", "CRITIQUE_PARSE_RETRIES", "LLM_MAX_RETRIES", "LLM_CACHE_PATH", "CHECKPOINT_PATH",
+)
+
+
+class DaemonRejected(Exception):
+    """
+    Raised by daemon_events when the daemon declines a run (queue full, or
+    inputs it cannot serve, such as a run id without a checkpoint store).
+    """
+
+
+def default_socket_path() -> str:
+    """
+    AGENT_DAEMON_SOCKET, or a per-user socket in the temp directory.
+    """
+    return os.getenv("AGENT_DAEMON_SOCKET") or os.path.join(
+        tempfile.gettempdir(), f"text-editor-agent-{os.getuid()}.sock"
+    )
+
+
+def env_fingerprint() -> Dict[str, str]:
+    """
+    {name: short hash of the value} of the RUN_ENV settings in effect for a run
+    started in this process, .env values included as app.llm loads them.
+    Values are hashed, so the key never leaves the process.
+    """
+    from dotenv import dotenv_values, find_dotenv
+
+    values = {name: value for name, value in dotenv_values(find_dotenv()).items() if value is not None}
+    # The environment wins over .env, as with load_dotenv
+    values.update(os.environ)
+    return {
+        name: hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+        for name, value in sorted(values.items())
+        if name in RUN_ENV or name.startswith("OPENAI_MODEL_")
+    }
+
+
+def connect(path: Optional[str] = None, timeout: float = CONNECT_TIMEOUT) -> Optional[socket.socket]:
+    """
+    Returns a connection to the daemon, or None when none is listening on `path`.
+    """
+    path = path or default_socket_path()
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+
+def daemon_events(sock: socket.socket, request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Sends one run request over `sock` and yields the daemon's events; the
+    last one is the result. Raises DaemonRejected before any event if the
+    daemon declines the run, and RuntimeError if the run fails.
+    """
+    with sock, sock.makefile("rb") as reader:
+        sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+        for line in reader:
+            event = json.loads(line)
+            if event["type"] == REJECTED:
+                raise DaemonRejected(event["error"])
+            if event["type"] == ERROR:
+                raise RuntimeError(event["error"])
+            yield event
+            if event["type"] == RESULT:
+                return
+    raise ConnectionError("daemon closed the connection before the run finished")
+
+
+class DaemonHandler:
+    """
+    Serves one run per connection from a JobManager (see app.server). Runs
+    whose "env" fingerprint differs from `env` are declined.
+    """
+
+    def __init__(self, manager, env: Optional[Dict[str, str]] = None):
+        self.manager = manager
+        self.env = env if env is not None else env_fingerprint()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        from app.server import QueueFull, parse_job_request
+
+        try:
+            try:
+                body = json.loads(await reader.readline() or b"{}")
+                stream = bool(body.pop("stream", False)) if isinstance(body, dict) else False
+                env = body.pop("env", None) if isinstance(body, dict) else None
+                if env != self.env:
+                    differ = sorted(set(env or {}) ^ set(self.env) | {
+                        name for name in set(env or {}) & set(self.env) if env[name] != self.env[name]
+                    })
+                    raise ValueError(f"the daemon runs with different settings: {', '.join(differ) or 'env missing'}")
+                job = self.manager.submit(parse_job_request(body))
+            except (ValueError, TypeError, QueueFull) as e:
+                self._send(writer, {"type": REJECTED, "error": str(e)})
+                return
+            await self._relay(job, writer, stream)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _relay(self, job, writer: asyncio.StreamWriter, stream: bool):
+        from app.server import CANCELLED, DONE, FINISHED
+
+        sent = 0
+        try:
+            while True:
+                changed = job.changed
+                if stream:
+                    for event in job.events[sent:]:
+                        if event["type"] != "status":
+                            self._send(writer, event)
+                sent = len(job.events)
+                await writer.drain()
+                if job.status in FINISHED:
+                    break
+                await changed.wait()
+        except ConnectionError:
+            # The CLI went away (e.g. Ctrl+C); the run stops unless another caller shares it
+            self.manager.cancel(job)
+            raise
+        if job.status == DONE:
+            self._send(writer, {"type": RESULT, "result": job.result})
+        else:
+            self._send(writer, {"type": ERROR, "error": "run cancelled" if job.status == CANCELLED else job.error})
+
+    @staticmethod
+    def _send(writer: asyncio.StreamWriter, event: Dict[str, Any]):
+        writer.write(json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+def _claim_socket(path: str):
+    """
+    Removes a socket file left behind by a daemon that died; refuses to
+    replace one that still accepts connections.
+    """
+    live = connect(path)
+    if live is not None:
+        live.close()
+        raise RuntimeError(f"a daemon is already listening on {path}")
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+def _bind_private(path: str) -> socket.socket:
+    """
+    Binds a Unix socket that only the current user can connect to: runs use
+    the daemon owner's API keys. The umask applies at creation, so the socket
+    is never reachable with wider permissions, unlike a chmod after bind.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    previous = os.umask(0o177)
+    try:
+        sock.bind(path)
+    except OSError:
+        sock.close()
+        raise
+    finally:
+        os.umask(previous)
+    return sock
+
+
+def warm_up():
+    """
+    Compiles the default graphs and creates the LLM clients of every node,
+    so the first run does not pay for it.
+    """
+    from app.checkpoints import get_checkpoint_store
+    from app.graph import precompile_graphs
+    from app.llm import ROUTED_NODES, get_llm
+
+    precompile_graphs()
+    store = get_checkpoint_store()
+    if store is not None:
+        precompile_graphs(checkpointer=store)
+    try:
+        for node in ROUTED_NODES:
+            get_llm(json_mode=node == "critic", node=node)
+    except ValueError:
+        # No API key: runs fail with the same error the CLI would print
+        pass
+
+
+async def serve(path: Optional[str] = None, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE,
+                ready: Optional[asyncio.Future] = None):
+    """
+    Runs the daemon until cancelled. `ready`, if given, receives the socket path.
+    """
+    from app.server import MAX_BODY_BYTES, JobManager
+
+    path = path or default_socket_path()
+    _claim_socket(path)
+    warm_up()
+    manager = JobManager(workers, max_queue)
+    manager.start()
+    # One line carries the whole request, user text included
+    server = await asyncio.start_unix_server(DaemonHandler(manager).handle, sock=_bind_private(path),
+                                             limit=MAX_BODY_BYTES)
+    if ready is not None:
+        ready.set_result(path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await manager.stop()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI Text Editor Agent warm worker for the CLI")
+    parser.add_argument("--socket", type=str, help="Unix socket to listen on (default: AGENT_DAEMON_SOCKET or a per-user temp file)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Runs executed concurrently")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="Queued runs before new ones are declined")
+    args = parser.parse_args()
+
+    path = args.socket or default_socket_path()
+
+    async def run():
+        # Shut down cleanly (socket file removed) on SIGTERM as well as Ctrl+C
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        await serve(path, args.workers, args.max_queue)
+
+    print(f"[START] Daemon listening on {path} ({args.workers} workers, queue {args.max_queue})")
+    try:
+        asyncio.run(run())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,118 @@
-# graph.py
+import threading
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
+from app.metrics import atimed_node, timed_node
 from app.state import AgentState
-from app.nodes import writer_node, critic_node, editor_node
+from app.stopping import FUSED_ITERATION_CALLS, ITERATION_CALLS, StopPolicy, stop_reason
+from app.nodes import (
+    writer_node, critic_node, editor_node, critique_edit_node,
+    awriter_node, acritic_node, aeditor_node, acritique_edit_node,
+)
+
+
+@dataclass(frozen=True)
+class GraphConfig:
+    """
+    Options that change the compiled graph. Instances are hashable and key the
+    compiled-graph registry, so every distinct configuration is compiled once.
+    """
+    stop_policy: StopPolicy = StopPolicy()  # When the Critic -> Editor loop ends
+    fused: bool = False                     # One "critique_edit" node reviews and revises in a single call
+
+    @property
+    def iteration_calls(self) -> int:
+        """
+        LLM calls one more Critic -> Editor iteration costs (see stop_reason).
+        """
+        return FUSED_ITERATION_CALLS if self.fused else ITERATION_CALLS
+
 
-def verify_cycle(state: AgentState) -> str:
+def verify_cycle(state: AgentState, policy: Optional[StopPolicy] = None) -> str:
     """
     Determines the next step after Critic.
     Ensures at least 1 cycle of editing happens, even if passed initially.
+    The rules themselves (max iterations, pass, score target, plateau, call
+    budget) live in app.stopping.stop_reason, which the service also uses to
+    report why the run stopped.
     """
-    iteration = state["iteration"]
-    max_iter = state.get("max_iterations", 3)
-    passed = state.get("quality_passed", False)
-    
-    # Logic:
-    # 1. If we reached max limits -> END
-    if iteration >= max_iter:
-        return END
-    
-    # 2. Key requirement: "Minimum one cycle".
-    # This means if iteration is 0 (Writer -> Critic happened, but Editor hasn't run),
-    # we MUST go to Editor regardless of 'passed'.
-    if iteration == 0:
-        return "editor"
-        
-    # 3. If passed is True -> END
-    if passed:
+    if stop_reason(state, policy) is not None:
         return END
-        
-    # 4. Otherwise -> Editor
     return "editor"
 
 
-def build_graph():
+def after_editor(state: AgentState, policy: Optional[StopPolicy] = None) -> str:
+    """
+    Determines the next step after Editor: usually a review, unless this was the
+    last allowed edit and the policy skips the terminal critique.
+    """
+    policy = policy or StopPolicy()
+    if policy.skip_terminal_critique and state["iteration"] >= state.get("max_iterations", 3):
+        return END
+    return "critic"
+
+
+def _node(name: str, func, afunc):
+    """
+    Wraps a node so `invoke` runs the sync function and `ainvoke` the async one.
+    Both are timed, so every history step records its wall and queue time.
+    """
+    return RunnableLambda(timed_node(func), afunc=atimed_node(afunc), name=name)
+
+
+def after_critique_edit(state: AgentState, policy: Optional[StopPolicy] = None) -> str:
+    """
+    Determines the next step after the fused node: it ends the run by recording
+    only a review, otherwise it has produced a new draft to review again.
+    """
+    policy = policy or StopPolicy()
+    if state["history"][-1].get("step") == "critic":
+        return END
+    if policy.skip_terminal_critique and state["iteration"] >= state.get("max_iterations", 3):
+        return END
+    return "critique_edit"
+
+
+def _build_fused(workflow: StateGraph, config: GraphConfig, checkpointer=None):
+    node_policy = {"policy": config.stop_policy}
+    workflow.add_node("writer", _node("writer", writer_node, awriter_node))
+    workflow.add_node("critique_edit", _node(
+        "critique_edit",
+        partial(critique_edit_node, **node_policy),
+        partial(acritique_edit_node, **node_policy),
+    ))
+    workflow.set_entry_point("writer")
+    workflow.add_edge("writer", "critique_edit")
+    workflow.add_conditional_edges(
+        "critique_edit",
+        partial(after_critique_edit, policy=config.stop_policy),
+        {
+            "critique_edit": "critique_edit",
+            END: END
+        }
+    )
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def build_graph(config: Optional[GraphConfig] = None, checkpointer=None):
+    """
+    Builds and compiles a new graph. Prefer `get_graph`, which reuses compiled graphs.
+    With a `checkpointer` (see app.checkpoints) runs given a thread id are
+    checkpointed after every node.
+    """
+    config = config or GraphConfig()
     workflow = StateGraph(AgentState)
-    
+
+    if config.fused:
+        return _build_fused(workflow, config, checkpointer)
+
     # Add nodes
-    workflow.add_node("writer", writer_node)
-    workflow.add_node("critic", critic_node)
-    workflow.add_node("editor", editor_node)
+    workflow.add_node("writer", _node("writer", writer_node, awriter_node))
+    workflow.add_node("critic", _node("critic", critic_node, acritic_node))
+    workflow.add_node("editor", _node("editor", editor_node, aeditor_node))
     
     # Set entry point
     workflow.set_entry_point("writer")
@@ -48,14 +123,55 @@ def build_graph():
     # Conditional edge from Critic
     workflow.add_conditional_edges(
         "critic",
-        verify_cycle,
+        partial(verify_cycle, policy=config.stop_policy),
         {
             "editor": "editor",
             END: END
         }
     )
     
-    # From Editor back to Critic
-    workflow.add_edge("editor", "critic")
+    # From Editor back to Critic (or straight to END after the last edit, if configured)
+    workflow.add_conditional_edges(
+        "editor",
+        partial(after_editor, policy=config.stop_policy),
+        {
+            "critic": "critic",
+            END: END
+        }
+    )
     
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+
+# Compiled graphs are immutable and safe to invoke concurrently, so one
+# instance per configuration (and checkpointer) is shared by every run in the process.
+_graphs: Dict[Tuple[GraphConfig, Any], object] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_graph(config: Optional[GraphConfig] = None, checkpointer=None):
+    """
+    Returns the compiled graph for `config`, compiling it on first use.
+    """
+    key = (config or GraphConfig(), checkpointer)
+    graph = _graphs.get(key)
+    if graph is None:
+        with _graphs_lock:
+            graph = _graphs.get(key)
+            if graph is None:
+                graph = build_graph(*key)
+                _graphs[key] = graph
+    return graph
+
+
+def precompile_graphs(configs: Iterable[GraphConfig] = (GraphConfig(),), checkpointer=None):
+    """
+    Compiles the given graph variants ahead of the first request.
+    """
+    for config in configs:
+        get_graph(config, checkpointer)
+
+
+def clear_graph_cache():
+    with _graphs_lock:
+        _graphs.clear()
@@ -0,0 +1,181 @@
+# history.py
+import copy
+from typing import Any, Dict, List, Optional
+
+from app.patches import apply_delta, text_delta
+
+# Run history is append-only (see AgentState.history). The writer step keeps
+# the full first draft; every editor step stores only a delta against the
+# draft it revised, so a run holds one full text plus small diffs instead of
+# a copy of every version. Full texts are rebuilt on demand.
+
+
+def editor_content(previous: str, new_draft: str) -> Dict[str, Any]:
+    """
+    History fields describing an editor output relative to the draft it revised.
+    """
+    return {"delta": text_delta(previous, new_draft)}
+
+
+def materialize_history(history: List[dict]) -> List[dict]:
+    """
+    Returns the history with every editor step's "content" rebuilt from its delta.
+    Steps of long-document runs are tagged by "chunk"; each chunk is its own chain.
+    """
+    drafts: Dict[Any, str] = {}
+    steps = []
+    for step in history:
+        chain = step.get("chunk")
+        if step.get("step") == "writer":
+            drafts[chain] = step.get("content", "")
+        elif step.get("step") == "editor":
+            if "delta" in step:
+                content = apply_delta(drafts.get(chain, ""), step["delta"])
+                step = {key: value for key, value in step.items() if key != "delta"}
+                step["content"] = content
+            drafts[chain] = step.get("content", "")
+        steps.append(step)
+    return steps
+
+
+def build_trace(raw_history: List[dict]) -> List[Dict[str, Any]]:
+    """
+    Groups raw history steps into UI trace blocks: {"iteration", "draft", "critic", "edited"}.
+    Editor drafts are rebuilt from their deltas here. Blocks of long-document
+    runs are tagged by "chunk", as their steps are.
+    """
+    chunks = sorted({step["chunk"] for step in raw_history if "chunk" in step})
+    if not chunks:
+        return _chain_trace(raw_history)
+    return [
+        {**block, "chunk": chunk}
+        for chunk in chunks
+        for block in _chain_trace([step for step in raw_history if step.get("chunk") == chunk])
+    ]
+
+
+def _chain_trace(raw_history: List[dict]) -> List[Dict[str, Any]]:
+    # Build a clean trace for UI:
+    # Iteration 0: draft from writer -> critic -> edited (from editor)
+    # Iteration 1..N: draft (previous edited) -> critic -> edited ...
+    trace: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+
+    last_draft: str = ""
+    current_iteration: int = 0
+
+    for step in materialize_history(raw_history):
+        step_type = step.get("step")
+
+        if step_type == "writer":
+            # Start iteration 0 with draft from writer
+            current_iteration = 0
+            last_draft = step.get("content", "")
+            current = {
+                "iteration": current_iteration,
+                "draft": last_draft,
+                "critic": None,
+                "edited": None,
+            }
+            trace.append(current)
+
+        elif step_type == "critic":
+            # Attach critic feedback to the current block (or create one if missing)
+            feedback = step.get("feedback") or step.get("critique") or {}
+            if current is None:
+                current = {
+                    "iteration": current_iteration,
+                    "draft": last_draft,
+                    "critic": None,
+                    "edited": None,
+                }
+                trace.append(current)
+            current["critic"] = feedback
+
+        elif step_type == "editor":
+            # Editor produces an improved draft and increments iteration
+            edited_text = step.get("content", "")
+            new_iter = step.get("iteration", current_iteration + 1)
+
+            # Ensure we have a current block to attach "edited"
+            if current is None:
+                current = {
+                    "iteration": current_iteration,
+                    "draft": last_draft,
+                    "critic": None,
+                    "edited": None,
+                }
+                trace.append(current)
+
+            current["edited"] = edited_text
+
+            # Prepare next cycle block: draft becomes the edited text
+            last_draft = edited_text
+            current_iteration = new_iter
+
+            current = {
+                "iteration": current_iteration,
+                "draft": last_draft,
+                "critic": None,
+                "edited": None,
+            }
+            trace.append(current)
+
+        else:
+            # Unknown step type -> ignore safely
+            continue
+
+    # Remove trailing empty block if it has no critic and no edited (can happen in edge cases)
+    while trace and (trace[-1].get("critic") is None and trace[-1].get("edited") is None):
+        trace.pop()
+
+    return trace
+
+
+class RunResult(dict):
+    """
+    Service result (see app.service.run_text_editor_agent) whose "trace" is
+    built from "raw_history" on first use, so callers that never read it do
+    not pay for a second copy of every draft. Reading the key, iterating,
+    items() and JSON encoding build it; a deep copy keeps it unbuilt.
+    """
+
+    def _with_trace(self) -> "RunResult":
+        if not dict.__contains__(self, "trace"):
+            dict.__setitem__(self, "trace", build_trace(dict.get(self, "raw_history", [])))
+        return self
+
+    def __missing__(self, key):
+        if key == "trace":
+            return dict.__getitem__(self._with_trace(), key)
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key == "trace" or dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        return dict.__iter__(self._with_trace())
+
+    def __len__(self) -> int:
+        return dict.__len__(self._with_trace())
+
+    def keys(self):
+        return dict.keys(self._with_trace())
+
+    def items(self):
+        return dict.items(self._with_trace())
+
+    def values(self):
+        return dict.values(self._with_trace())
+
+    def copy(self) -> "RunResult":
+        return RunResult(dict.items(self))
+
+    def __repr__(self) -> str:
+        return dict.__repr__(self._with_trace())
+
+    def __deepcopy__(self, memo) -> "RunResult":
+        return RunResult(copy.deepcopy(dict(dict.items(self)), memo))
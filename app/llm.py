@@ -1,26 +1,270 @@
+import asyncio
 import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 
+from app.cache import get_response_cache
+
 load_dotenv()
 
-def get_llm(json_mode: bool = False):
+# Connection pool defaults (overridable via environment variables)
+DEFAULT_POOL_SIZE = 20          # OPENAI_POOL_SIZE: max concurrent connections
+DEFAULT_KEEPALIVE_EXPIRY = 60.0 # OPENAI_POOL_KEEPALIVE: seconds an idle connection stays open
+DEFAULT_IDLE_TIMEOUT = 600.0    # OPENAI_POOL_IDLE_TIMEOUT: seconds an unused client stays registered
+
+# Model routing: OPENAI_MODEL_<NODE> (e.g. OPENAI_MODEL_CRITIC) overrides
+# OPENAI_MODEL for one node, so cheap reviews and strong edits can coexist.
+DEFAULT_MODEL = "gpt-4o"
+ROUTED_NODES = ("writer", "critic", "editor", "stitch")
+# Critic escalation: a review scoring within the band around the threshold is
+# repeated on OPENAI_MODEL_CRITIC_ESCALATION, if that is set.
+DEFAULT_ESCALATION_THRESHOLD = 0.8  # CRITIC_ESCALATION_THRESHOLD
+DEFAULT_ESCALATION_BAND = 0.1       # CRITIC_ESCALATION_BAND
+
+_lock = threading.Lock()
+_clients: Dict[Tuple, Tuple[ChatOpenAI, float]] = {}
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional["_LoopBoundAsyncClient"] = None
+
+_stats: Dict[str, int] = {
+    "clients_created": 0,
+    "clients_reused": 0,
+    "clients_evicted": 0,
+    "requests": 0,
+    "connections_opened": 0,
+    "tls_handshakes": 0,
+}
+
+
+def _bump(key: str, amount: int = 1):
+    with _lock:
+        _stats[key] += amount
+
+
+def _on_trace(name: str, info: dict):
+    # httpcore reports one connect_tcp per new connection; reused keep-alive
+    # connections go straight to sending the request.
+    if name == "connection.connect_tcp.complete":
+        _bump("connections_opened")
+    elif name == "connection.start_tls.complete":
+        _bump("tls_handshakes")
+
+
+async def _on_trace_async(name: str, info: dict):
+    _on_trace(name, info)
+
+
+def _on_request(request: httpx.Request):
+    _bump("requests")
+    request.extensions["trace"] = _on_trace
+
+
+async def _on_request_async(request: httpx.Request):
+    _bump("requests")
+    request.extensions["trace"] = _on_trace_async
+
+
+def _pool_limits() -> httpx.Limits:
+    size = int(os.getenv("OPENAI_POOL_SIZE", DEFAULT_POOL_SIZE))
+    keepalive = float(os.getenv("OPENAI_POOL_KEEPALIVE", DEFAULT_KEEPALIVE_EXPIRY))
+    return httpx.Limits(
+        max_connections=size,
+        max_keepalive_connections=size,
+        keepalive_expiry=keepalive,
+    )
+
+
+class _LoopBoundAsyncClient(httpx.AsyncClient):
+    """
+    The async client handed to every ChatOpenAI. Keep-alive connections belong
+    to the event loop that opened them, so requests are sent through one pool
+    per running loop; pools of closed loops are dropped.
+    """
+
+    def __init__(self):
+        super().__init__(timeout=None)
+        self._pools: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._pools_lock = threading.Lock()
+
+    def _pool(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._pools_lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                for closed in [other for other in self._pools if other.is_closed()]:
+                    # Its sockets went with the loop; nothing left to close
+                    del self._pools[closed]
+                pool = httpx.AsyncClient(
+                    limits=_pool_limits(),
+                    timeout=None,
+                    event_hooks={"request": [_on_request_async]},
+                )
+                self._pools[loop] = pool
+            return pool
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await self._pool().send(request, **kwargs)
+
+
+def _get_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """
+    Returns the process-wide HTTP clients shared by every ChatOpenAI instance.
+    Must be called with _lock held.
+    """
+    global _http_client, _http_async_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            limits=_pool_limits(),
+            timeout=None,
+            event_hooks={"request": [_on_request]},
+        )
+    if _http_async_client is None:
+        _http_async_client = _LoopBoundAsyncClient()
+    return _http_client, _http_async_client
+
+
+def _evict_idle_locked(now: float, max_idle: float):
+    for key, (_, last_used) in list(_clients.items()):
+        if now - last_used > max_idle:
+            del _clients[key]
+            _stats["clients_evicted"] += 1
+
+
+def model_for(node: Optional[str] = None) -> str:
+    """
+    Returns the model configured for a graph node, falling back to OPENAI_MODEL.
+    """
+    if node in ROUTED_NODES:
+        routed = os.getenv(f"OPENAI_MODEL_{node.upper()}")
+        if routed:
+            return routed
+    return os.getenv("OPENAI_MODEL", DEFAULT_MODEL)
+
+
+def escalation_model(score: Any) -> Optional[str]:
     """
-    Returns an instance of ChatOpenAI.
+    Returns the model a critic review should be repeated on, or None.
+    Only scores near the pass threshold are escalated: clear passes and clear
+    failures are trusted to the cheaper model. Compared with the requested
+    critic model, not the one the API reports (a dated snapshot name).
     """
-    model_name = os.getenv("OPENAI_MODEL", "gpt-4o")
+    model = os.getenv("OPENAI_MODEL_CRITIC_ESCALATION")
+    if not model or model == model_for("critic") or not isinstance(score, (int, float)):
+        return None
+    threshold = float(os.getenv("CRITIC_ESCALATION_THRESHOLD", DEFAULT_ESCALATION_THRESHOLD))
+    band = float(os.getenv("CRITIC_ESCALATION_BAND", DEFAULT_ESCALATION_BAND))
+    if abs(score - threshold) > band:
+        return None
+    return model
+
+
+def get_llm(
+    json_mode: bool = False,
+    model: Optional[str] = None,
+    temperature: float = 0.0,
+    max_tokens: Optional[int] = None,
+    node: Optional[str] = None,
+):
+    """
+    Returns a pooled instance of ChatOpenAI.
+
+    Clients are registered per (model, json_mode, sampling settings) and share a
+    single keep-alive connection pool, so repeated node calls, runs and threads
+    reuse warm HTTPS connections instead of paying a new handshake each time.
+    Without an explicit `model`, the model is routed by `node` (see model_for).
+    """
+    model_name = model or model_for(node)
     api_key = os.getenv("OPENAI_API_KEY")
-    
+    base_url = os.getenv("OPENAI_BASE_URL") or None
+
     if not api_key:
         raise ValueError("OPENAI_API_KEY is not set in environment variables. Please check your .env file.")
 
-    kwargs = {
-        "model": model_name,
-        "temperature": 0.0,
-        "api_key": api_key,
-    }
-    
-    if json_mode:
-        kwargs["model_kwargs"] = {"response_format": {"type": "json_object"}}
-        
-    return ChatOpenAI(**kwargs)
+    # Only deterministic calls are cached; sampled ones must stay distinct
+    cache = get_response_cache() if temperature == 0.0 else None
+
+    key = (model_name, json_mode, temperature, max_tokens, base_url, api_key, cache)
+    now = time.monotonic()
+    max_idle = float(os.getenv("OPENAI_POOL_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT))
+
+    with _lock:
+        _evict_idle_locked(now, max_idle)
+
+        entry = _clients.get(key)
+        if entry is not None:
+            _clients[key] = (entry[0], now)
+            _stats["clients_reused"] += 1
+            return entry[0]
+
+        http_client, http_async_client = _get_http_clients()
+        kwargs: Dict[str, Any] = {
+            "model": model_name,
+            "temperature": temperature,
+            "api_key": api_key,
+            "http_client": http_client,
+            "http_async_client": http_async_client,
+            # Token counts are recorded per step, also for streamed calls
+            "stream_usage": True,
+            # Retries happen in app.metrics.invoke_llm, which counts them per step
+            "max_retries": 0,
+        }
+        if base_url:
+            kwargs["base_url"] = base_url
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+        if cache is not None:
+            kwargs["cache"] = cache
+
+        if json_mode:
+            kwargs["model_kwargs"] = {"response_format": {"type": "json_object"}}
+
+        llm = ChatOpenAI(**kwargs)
+        _clients[key] = (llm, now)
+        _stats["clients_created"] += 1
+        return llm
+
+
+def evict_idle_clients(max_idle: Optional[float] = None) -> int:
+    """
+    Drops clients unused for longer than `max_idle` seconds. Returns the number evicted.
+    """
+    if max_idle is None:
+        max_idle = float(os.getenv("OPENAI_POOL_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT))
+    with _lock:
+        before = len(_clients)
+        _evict_idle_locked(time.monotonic(), max_idle)
+        return before - len(_clients)
+
+
+def pool_stats() -> Dict[str, int]:
+    """
+    Returns client registry and connection reuse counters.
+    `connections_reused` counts requests that went over an already open connection.
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats["clients_active"] = len(_clients)
+    stats["connections_reused"] = max(stats["requests"] - stats["connections_opened"], 0)
+    return stats
+
+
+def reset_llm_clients():
+    """
+    Closes pooled connections and clears the client registry and counters.
+    """
+    global _http_client, _http_async_client
+    with _lock:
+        _clients.clear()
+        if _http_client is not None:
+            _http_client.close()
+        # Async pools can only be closed from their own event loops; dropping
+        # the reference lets their connections be garbage collected.
+        _http_client = None
+        _http_async_client = None
+        for key in _stats:
+            _stats[key] = 0
@@ -1,28 +1,80 @@
 import argparse
 import sys
 import os
+import uuid
+from typing import TYPE_CHECKING
 
 # Add project root to sys path to allow running as module
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from app.service import run_text_editor_agent
-from app.report import save_report
+# Only light modules are imported up front: --help and argument errors should
+# not pay for LangGraph, the OpenAI client and the rest of the service layer
+# (about two seconds). Those are imported once a run actually starts; see
+# tests/test_cli_startup.py.
+from app.state import RunOptions
+from app.stopping import StopPolicy
+
+if TYPE_CHECKING:
+    from app.graph import GraphConfig
+
+DEFAULT_CHECKPOINT_PATH = ".cache/checkpoints.db"
 
 def main():
     parser = argparse.ArgumentParser(description="AI Text Editor Agent")
     
-    parser.add_argument("--mode", type=str, choices=["generate", "revise"], required=True, help="Operation mode")
-    parser.add_argument("--task", type=str, required=True, help="Description of what to write or fix")
+    parser.add_argument("--mode", type=str, choices=["generate", "revise"], help="Operation mode (required unless --batch)")
+    parser.add_argument("--task", type=str, help="Description of what to write or fix (required unless --batch)")
     parser.add_argument("--text-file", type=str, help="Path to input text file (required for revise mode)")
     parser.add_argument("--max-iterations", type=int, default=3, help="Max edit loops")
-    parser.add_argument("--report", type=str, default="report.json", help="Path to save output report")
+    parser.add_argument("--report", type=str, default="report.json",
+                        help="Path to save output report; .jsonl (.jsonl.gz, .jsonl.zst) is written step by step")
+    parser.add_argument("--report-fsync", action="store_true", help="fsync every step written to a .jsonl report")
+    parser.add_argument("--report-rotate-mb", type=float, help="Start a new .jsonl report part after this many MB")
     parser.add_argument("--verbose", action="store_true", help="Print detailed step info")
+    parser.add_argument("--stream", action="store_true", help="Print draft tokens and critiques live")
+    parser.add_argument("--profile", action="store_true", help="Print per-node time, token and retry breakdown")
+    parser.add_argument("--editor-mode", type=str, choices=["rewrite", "patch"], default="rewrite",
+                        help="Editor returns the full text (rewrite) or structured edits applied locally (patch)")
+    parser.add_argument("--critic-mode", type=str, choices=["full", "incremental"], default="full",
+                        help="Critic re-reads the whole draft (full) or only paragraphs changed since its last review")
+    parser.add_argument("--no-local-rules", action="store_true",
+                        help="Disable local pre-critic checks (length, filler, structure) and length-based token limits")
+    parser.add_argument("--candidates", type=int, default=1,
+                        help="Revisions sampled concurrently per Editor pass; the critic's best-scoring one advances")
+    parser.add_argument("--writer-candidates", type=int, default=1, help="Same for the Writer's first draft")
+    parser.add_argument("--candidate-temperature", type=float, default=0.8,
+                        help="Sampling temperature of candidates after the first")
+    parser.add_argument("--target-score", type=float, help="Stop once the critic score reaches this value")
+    parser.add_argument("--plateau-epsilon", type=float, help="Stop when the score changes less than this ...")
+    parser.add_argument("--plateau-rounds", type=int, default=2, help="... over this many consecutive reviews")
+    parser.add_argument("--max-llm-calls", type=int, help="Per-run LLM call budget")
+    parser.add_argument("--skip-final-critique", action="store_true", help="Do not review the draft after the last allowed edit")
+    parser.add_argument("--fused", action="store_true", help="Review and revise in a single LLM call per iteration")
+    parser.add_argument("--long-doc", action="store_true", help="Revise long texts chunk by chunk in parallel (revise mode)")
+    parser.add_argument("--chunk-chars", type=int, default=4000, help="Target chunk size for --long-doc")
+    parser.add_argument("--checkpoints", type=str,
+                        help="SQLite file to checkpoint runs in, so they can be resumed (default: CHECKPOINT_PATH)")
+    parser.add_argument("--run-id", type=str,
+                        help="Checkpoint the run under this id; running again with the same id resumes it")
+    parser.add_argument("--cache", type=str, help="Path to an on-disk LLM response cache (SQLite)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass cache lookups (fresh responses are still stored)")
+    parser.add_argument("--batch", type=str, help="JSONL manifest or directory of .txt files to process")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max concurrent runs in batch and --long-doc modes")
+    parser.add_argument("--daemon-socket", type=str,
+                        help="Socket of a running app.daemon (default: AGENT_DAEMON_SOCKET or a per-user temp file)")
+    parser.add_argument("--no-daemon", action="store_true", help="Run in this process even if a daemon is listening")
+    parser.add_argument("--output-dir", type=str, default="batch_output", help="Where batch results and reports are written")
     
     args = parser.parse_args()
-    
+
     # Validation
+    if not args.batch and (not args.mode or not args.task):
+        parser.error("--mode and --task are required (or use --batch)")
+    if not args.batch and args.long_doc and args.mode != "revise":
+        parser.error("--long-doc revises an existing text; use it with --mode revise")
+
     user_text = ""
-    if args.mode == "revise":
+    if not args.batch and args.mode == "revise":
         if not args.text_file:
             print("Error: --text-file is required for revise mode")
             sys.exit(1)
@@ -33,21 +85,103 @@ def main():
             print(f"Error reading file: {e}")
             sys.exit(1)
 
+    options = RunOptions(
+        editor_mode=args.editor_mode,
+        critic_mode=args.critic_mode,
+        local_rules=not args.no_local_rules,
+        writer_candidates=args.writer_candidates,
+        editor_candidates=args.candidates,
+        candidate_temperature=args.candidate_temperature,
+    )
+    stop_policy = StopPolicy(
+        target_score=args.target_score,
+        plateau_epsilon=args.plateau_epsilon,
+        plateau_rounds=args.plateau_rounds,
+        max_llm_calls=args.max_llm_calls,
+        skip_terminal_critique=args.skip_final_critique,
+    )
+
+    # A warm daemon (python -m app.daemon) saves the imports and setup below
+    if uses_daemon(args):
+        result = run_with_daemon(args, user_text, options, stop_policy)
+        if result is not None:
+            sink = open_report_sink(args)
+            if sink:
+                for step in result["raw_history"]:
+                    sink.write_step(step)
+            print_result(args, result, sink, local=False)
+            return
+
+    from app.graph import GraphConfig, precompile_graphs
+    from app.checkpoints import get_checkpoint_store
+
+    graph_config = GraphConfig(stop_policy=stop_policy, fused=args.fused)
+
+    if args.cache or args.no_cache:
+        from app.cache import configure_response_cache
+        configure_response_cache(args.cache or os.getenv("LLM_CACHE_PATH"), bypass=args.no_cache)
+    if args.checkpoints:
+        from app.checkpoints import configure_checkpoints
+        configure_checkpoints(args.checkpoints)
+    
+    if args.batch:
+        run_batch_mode(args, options, graph_config)
+        return
+
     print("\n[START] Initializing Agent...")
+    run_id = resolve_run_id(args)
+    precompile_graphs([graph_config], get_checkpoint_store() if run_id else None)
+
+    # A JSONL report is written while the run progresses
+    sink = open_report_sink(args)
+    on_step = sink.write_step if sink else None
     
     # Use Service Layer
-    result = run_text_editor_agent(args.task, args.mode, user_text, args.max_iterations)
+    from app.service import run_text_editor_agent
+
+    if args.long_doc:
+        from app.chunking import run_long_document
+        result = run_long_document(
+            args.task, user_text, args.max_iterations, args.chunk_chars, args.concurrency, options, graph_config
+        )
+        print(f"Chunks: {len(result['chunks'])}")
+        if sink:
+            for step in result["raw_history"]:
+                sink.write_step(step)
+    elif args.stream:
+        result = run_streaming(
+            args.task, args.mode, user_text, args.max_iterations, options, graph_config, on_step, run_id
+        )
+    else:
+        result = run_text_editor_agent(
+            args.task, args.mode, user_text, args.max_iterations,
+            graph_config=graph_config, options=options, on_step=on_step, thread_id=run_id,
+        )
     
-    # Output
+    print_result(args, result, sink)
+
+def print_result(args, result: dict, sink=None, local: bool = True):
+    """
+    Prints the final text and the requested summaries, and saves the report.
+    """
     print("\n" + "="*40)
     print("FINAL TEXT")
     print("="*40)
     print(result["final_text"])
     print("="*40)
     print(f"Iterations: {result['iterations']} | Reason: {result['stopped_by']}")
+    if local:
+        # With the daemon, the response cache lives in its process
+        print_cache_stats()
+    if args.profile:
+        print_profile(result["metrics"])
     
     # Save Report
-    if args.report:
+    if sink:
+        sink.close()
+        print(f"\n[INFO] Report saved to {args.report}")
+    elif args.report:
+        from app.report import save_report
         save_report(result["raw_history"], args.report)
         
     if args.verbose:
@@ -61,5 +195,154 @@ def main():
              if 'edited' in item:
                  print(f"Edited Preview: {item.get('edited', '')[:50]}...")
 
+def resolve_run_id(args):
+    """
+    Returns the checkpoint thread id for a single run, or None when runs are not
+    checkpointed. --run-id without a store uses .cache/checkpoints.db; a store
+    without --run-id gets a fresh id, printed so the run can be resumed.
+    """
+    from app.checkpoints import configure_checkpoints, get_checkpoint_store
+
+    if args.long_doc:
+        # Chunks run as separate graphs; they are not checkpointed
+        return None
+    store = get_checkpoint_store()
+    if args.run_id and store is None:
+        store = configure_checkpoints(DEFAULT_CHECKPOINT_PATH)
+    if store is None:
+        return None
+    run_id = args.run_id or uuid.uuid4().hex[:12]
+    print(f"[INFO] Run id: {run_id} (resume with --run-id {run_id})")
+    return run_id
+
+def open_report_sink(args):
+    """
+    Returns a JsonlReportWriter when --report names a .jsonl file, else None.
+    """
+    if not args.report or ".jsonl" not in os.path.basename(args.report):
+        return None
+    from app.report import JsonlReportWriter
+
+    max_bytes = int(args.report_rotate_mb * 1024 * 1024) if args.report_rotate_mb else None
+    return JsonlReportWriter(args.report, fsync=args.report_fsync, max_bytes=max_bytes)
+
+def print_profile(metrics: dict):
+    from app.metrics import format_profile
+
+    print("\nPROFILE")
+    for line in format_profile(metrics):
+        print(line)
+
+def print_cache_stats():
+    from app.cache import get_response_cache
+
+    cache = get_response_cache()
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Cache: hits={stats['hits']} misses={stats['misses']} entries={stats['entries']}")
+
+def run_streaming(
+    task: str, mode: str, user_text: str, max_iterations: int, options: RunOptions, graph_config: "GraphConfig",
+    on_step=None, run_id=None,
+) -> dict:
+    """
+    Renders streaming events to the console and returns the final result.
+    """
+    from app.service import stream_text_editor_agent
+
+    return render_events(stream_text_editor_agent(
+        task, mode, user_text, max_iterations, graph_config=graph_config, options=options, on_step=on_step,
+        thread_id=run_id,
+    ))
+
+def render_events(events) -> dict:
+    """
+    Prints service events (see app.service) as they arrive; returns the result.
+    """
+    result = {}
+    for event in events:
+        event_type = event["type"]
+        if event_type == "node_start":
+            print(f"\n--- [{event['node'].upper()}] ---", flush=True)
+        elif event_type == "token":
+            print(event["text"], end="", flush=True)
+        elif event_type == "critique":
+            c = event["critique"]
+            print(f"Passed: {c.get('passed')} | Score: {c.get('score')}")
+            for issue in c.get("issues", []):
+                print(f"  - {issue}")
+        elif event_type == "node_end" and event["node"] != "critic":
+            print()
+        elif event_type == "result":
+            result = event["result"]
+    return result
+
+def uses_daemon(args) -> bool:
+    """
+    Single runs go to the daemon unless --no-daemon. Batches, --long-doc and
+    the flags that configure this process's cache or checkpoints run in-process.
+    """
+    return not (args.no_daemon or args.batch or args.long_doc or args.cache or args.no_cache or args.checkpoints)
+
+def run_with_daemon(args, user_text: str, options: RunOptions, stop_policy: StopPolicy):
+    """
+    Runs through the daemon and returns the result, or None when no daemon is
+    listening or it declines the run (e.g. it was started with other models or
+    endpoint), in which case the caller runs it in-process.
+    """
+    from dataclasses import asdict
+    from app.daemon import DaemonRejected, connect, daemon_events, env_fingerprint
+
+    sock = connect(args.daemon_socket)
+    if sock is None:
+        return None
+    request = {
+        "task": args.task,
+        "mode": args.mode,
+        "user_text": user_text,
+        "max_iterations": args.max_iterations,
+        "options": asdict(options),
+        "graph": {"stop_policy": asdict(stop_policy), "fused": args.fused},
+        "run_id": args.run_id,
+        "stream": args.stream,
+        "env": env_fingerprint(),
+    }
+    print("\n[START] Running on the agent daemon...")
+    try:
+        result = render_events(daemon_events(sock, request))
+    except DaemonRejected as e:
+        print(f"[INFO] Daemon declined the run ({e}); running in-process")
+        return None
+    if args.run_id:
+        print(f"[INFO] Run id: {args.run_id} (checkpointed by the daemon)")
+    return result
+
+def run_batch_mode(args, options: RunOptions, graph_config: "GraphConfig"):
+    import asyncio
+    from app.batch import load_batch_tasks, run_batch, print_batch_summary
+    from app.checkpoints import get_checkpoint_store
+    from app.graph import precompile_graphs
+
+    try:
+        items = load_batch_tasks(args.batch, task=args.task, max_iterations=args.max_iterations)
+    except Exception as e:
+        print(f"Error reading batch: {e}")
+        sys.exit(1)
+
+    print(f"\n[START] Batch of {len(items)} documents (concurrency {args.concurrency})...")
+    precompile_graphs([graph_config], get_checkpoint_store())
+    # With a .jsonl --report all documents share one (rotated) report; otherwise
+    # each gets <id>.report.json in the output directory
+    sink = open_report_sink(args)
+    try:
+        summary = asyncio.run(run_batch(items, args.output_dir, args.concurrency, options, graph_config, sink))
+    finally:
+        if sink:
+            sink.close()
+    print_batch_summary(summary)
+    print_cache_stats()
+    if summary["failed"]:
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,199 @@
+# metrics.py
+import asyncio
+import os
+import time
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+import openai
+
+# LLM calls are retried here rather than inside the OpenAI client (get_llm
+# disables its retries), so every step can report how often it retried.
+DEFAULT_MAX_RETRIES = 2     # LLM_MAX_RETRIES
+RETRY_BASE_DELAY = 0.5      # seconds; doubles with every attempt
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+# Counters summed per node and per run (see run_metrics). speculative_calls are
+# the calls spent on candidate drafts that were not chosen (see app.nodes);
+# parse_* count critic replies and how many needed local repairs, a retry
+# call, or could not be parsed (see app.critique).
+TOTALS = ("steps", "wall_ms", "queue_ms", "llm_ms", "llm_calls", "retries",
+          "input_tokens", "output_tokens", "cached_tokens", "cache_hits", "speculative_calls",
+          "parse_reviews", "parse_repaired", "parse_retries", "parse_failures")
+
+
+def max_retries() -> int:
+    return int(os.getenv("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+
+
+def _retry_delay(attempt: int) -> float:
+    return RETRY_BASE_DELAY * (2 ** attempt)
+
+
+def call_record(llm, response, started: float, retries: int = 0) -> Dict[str, Any]:
+    """
+    Which model served a call, how long it took (including retries), how many
+    tokens it used and how many times it was retried.
+    """
+    meta = getattr(response, "response_metadata", None) or {}
+    usage = getattr(response, "usage_metadata", None) or {}
+    model = meta.get("model_name") or getattr(llm, "model_name", None)
+    record = {
+        "model": model if isinstance(model, str) else None,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        "input_tokens": usage.get("input_tokens"),
+        "output_tokens": usage.get("output_tokens"),
+        # Prompt tokens served from the provider's prompt cache
+        "cached_tokens": (usage.get("input_token_details") or {}).get("cache_read"),
+        "retries": retries,
+    }
+    if meta.get("cache_hit"):
+        record["cached"] = True
+    return record
+
+
+def invoke_llm(llm, messages: list, calls: list, config: Optional[dict] = None):
+    """
+    Calls the model, retrying transient API errors, and appends a call_record to `calls`.
+    `config` is passed on to the call (e.g. tags).
+    """
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            response = llm.invoke(messages, config)
+            break
+        except RETRYABLE_ERRORS:
+            if attempt >= max_retries():
+                raise
+            time.sleep(_retry_delay(attempt))
+            attempt += 1
+    calls.append(call_record(llm, response, started, attempt))
+    return response
+
+
+async def ainvoke_llm(llm, messages: list, calls: list, config: Optional[dict] = None):
+    """
+    Async variant of invoke_llm.
+    """
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            response = await llm.ainvoke(messages, config)
+            break
+        except RETRYABLE_ERRORS:
+            if attempt >= max_retries():
+                raise
+            await asyncio.sleep(_retry_delay(attempt))
+            attempt += 1
+    calls.append(call_record(llm, response, started, attempt))
+    return response
+
+
+def _annotate(state: dict, update: dict, started: float, started_at: float) -> dict:
+    """
+    Adds the node's wall time and the time the run waited before the node
+    started (since the previous step finished) to the first step it produced.
+    """
+    steps = (update or {}).get("history")
+    if not steps:
+        return update
+    finished_at = time.time()
+    timing = {"wall_ms": round((time.perf_counter() - started) * 1000, 1)}
+    previous = state.get("step_finished_at")
+    if previous is not None:
+        timing["queue_ms"] = round(max(started_at - previous, 0.0) * 1000, 1)
+    return {**update, "history": [{**steps[0], **timing}, *steps[1:]], "step_finished_at": finished_at}
+
+
+def timed_node(func):
+    """
+    Wraps a graph node so its history steps record wall and queue time.
+    """
+    @wraps(func)
+    def wrapper(state):
+        started_at, started = time.time(), time.perf_counter()
+        return _annotate(state, func(state), started, started_at)
+    return wrapper
+
+
+def atimed_node(afunc):
+    """
+    Async variant of timed_node.
+    """
+    @wraps(afunc)
+    async def wrapper(state):
+        started_at, started = time.time(), time.perf_counter()
+        return _annotate(state, await afunc(state), started, started_at)
+    return wrapper
+
+
+def _add(totals: Dict[str, float], key: str, value: Optional[float]):
+    if value:
+        totals[key] = totals[key] + value
+
+
+def _speculative_calls(step: dict) -> int:
+    candidates = step.get("candidates") or []
+    return sum(c.get("llm_calls", 0) for i, c in enumerate(candidates) if i != step.get("chosen"))
+
+
+def run_metrics(history: List[dict]) -> Dict[str, Any]:
+    """
+    Per-run aggregates of the step annotations: totals plus a per-node
+    breakdown under "nodes". Token counts of response-cache hits are not
+    added, since those calls were not paid for.
+    """
+    totals = dict.fromkeys(TOTALS, 0)
+    nodes: Dict[str, Dict[str, Any]] = {}
+
+    for step in history:
+        name = step.get("step")
+        calls = step.get("calls")
+        if calls is None and "wall_ms" not in step:
+            continue
+        node = nodes.setdefault(name, dict.fromkeys(TOTALS, 0))
+        for target in (totals, node):
+            target["steps"] += 1
+            _add(target, "wall_ms", step.get("wall_ms"))
+            _add(target, "queue_ms", step.get("queue_ms"))
+            _add(target, "speculative_calls", _speculative_calls(step))
+            for key, value in (step.get("parse") or {}).items():
+                _add(target, f"parse_{key}", value)
+            for call in calls or []:
+                target["llm_calls"] += 1
+                _add(target, "llm_ms", call.get("latency_ms"))
+                _add(target, "retries", call.get("retries"))
+                if call.get("cached"):
+                    target["cache_hits"] += 1
+                    continue
+                for key in ("input_tokens", "output_tokens", "cached_tokens"):
+                    _add(target, key, call.get(key))
+
+    for values in (totals, *nodes.values()):
+        for key in ("wall_ms", "queue_ms", "llm_ms"):
+            values[key] = round(values[key], 1)
+    return {**totals, "nodes": nodes}
+
+
+def format_profile(metrics: Dict[str, Any]) -> List[str]:
+    """
+    Per-node breakdown as printable table lines.
+    """
+    header = f"{'node':<10}{'steps':>6}{'wall ms':>10}{'queue ms':>10}{'llm ms':>10}{'calls':>6}{'retries':>8}{'in tok':>9}{'out tok':>9}{'cached':>8}"
+    lines = [header, "-" * len(header)]
+    rows = list(metrics["nodes"].items()) + [("total", metrics)]
+    for name, m in rows:
+        lines.append(
+            f"{name:<10}{m['steps']:>6}{m['wall_ms']:>10.1f}{m['queue_ms']:>10.1f}{m['llm_ms']:>10.1f}"
+            f"{m['llm_calls']:>6}{m['retries']:>8}{m['input_tokens']:>9}{m['output_tokens']:>9}{m['cached_tokens']:>8}"
+        )
+    if metrics.get("speculative_calls"):
+        lines.append(f"Candidates not chosen: {metrics['speculative_calls']} LLM calls")
+    if metrics.get("parse_repaired") or metrics.get("parse_retries") or metrics.get("parse_failures"):
+        lines.append(
+            f"Critic replies: {metrics['parse_reviews']}, repaired locally: {metrics['parse_repaired']}, "
+            f"retried: {metrics['parse_retries']}, unusable: {metrics['parse_failures']}"
+        )
+    return lines
@@ -1,102 +1,365 @@
+import asyncio
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+from langgraph.constants import TAG_NOSTREAM
 
 from app.state import AgentState
 from app.prompts import (
     WRITER_SYSTEM_PROMPT, WRITER_REVISE_PROMPT,
-    CRITIC_SYSTEM_PROMPT,
-    EDITOR_SYSTEM_PROMPT
+    CRITIC_SYSTEM_PROMPT, CRITIC_INCREMENTAL_PROMPT, CRITIQUE_FIX_PROMPT, FUSED_CRITIQUE_EDIT_PROMPT,
+    EDITOR_SYSTEM_PROMPT, EDITOR_PATCH_SYSTEM_PROMPT
+)
+from app.critique import (
+    CritiqueParseError, decode_object, new_parse_stats, parse_critique, parse_retries, validate_critique
+)
+from app.history import editor_content
+from app.llm import escalation_model, get_llm
+from app.metrics import ainvoke_llm, invoke_llm
+from app.patches import (
+    PatchError, apply_patch, changed_paragraphs, number_paragraphs, patch_size, split_paragraphs
 )
-from app.llm import get_llm
-from app.rubric import ValidationResult
+from app.rubric import EditPatch
+from app.rules import check_draft, max_tokens_for, to_critique
+from app.stopping import FUSED_ITERATION_CALLS, StopPolicy, stop_reason
 
-def writer_node(state: AgentState) -> dict:
+# Each node is split into message construction and state update so the sync
+# and async variants share everything except the actual LLM call.
+# History is append-only (see AgentState): updates carry only the new steps.
+
+def _merge(state: dict, update: dict) -> dict:
     """
-    Generates the initial draft OR revises user input for the first time.
+    Combines a state (or earlier update) with an update the way the graph
+    reducer does: history is appended, other keys are replaced.
     """
-    llm = get_llm(json_mode=False)
-    
+    merged = {**state, **update}
+    merged["history"] = list(state.get("history", [])) + list(update.get("history", []))
+    return merged
+
+def _writer_messages(state: AgentState) -> list:
     task = state["task"]
     mode = state.get("mode", "generate")
     user_text = state.get("user_text", "")
-    
+
     if mode == "revise" and user_text:
         # Initial revision
         prompt = WRITER_REVISE_PROMPT.format(user_text=user_text, task=task)
-        messages = [HumanMessage(content=prompt)]
-    else:
-        # Generation from scratch
-        messages = [
-            SystemMessage(content=WRITER_SYSTEM_PROMPT),
-            HumanMessage(content=f"Task: {task}")
-        ]
-        
-    response = llm.invoke(messages)
-    draft = response.content.strip()
-    
-    # Update history
-    history = state.get("history", [])
-    history.append({"step": "writer", "content": draft})
-    
+        return [HumanMessage(content=prompt)]
+
+    # Generation from scratch
+    return [
+        SystemMessage(content=WRITER_SYSTEM_PROMPT),
+        HumanMessage(content=f"Task: {task}")
+    ]
+
+def _writer_update(state: AgentState, draft: str, calls: list) -> dict:
     return {
         "draft": draft,
         "iteration": 0,
-        "history": history
+        "history": [{"step": "writer", "content": draft, "calls": calls}]
     }
 
-def critic_node(state: AgentState) -> dict:
+def _length_budget(state: AgentState):
     """
-    Reviews the current draft.
+    Output token limit for text-producing calls, from the task's length target.
+    """
+    if not state.get("local_rules", True):
+        return None
+    return max_tokens_for(state["task"], state.get("length_share", 1.0))
+
+def _write(state: AgentState, calls: list, temperature: float = 0.0, config=None) -> tuple:
+    llm = get_llm(json_mode=False, max_tokens=_length_budget(state), node="writer", temperature=temperature)
+    response = invoke_llm(llm, _writer_messages(state), calls, config)
+    return response.content.strip(), {}
+
+async def _awrite(state: AgentState, calls: list, temperature: float = 0.0, config=None) -> tuple:
+    llm = get_llm(json_mode=False, max_tokens=_length_budget(state), node="writer", temperature=temperature)
+    response = await ainvoke_llm(llm, _writer_messages(state), calls, config)
+    return response.content.strip(), {}
+
+def writer_node(state: AgentState) -> dict:
+    """
+    Generates the initial draft OR revises user input for the first time.
+    With writer_candidates > 1 the best of several sampled drafts is kept.
     """
-    llm = get_llm(json_mode=True)
-    parser = JsonOutputParser(pydantic_object=ValidationResult)
-    
+    if _fan_out(state, "writer_candidates") > 1:
+        return _writer_from_candidates(state, _run_candidates(state, _write, "writer_candidates"))
+    calls = []
+    draft, _ = _write(state, calls)
+    return _writer_update(state, draft, calls)
+
+async def awriter_node(state: AgentState) -> dict:
+    """
+    Async variant of writer_node.
+    """
+    if _fan_out(state, "writer_candidates") > 1:
+        return _writer_from_candidates(state, await _arun_candidates(state, _awrite, "writer_candidates"))
+    calls = []
+    draft, _ = await _awrite(state, calls)
+    return _writer_update(state, draft, calls)
+
+# Above this share of changed paragraphs an incremental critique saves little,
+# so the critic re-reads the whole draft.
+INCREMENTAL_MAX_CHANGED = 0.5
+
+def _incremental_regions(state: AgentState):
+    """
+    Returns the changed paragraph regions when the critic can re-assess only
+    those, or None when a full critique is needed.
+    """
+    if state.get("critic_mode") != "incremental":
+        return None
+    previous = state.get("previous_draft")
+    prior = state.get("critique") or {}
+    if not previous or "score" not in prior or "parse_error" in prior:
+        # No baseline: the first review, or one whose reply was unusable
+        return None
+    critic_steps = [h for h in state.get("history", []) if h.get("step") == "critic"]
+    if critic_steps and critic_steps[-1].get("source") == "rules":
+        # A rules-only verdict is no baseline for an incremental review
+        return None
+
+    regions = changed_paragraphs(previous, state["draft"])
+    total = max(len(split_paragraphs(state["draft"])), 1)
+    changed = sum(max(len(r["new"]), 1) for r in regions)
+    if changed / total > INCREMENTAL_MAX_CHANGED:
+        return None
+    return regions
+
+def _critic_messages(state: AgentState, regions=None) -> list:
     draft = state["draft"]
     task = state["task"]
-    
-    # Prepare prompt
-    content = f"Task: {task}\n\nCurrent Draft:\n{draft}\n\nEvaluate strictly."
-    messages = [
-        SystemMessage(content=CRITIC_SYSTEM_PROMPT),
+
+    if regions is None:
+        # Prepare prompt
+        content = f"Task: {task}\n\nCurrent Draft:\n{draft}\n\nEvaluate strictly."
+        return [
+            SystemMessage(content=CRITIC_SYSTEM_PROMPT),
+            HumanMessage(content=content)
+        ]
+
+    changes = []
+    for region in regions:
+        old = "\n\n".join(region["old"]) or "(nothing)"
+        new = "\n\n".join(region["new"]) or "(removed)"
+        changes.append(f"Paragraph {region['start']}:\nBefore:\n{old}\nAfter:\n{new}")
+
+    total = len(split_paragraphs(draft))
+    content = (
+        f"Task: {task}\n\n"
+        f"Previous Evaluation:\n{json.dumps(state['critique'], ensure_ascii=False)}\n\n"
+        f"The text has {total} paragraphs. Changed paragraphs:\n\n" + "\n\n".join(changes)
+    )
+    return [
+        SystemMessage(content=CRITIC_SYSTEM_PROMPT + "\n" + CRITIC_INCREMENTAL_PROMPT),
         HumanMessage(content=content)
     ]
-    
-    response = llm.invoke(messages)
-    
-    try:
-        critique_data = parser.parse(response.content)
-    except Exception:
-        # Fallback if specific parsing fails, though json_mode helps
-        import json
-        critique_data = json.loads(response.content)
-
-    # Update history
-    history = state.get("history", [])
-    history.append({
-        "step": "critic", 
-        "feedback": critique_data
-    })
+
+def _local_checks(state: AgentState) -> list:
+    if not state.get("local_rules", True):
+        return []
+    return check_draft(state["task"], state["draft"], state.get("length_share", 1.0))
+
+# Critic replies are validated into ValidationResult (see app.critique). Broken
+# JSON is repaired locally first; a reply that is still unusable is requested
+# again with the same messages plus a one-line fix instruction, so the retry
+# reuses the prompt (and the provider's prompt cache) instead of starting over.
+
+def _fix_messages(messages: list, error: CritiqueParseError) -> list:
+    return messages + [HumanMessage(content=CRITIQUE_FIX_PROMPT.format(error=error))]
+
+def _parsed(response, stats: dict, base) -> dict:
+    critique, repairs = parse_critique(response.content, base)
+    if repairs:
+        stats["repaired"] += 1
+    return critique
+
+def _review(llm, messages: list, calls: list, stats: dict, base=None, config=None) -> dict:
+    """
+    Calls the critic and returns its validated critique. Raises
+    CritiqueParseError when the reply is unusable after parse_retries() retries.
+    """
+    stats["reviews"] += 1
+    response = invoke_llm(llm, messages, calls, config)
+    for attempt in range(parse_retries() + 1):
+        try:
+            return _parsed(response, stats, base)
+        except CritiqueParseError as e:
+            if attempt == parse_retries():
+                stats["failures"] += 1
+                raise
+            stats["retries"] += 1
+            response = invoke_llm(llm, _fix_messages(messages, e), calls, config)
+
+async def _areview(llm, messages: list, calls: list, stats: dict, base=None, config=None) -> dict:
+    """
+    Async variant of _review.
+    """
+    stats["reviews"] += 1
+    response = await ainvoke_llm(llm, messages, calls, config)
+    for attempt in range(parse_retries() + 1):
+        try:
+            return _parsed(response, stats, base)
+        except CritiqueParseError as e:
+            if attempt == parse_retries():
+                stats["failures"] += 1
+                raise
+            stats["retries"] += 1
+            response = await ainvoke_llm(llm, _fix_messages(messages, e), calls, config)
+
+def _failed_review(state: AgentState, error: CritiqueParseError) -> dict:
+    """
+    Critique recorded when the critic reply is still unusable after retries.
+    The draft does not pass, earlier findings carry over for the editor, and
+    the stop policy decides whether the loop goes on.
+    """
+    previous = state.get("critique") or {}
+    return {
+        "passed": False,
+        "issues": list(previous.get("issues", [])),
+        "suggestions": list(previous.get("suggestions", [])),
+        "style_check": "Not evaluated: unusable critic reply.",
+        "clarity_check": "Not evaluated: unusable critic reply.",
+        "score": None,
+        "parse_error": str(error),
+    }
+
+def _incremental_base(state: AgentState, regions):
+    # Fields the model leaves out of an incremental review carry over from the previous evaluation
+    return state["critique"] if regions is not None else None
+
+def _parse_fields(stats: dict) -> dict:
+    return {"parse": stats} if stats["reviews"] else {}
+
+def _critic_update(state: AgentState, critique_data: dict, calls: list, stats: dict, regions=None, rule_issues=(),
+                   escalated: bool = False) -> dict:
+    step = {"step": "critic", "calls": calls, **_parse_fields(stats)}
+    if len(calls) > 1:
+        step["llm_calls"] = len(calls)
+    if escalated:
+        step["escalated_from"] = calls[0]["model"]
+    if regions is not None:
+        step.update({"critic_mode": "incremental", "changed_paragraphs": len(regions)})
+
+    return _critic_record(state, _with_rule_issues(critique_data, step, rule_issues), step)
+
+def _with_rule_issues(critique_data: dict, step: dict, rule_issues) -> dict:
+    if not rule_issues:
+        return critique_data
+    # Soft rule findings are added to the LLM's critique
+    critique_data = dict(critique_data)
+    critique_data["issues"] = list(critique_data.get("issues", [])) + [i.message for i in rule_issues]
+    critique_data["suggestions"] = list(critique_data.get("suggestions", [])) + [i.suggestion for i in rule_issues]
+    step["rule_issues"] = [i.rule for i in rule_issues]
+    return critique_data
+
+def _reused_review(state: AgentState, rule_issues) -> dict:
+    """
+    Records the review the current draft already got when it was chosen among
+    candidates, or returns None if it was not.
+    """
+    record = state.get("candidate_review")
+    if not record or record.get("draft_hash") != _draft_hash(state["draft"]):
+        return None
+    step = {"step": "critic", "source": "candidates", "llm_calls": 0}
+    return _critic_record(state, _with_rule_issues(dict(record["critique"]), step, rule_issues), step)
+
+def _critic_record(state: AgentState, critique_data: dict, step: dict) -> dict:
+    step["feedback"] = critique_data
 
     return {
         "critique": critique_data,
         "quality_passed": critique_data.get("passed", False),
-        "history": history
+        "history": [step]
     }
 
-def editor_node(state: AgentState) -> dict:
+def critic_node(state: AgentState) -> dict:
     """
-    Applies critique to the draft.
+    Reviews the current draft.
+    Local rules run first: a hard failure (length, filler) is returned as the
+    critique without an LLM call. In 'incremental' critic mode only paragraphs
+    changed since the previous review are sent, together with the previous evaluation.
     """
-    llm = get_llm(json_mode=False)
-    
-    draft = state["draft"]
+    rule_issues = _local_checks(state)
+    if any(i.hard for i in rule_issues):
+        # Mechanical failures go straight to the editor without an LLM review
+        return _critic_record(state, to_critique(rule_issues), {"step": "critic", "source": "rules", "llm_calls": 0})
+    reused = _reused_review(state, rule_issues)
+    if reused is not None:
+        return reused
+
+    regions = _incremental_regions(state)
+    if regions == []:
+        # Nothing changed since the last review: its findings still hold
+        return _critic_record(state, dict(state["critique"]), {"step": "critic", "critic_mode": "carried_forward", "llm_calls": 0})
+
+    calls, stats = [], new_parse_stats()
+    messages = _critic_messages(state, regions)
+    base = _incremental_base(state, regions)
+    try:
+        critique_data = _review(get_llm(json_mode=True, node="critic"), messages, calls, stats, base)
+    except CritiqueParseError as e:
+        return _critic_update(state, _failed_review(state, e), calls, stats, regions, rule_issues)
+    escalate_to = escalation_model(critique_data["score"])
+    escalated = False
+    if escalate_to:
+        # A borderline verdict from the cheap model is settled by the strong one
+        try:
+            critique_data = _review(get_llm(json_mode=True, model=escalate_to), messages, calls, stats, base)
+            escalated = True
+        except CritiqueParseError:
+            # The first verdict stands, and the step is not marked as escalated
+            pass
+    return _critic_update(state, critique_data, calls, stats, regions, rule_issues, escalated=escalated)
+
+async def acritic_node(state: AgentState) -> dict:
+    """
+    Async variant of critic_node.
+    """
+    rule_issues = _local_checks(state)
+    if any(i.hard for i in rule_issues):
+        # Mechanical failures go straight to the editor without an LLM review
+        return _critic_record(state, to_critique(rule_issues), {"step": "critic", "source": "rules", "llm_calls": 0})
+    reused = _reused_review(state, rule_issues)
+    if reused is not None:
+        return reused
+
+    regions = _incremental_regions(state)
+    if regions == []:
+        return _critic_record(state, dict(state["critique"]), {"step": "critic", "critic_mode": "carried_forward", "llm_calls": 0})
+
+    calls, stats = [], new_parse_stats()
+    messages = _critic_messages(state, regions)
+    base = _incremental_base(state, regions)
+    try:
+        critique_data = await _areview(get_llm(json_mode=True, node="critic"), messages, calls, stats, base)
+    except CritiqueParseError as e:
+        return _critic_update(state, _failed_review(state, e), calls, stats, regions, rule_issues)
+    escalate_to = escalation_model(critique_data["score"])
+    escalated = False
+    if escalate_to:
+        try:
+            critique_data = await _areview(get_llm(json_mode=True, model=escalate_to), messages, calls, stats, base)
+            escalated = True
+        except CritiqueParseError:
+            pass
+    return _critic_update(state, critique_data, calls, stats, regions, rule_issues, escalated=escalated)
+
+def _critique_lists(state: AgentState):
     critique = state["critique"]
-    task = state["task"]
-    
+
     # Construct suggestions string
     suggestions = "\n- ".join(critique.get("suggestions", []))
     issues = "\n- ".join(critique.get("issues", []))
-    
+    return issues, suggestions
+
+def _editor_messages(state: AgentState) -> list:
+    draft = state["draft"]
+    task = state["task"]
+    issues, suggestions = _critique_lists(state)
+
     prompt = f"""Original Task: {task}
 
 Current Draft:
@@ -110,27 +373,344 @@ Suggestions for Improvement:
 
 Please rewrite the draft incorporating these changes."""
 
-    messages = [
+    return [
         SystemMessage(content=EDITOR_SYSTEM_PROMPT),
         HumanMessage(content=prompt)
     ]
-    
-    response = llm.invoke(messages)
-    new_draft = response.content.strip()
-    
+
+def _editor_patch_messages(state: AgentState) -> list:
+    task = state["task"]
+    issues, suggestions = _critique_lists(state)
+
+    prompt = f"""Original Task: {task}
+
+Current Draft (numbered paragraphs):
+{number_paragraphs(state["draft"])}
+
+Critique (Issues):
+- {issues}
+
+Suggestions for Improvement:
+- {suggestions}
+
+Return the edits as JSON."""
+
+    return [
+        SystemMessage(content=EDITOR_PATCH_SYSTEM_PROMPT),
+        HumanMessage(content=prompt)
+    ]
+
+def _editor_update(state: AgentState, new_draft: str, details: dict) -> dict:
     # Increment iteration
     new_iter = state["iteration"] + 1
-    
-    # Update history
-    history = state.get("history", [])
-    history.append({
+
+    # Only the change is logged; app.history rebuilds the full text
+    step = {
         "step": "editor",
-        "content": new_draft,
-        "iteration": new_iter
-    })
-    
-    return {
+        **editor_content(state["draft"], new_draft),
+        "iteration": new_iter,
+        **details
+    }
+
+    update = {
         "draft": new_draft,
         "iteration": new_iter,
-        "history": history
+        "history": [step]
+    }
+    if state.get("critic_mode") == "incremental":
+        # Only the incremental critic diffs against the draft before the edit
+        update["previous_draft"] = state["draft"]
+    return update
+
+def _apply_editor_patch(state: AgentState, response) -> tuple:
+    """
+    Validates the model's edit patch and applies it. Raises PatchError if it does not apply.
+    """
+    try:
+        patch = EditPatch.model_validate_json(response.content)
+    except ValueError as e:
+        raise PatchError(f"invalid patch: {e}") from e
+    new_draft = apply_patch(state["draft"], patch)
+    return new_draft, {"edit_mode": "patch", "patch_size": patch_size(patch)}
+
+def _rewrite_details(fallback) -> dict:
+    if fallback is None:
+        return {}
+    # The rejected patch call counts too
+    return {"edit_mode": "rewrite", "patch_fallback": fallback, "llm_calls": 2}
+
+def _edit(state: AgentState, calls: list, temperature: float = 0.0, config=None) -> tuple:
+    """
+    Returns (new draft, step details). In 'patch' editor mode the model returns
+    edit operations that are applied locally; if they do not apply, the editor
+    falls back to a full rewrite.
+    """
+    fallback = None
+    if state.get("editor_mode") == "patch":
+        llm = get_llm(json_mode=True, node="editor", temperature=temperature)
+        response = invoke_llm(llm, _editor_patch_messages(state), calls, config)
+        try:
+            return _apply_editor_patch(state, response)
+        except PatchError as e:
+            fallback = str(e)
+
+    llm = get_llm(json_mode=False, max_tokens=_length_budget(state), node="editor", temperature=temperature)
+    response = invoke_llm(llm, _editor_messages(state), calls, config)
+    return response.content.strip(), _rewrite_details(fallback)
+
+async def _aedit(state: AgentState, calls: list, temperature: float = 0.0, config=None) -> tuple:
+    """
+    Async variant of _edit.
+    """
+    fallback = None
+    if state.get("editor_mode") == "patch":
+        llm = get_llm(json_mode=True, node="editor", temperature=temperature)
+        response = await ainvoke_llm(llm, _editor_patch_messages(state), calls, config)
+        try:
+            return _apply_editor_patch(state, response)
+        except PatchError as e:
+            fallback = str(e)
+
+    llm = get_llm(json_mode=False, max_tokens=_length_budget(state), node="editor", temperature=temperature)
+    response = await ainvoke_llm(llm, _editor_messages(state), calls, config)
+    return response.content.strip(), _rewrite_details(fallback)
+
+def editor_node(state: AgentState) -> dict:
+    """
+    Applies critique to the draft (see _edit).
+    With editor_candidates > 1 the best of several sampled revisions advances.
+    """
+    if _fan_out(state, "editor_candidates") > 1:
+        return _editor_from_candidates(state, _run_candidates(state, _edit, "editor_candidates"))
+    calls = []
+    new_draft, details = _edit(state, calls)
+    return _editor_update(state, new_draft, {**details, "calls": calls})
+
+async def aeditor_node(state: AgentState) -> dict:
+    """
+    Async variant of editor_node.
+    """
+    if _fan_out(state, "editor_candidates") > 1:
+        return _editor_from_candidates(state, await _arun_candidates(state, _aedit, "editor_candidates"))
+    calls = []
+    new_draft, details = await _aedit(state, calls)
+    return _editor_update(state, new_draft, {**details, "calls": calls})
+
+# Speculative candidates: with writer_candidates or editor_candidates above 1
+# the node samples that many drafts concurrently and the critic scores each of
+# them in concurrent calls. The best draft advances; its review is kept in
+# "candidate_review", so the next critic step records it instead of reviewing
+# the same draft again. The fan-out's calls are counted on the writer/editor step.
+
+# Candidate calls run side by side, so their tokens are not streamed as draft text
+CANDIDATE_CONFIG = {"tags": [TAG_NOSTREAM]}
+
+def _fan_out(state: AgentState, key: str) -> int:
+    return max(1, int(state.get(key) or 1))
+
+def _candidate_temperature(state: AgentState, index: int) -> float:
+    # The first candidate is the draft a single-candidate run would produce
+    return 0.0 if index == 0 else float(state.get("candidate_temperature", 0.8))
+
+def _draft_hash(draft: str) -> str:
+    return hashlib.sha256(draft.encode("utf-8")).hexdigest()
+
+def _candidate_review_input(state: AgentState, draft: str):
+    """
+    Returns (critique, None) when local rules already fail the draft, else (None, critic messages).
+    """
+    reviewed = {**state, "draft": draft}
+    rule_issues = _local_checks(reviewed)
+    if any(i.hard for i in rule_issues):
+        return to_critique(rule_issues), None
+    return None, _critic_messages(reviewed)
+
+def _unreviewed(error: CritiqueParseError) -> dict:
+    # Ranks last; the critic reviews the draft again if it is chosen anyway
+    return {"passed": False, "score": None, "parse_error": str(error)}
+
+def _candidate(state: AgentState, produce, index: int) -> dict:
+    calls, stats = [], new_parse_stats()
+    draft, details = produce(state, calls, _candidate_temperature(state, index), CANDIDATE_CONFIG)
+    review, messages = _candidate_review_input(state, draft)
+    if review is None:
+        try:
+            review = _review(get_llm(json_mode=True, node="critic"), messages, calls, stats, config=CANDIDATE_CONFIG)
+        except CritiqueParseError as e:
+            review = _unreviewed(e)
+    return {"draft": draft, "details": details, "review": review, "calls": calls, "parse": stats}
+
+async def _acandidate(state: AgentState, aproduce, index: int) -> dict:
+    calls, stats = [], new_parse_stats()
+    draft, details = await aproduce(state, calls, _candidate_temperature(state, index), CANDIDATE_CONFIG)
+    review, messages = _candidate_review_input(state, draft)
+    if review is None:
+        try:
+            review = await _areview(get_llm(json_mode=True, node="critic"), messages, calls, stats, config=CANDIDATE_CONFIG)
+        except CritiqueParseError as e:
+            review = _unreviewed(e)
+    return {"draft": draft, "details": details, "review": review, "calls": calls, "parse": stats}
+
+def _run_candidates(state: AgentState, produce, key: str) -> list:
+    count = _fan_out(state, key)
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(lambda index: _candidate(state, produce, index), range(count)))
+
+async def _arun_candidates(state: AgentState, aproduce, key: str) -> list:
+    count = _fan_out(state, key)
+    return list(await asyncio.gather(*(_acandidate(state, aproduce, index) for index in range(count))))
+
+def _rank(review: dict) -> tuple:
+    score = review.get("score")
+    return bool(review.get("passed")), score if isinstance(score, (int, float)) else 0.0
+
+def _choose(candidates: list) -> tuple:
+    """
+    Returns (best candidate, step fields): each candidate's verdict, the chosen
+    index and every call the fan-out made. Ties go to the earliest candidate.
+    """
+    chosen = max(range(len(candidates)), key=lambda i: _rank(candidates[i]["review"]))
+    calls = [call for candidate in candidates for call in candidate["calls"]]
+    stats = new_parse_stats()
+    for candidate in candidates:
+        for key, value in candidate["parse"].items():
+            stats[key] += value
+    fields = {
+        "candidates": [
+            {
+                "score": c["review"].get("score"),
+                "passed": c["review"].get("passed", False),
+                "llm_calls": len(c["calls"]),
+            }
+            for c in candidates
+        ],
+        "chosen": chosen,
+        "llm_calls": len(calls),
+        "calls": calls,
+        **_parse_fields(stats),
     }
+    return candidates[chosen], fields
+
+def _candidate_record(best: dict):
+    if "parse_error" in best["review"]:
+        return None
+    return {"draft_hash": _draft_hash(best["draft"]), "critique": best["review"]}
+
+def _writer_from_candidates(state: AgentState, candidates: list) -> dict:
+    best, fields = _choose(candidates)
+    update = _writer_update(state, best["draft"], fields["calls"])
+    update["history"][0].update(fields)
+    update["candidate_review"] = _candidate_record(best)
+    return update
+
+def _editor_from_candidates(state: AgentState, candidates: list) -> dict:
+    best, fields = _choose(candidates)
+    # A patch fallback's call count is part of the fan-out total
+    details = {key: value for key, value in best["details"].items() if key != "llm_calls"}
+    update = _editor_update(state, best["draft"], {**details, **fields})
+    update["candidate_review"] = _candidate_record(best)
+    return update
+
+# Fused critique-and-edit: one call returns the review and the revision, so an
+# iteration costs one round trip instead of two. History gets the same critic
+# and editor steps as the separate nodes produce.
+
+def _fused_messages(state: AgentState, rule_issues: list) -> list:
+    content = f"Task: {state['task']}\n\nCurrent Draft:\n{state['draft']}\n\nEvaluate strictly, then revise."
+    if rule_issues:
+        known = "\n- ".join(i.message for i in rule_issues)
+        content += f"\n\nAutomatic checks also found:\n- {known}"
+    return [
+        SystemMessage(content=CRITIC_SYSTEM_PROMPT + "\n" + FUSED_CRITIQUE_EDIT_PROMPT),
+        HumanMessage(content=content)
+    ]
+
+def _fused_update(state: AgentState, response, calls: list, rule_issues: list, policy) -> tuple:
+    """
+    Records the review and, unless the loop stops here, the revision.
+    Returns (update, needs_editor): needs_editor is True when the response
+    carried no usable revision and a separate Editor call must produce it.
+    """
+    stats = new_parse_stats()
+    stats["reviews"] += 1
+    data, repairs = decode_object(response.content)
+    revised = data.pop("revised_draft", None)
+    critique_data = validate_critique(data.get("critique", data))
+    if repairs:
+        stats["repaired"] += 1
+
+    step = {"step": "critic", "fused": True, "calls": calls, "parse": stats}
+    if rule_issues:
+        critique_data["issues"] = list(critique_data.get("issues", [])) + [i.message for i in rule_issues]
+        critique_data["suggestions"] = list(critique_data.get("suggestions", [])) + [i.suggestion for i in rule_issues]
+        if any(i.hard for i in rule_issues):
+            critique_data["passed"] = False
+        step["rule_issues"] = [i.rule for i in rule_issues]
+
+    update = _critic_record(state, critique_data, step)
+    reviewed = _merge(state, update)
+    if stop_reason(reviewed, policy, FUSED_ITERATION_CALLS) is not None:
+        return update, False
+    if not isinstance(revised, str) or not revised.strip():
+        return update, True
+
+    # The call was counted on the critic step
+    return _merge(update, _editor_update(reviewed, revised.strip(), {"fused": True, "llm_calls": 0})), False
+
+def _fused_fallback(state: AgentState, review: dict, calls: list, error: CritiqueParseError) -> dict:
+    """
+    Records the separate review that replaced an unusable fused reply; the
+    fused call is counted on it. The loop continues as in non-fused mode.
+    """
+    step = review["history"][0]
+    step["calls"] = calls + step.get("calls", [])
+    step["llm_calls"] = len(step["calls"])
+    step["fused_fallback"] = str(error)
+    stats = step.setdefault("parse", new_parse_stats())
+    stats["reviews"] += 1
+    stats["failures"] += 1
+    return review
+
+def critique_edit_node(state: AgentState, policy: StopPolicy = None) -> dict:
+    """
+    Reviews the draft and, if the loop continues, revises it in the same call.
+    """
+    if state["iteration"] >= state.get("max_iterations", 3):
+        # No edit can follow, so only the review is needed
+        return critic_node(state)
+
+    rule_issues = _local_checks(state)
+    calls = []
+    # The revision needs the editor's model; the review comes with it
+    llm = get_llm(json_mode=True, node="editor")
+    response = invoke_llm(llm, _fused_messages(state, rule_issues), calls)
+    try:
+        update, needs_editor = _fused_update(state, response, calls, rule_issues, policy)
+    except CritiqueParseError as e:
+        # Retrying the fused call would regenerate the whole revision; a review is cheaper
+        update = _fused_fallback(state, critic_node(state), calls, e)
+        needs_editor = stop_reason(_merge(state, update), policy, FUSED_ITERATION_CALLS) is None
+    if needs_editor:
+        update = _merge(update, editor_node(_merge(state, update)))
+    return update
+
+async def acritique_edit_node(state: AgentState, policy: StopPolicy = None) -> dict:
+    """
+    Async variant of critique_edit_node.
+    """
+    if state["iteration"] >= state.get("max_iterations", 3):
+        return await acritic_node(state)
+
+    rule_issues = _local_checks(state)
+    calls = []
+    # The revision needs the editor's model; the review comes with it
+    llm = get_llm(json_mode=True, node="editor")
+    response = await ainvoke_llm(llm, _fused_messages(state, rule_issues), calls)
+    try:
+        update, needs_editor = _fused_update(state, response, calls, rule_issues, policy)
+    except CritiqueParseError as e:
+        update = _fused_fallback(state, await acritic_node(state), calls, e)
+        needs_editor = stop_reason(_merge(state, update), policy, FUSED_ITERATION_CALLS) is None
+    if needs_editor:
+        update = _merge(update, await aeditor_node(_merge(state, update)))
+    return update
@@ -0,0 +1,134 @@
+# patches.py
+import difflib
+import re
+from typing import Dict, List
+
+from app.rubric import EditOperation, EditPatch
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+class PatchError(ValueError):
+    """
+    Raised when an edit patch does not apply cleanly to the draft.
+    """
+
+
+def split_paragraphs(text: str) -> List[str]:
+    return [p.strip() for p in _PARAGRAPH_BREAK.split(text) if p.strip()]
+
+
+def number_paragraphs(text: str) -> str:
+    """
+    Renders the draft with [N] paragraph markers, as referenced by edit operations.
+    """
+    return "\n\n".join(f"[{i}] {p}" for i, p in enumerate(split_paragraphs(text), start=1))
+
+
+def _check(op: EditOperation, count: int):
+    if op.op == "insert_after":
+        if op.paragraph > count:
+            raise PatchError(f"insert_after paragraph {op.paragraph} out of range (1..{count})")
+        if not op.text:
+            raise PatchError("insert_after requires 'text'")
+        return
+    if not 1 <= op.paragraph <= count:
+        raise PatchError(f"{op.op} paragraph {op.paragraph} out of range (1..{count})")
+    if op.op == "replace" and (not op.find or op.replace is None):
+        raise PatchError("replace requires 'find' and 'replace'")
+
+
+def apply_patch(draft: str, patch: EditPatch) -> str:
+    """
+    Applies edit operations to the draft. Paragraph numbers always refer to the
+    original draft, so operations are independent of the order they are listed in.
+    Raises PatchError if any operation does not apply; the draft is then unchanged.
+    """
+    paragraphs = split_paragraphs(draft)
+    count = len(paragraphs)
+    deleted = set()
+    inserts: Dict[int, List[str]] = {}
+
+    for op in patch.edits:
+        _check(op, count)
+        index = op.paragraph - 1
+        if op.op == "replace":
+            occurrences = paragraphs[index].count(op.find)
+            if occurrences != 1:
+                raise PatchError(
+                    f"replace text must occur exactly once in paragraph {op.paragraph} (found {occurrences})"
+                )
+            paragraphs[index] = paragraphs[index].replace(op.find, op.replace)
+        elif op.op == "delete":
+            deleted.add(index)
+        else:
+            inserts.setdefault(op.paragraph, []).append(op.text.strip())
+
+    result: List[str] = list(inserts.get(0, []))
+    for index, paragraph in enumerate(paragraphs):
+        if index not in deleted and paragraph.strip():
+            result.append(paragraph.strip())
+        result.extend(inserts.get(index + 1, []))
+    return "\n\n".join(result)
+
+
+def patch_size(patch: EditPatch) -> Dict[str, int]:
+    """
+    Size of a patch for reporting: number of operations and characters of new text.
+    """
+    chars = sum(len(op.replace or "") + len(op.text or "") for op in patch.edits)
+    return {"ops": len(patch.edits), "chars": chars}
+
+
+def changed_paragraphs(old: str, new: str) -> List[Dict[str, object]]:
+    """
+    Paragraph-level diff of two drafts. Each changed region is
+    {"start": first new paragraph number (1-based), "old": [...], "new": [...]}.
+    """
+    old_paragraphs = split_paragraphs(old)
+    new_paragraphs = split_paragraphs(new)
+    matcher = difflib.SequenceMatcher(a=old_paragraphs, b=new_paragraphs, autojunk=False)
+
+    regions = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        regions.append({
+            "start": j1 + 1,
+            "old": old_paragraphs[i1:i2],
+            "new": new_paragraphs[j1:j2],
+        })
+    return regions
+
+
+def text_delta(old: str, new: str) -> List[list]:
+    """
+    Difference between two versions as [start, end, text] replacements of
+    character ranges in `old`, found by a line-level diff.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    offsets = [0]
+    for line in old_lines:
+        offsets.append(offsets[-1] + len(line))
+
+    matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+    return [
+        [offsets[i1], offsets[i2], "".join(new_lines[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_delta(old: str, delta: List[list]) -> str:
+    """
+    Rebuilds the new version from `old` and a text_delta.
+    """
+    parts = []
+    position = 0
+    for start, end, text in delta:
+        parts.append(old[position:start])
+        parts.append(text)
+        position = end
+    parts.append(old[position:])
+    return "".join(parts)
@@ -35,6 +35,28 @@ Return JSON with these keys:
 - score: float (0.0 - 1.0)
 """
 
+CRITIC_INCREMENTAL_PROMPT = """You previously evaluated an earlier version of this text.
+The editor has since changed only the paragraphs listed below; all other paragraphs are unchanged.
+Re-assess the changed paragraphs and how they fit the text, starting from your previous evaluation:
+- keep previous issues and suggestions that still apply to unchanged parts,
+- drop the ones the changes resolved,
+- add new ones found in the changed paragraphs,
+- update passed, score, style_check and clarity_check for the whole text.
+Return the complete updated evaluation as JSON with the same keys as before.
+"""
+
+# Appended to the unchanged critic messages when a reply could not be parsed
+CRITIQUE_FIX_PROMPT = """Your previous reply could not be used: {error}.
+Reply again with only the JSON object described above, with every key, and nothing else."""
+
+FUSED_CRITIQUE_EDIT_PROMPT = """After evaluating, also revise the text yourself: fix every issue you found and
+apply your suggestions, as an expert editor would. Output only content in the revision, no commentary.
+
+Return JSON with exactly two keys:
+- critique: object with the evaluation keys listed above
+- revised_draft: string (the full revised text; repeat the text unchanged if it already passes)
+"""
+
 # Editor Prompts
 EDITOR_SYSTEM_PROMPT = """You are an expert editor. 
 Your goal is to improve the 'Draft' based on the 'Critique' provided.
@@ -43,3 +65,30 @@ Do not ignore feedback.
 Make the text better, clearer, and more aligned with the original task.
 Output ONLY the revised text.
 """
+
+EDITOR_PATCH_SYSTEM_PROMPT = """You are an expert editor.
+Your goal is to improve the 'Draft' based on the 'Critique' provided.
+Strictly follow the 'suggestions' in the critique. 
+Do not rewrite the whole text: return only the edits needed, as JSON.
+Paragraphs of the draft are numbered [1], [2], ...; the numbers always refer to the draft as given.
+
+Return JSON with one key "edits": a list of operations, each one of:
+- {"op": "replace", "paragraph": N, "find": "<exact text from paragraph N>", "replace": "<new text>"}
+- {"op": "insert_after", "paragraph": N, "text": "<new paragraph>"}  (N = 0 inserts before the first paragraph)
+- {"op": "delete", "paragraph": N}
+"find" must be copied exactly and occur only once in that paragraph. Do not include the [N] markers in any text.
+"""
+
+# Long-document Prompts
+CHUNK_TASK_SUFFIX = """
+
+(This is part {index} of {total} of a longer document. Work only on this part and keep its scope; do not add introductions or conclusions for the whole document.)"""
+
+STITCH_SYSTEM_PROMPT = """You are an expert editor joining independently revised parts of one document.
+You receive the last paragraph of one part and the first paragraph of the next part.
+Make the transition between them read naturally and keep terminology and style consistent.
+Change as little as possible and keep the meaning of both paragraphs.
+Return JSON with exactly these keys:
+- end: string (the revised last paragraph of the first part)
+- start: string (the revised first paragraph of the second part)
+"""
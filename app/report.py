@@ -1,19 +1,192 @@
 # report.py
+import gzip
+import io
 import json
 import os
-from typing import List, Any
+import threading
+from typing import Any, Dict, Iterator, List, Optional
 
-def save_report(history: List[dict], filename: str = "report.json"):
+from app.history import materialize_history
+
+def save_report(history: List[dict], filename: str = "report.json", quiet: bool = False):
     """
-    Saves the agent's history steps to a JSON file.
+    Saves the agent's history steps to a JSON file, with full editor drafts.
     """
     try:
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
-        print(f"\n[INFO] Report saved to {filename}")
+            json.dump(materialize_history(history), f, indent=2, ensure_ascii=False)
+        if not quiet:
+            print(f"\n[INFO] Report saved to {filename}")
     except Exception as e:
         print(f"[ERROR] Failed to save report: {e}")
 
+# JSONL reports: one history step per line, appended as each node finishes, so
+# a crash or timeout loses at most the step in progress. A ".gz" or ".zst"
+# suffix selects compression (zstd needs the optional `zstandard` package).
+
+def _compression(path: str) -> Optional[str]:
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith((".zst", ".zstd")):
+        return "zstd"
+    return None
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ValueError("zstd-compressed reports need the 'zstandard' package (pip install zstandard)") from e
+    return zstandard
+
+def _part_path(path: str, index: int) -> str:
+    """
+    Path of a rotated report part: report.jsonl.gz, report.1.jsonl.gz, report.2.jsonl.gz, ...
+    """
+    if index == 0:
+        return path
+    position = path.rfind(".jsonl")
+    if position == -1:
+        return f"{path}.{index}"
+    return f"{path[:position]}.{index}{path[position:]}"
+
+def report_parts(path: str) -> List[str]:
+    """
+    Existing parts of a (possibly rotated) JSONL report, oldest first.
+    """
+    parts = []
+    while os.path.exists(_part_path(path, len(parts))):
+        parts.append(_part_path(path, len(parts)))
+    return parts
+
+
+class JsonlReportWriter:
+    """
+    Appends history steps to a JSONL report as they are produced.
+
+    Every line is flushed (and fsynced with `fsync=True`) before write_step
+    returns. With `max_bytes`, a new part is started once the current one holds
+    that many bytes of uncompressed JSON, which keeps batch reports bounded.
+    Steps of different runs (e.g. batch documents) are told apart by `run`.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path: str, fsync: bool = False, max_bytes: Optional[int] = None):
+        self.path = path
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.compression = _compression(path)
+        if self.compression == "zstd":
+            _zstandard()
+        self._lock = threading.Lock()
+        self._raw = None
+        self._stream = None
+        # Continue after existing parts, so a rerun appends instead of overwriting
+        self._part = max(len(report_parts(path)) - 1, 0)
+        self._written = 0
+
+    def _open(self):
+        path = _part_path(self.path, self._part)
+        self._raw = open(path, "ab")
+        self._written = self._raw.tell() if self.compression is None else 0
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="ab")
+        elif self.compression == "zstd":
+            self._stream = _zstandard().ZstdCompressor().stream_writer(self._raw, closefd=False)
+        else:
+            self._stream = self._raw
+
+    def _close_locked(self):
+        if self._stream is not None and self._stream is not self._raw:
+            self._stream.close()
+        if self._raw is not None:
+            self._raw.close()
+        self._raw = self._stream = None
+
+    def write_step(self, step: Dict[str, Any], run: Optional[str] = None):
+        record = {"run": run, **step} if run is not None else step
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._raw is not None and self.max_bytes and self._written >= self.max_bytes:
+                self._close_locked()
+                self._part += 1
+            if self._raw is None:
+                self._open()
+            self._stream.write(data)
+            # gzip and zstd flush a complete block, so every written line can be decoded
+            self._stream.flush()
+            self._raw.flush()
+            if self.fsync:
+                os.fsync(self._raw.fileno())
+            self._written += len(data)
+
+    def close(self):
+        with self._lock:
+            self._close_locked()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_part(path: str):
+    compression = _compression(path)
+    if compression == "gzip":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8")
+    if compression == "zstd":
+        reader = _zstandard().ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+def _read_records(path: str) -> Iterator[dict]:
+    for part in report_parts(path):
+        with _open_part(part) as f:
+            try:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # partially written last line
+                    yield json.loads(line)
+            except (EOFError, ValueError, OSError):
+                # The tail of a part whose writer crashed cannot be decoded;
+                # every line flushed before it is kept.
+                continue
+
+def read_report(path: str, run: Optional[str] = None) -> List[dict]:
+    """
+    Reads a JSONL report (all rotated parts) and returns the steps in the
+    report.json format, with full editor drafts. With `run`, only that run's
+    steps are returned; otherwise steps keep their "run" tag.
+    """
+    runs: Dict[Any, List[dict]] = {}
+    for record in _read_records(path):
+        if run is not None:
+            if record.get("run") != run:
+                continue
+            record = {key: value for key, value in record.items() if key != "run"}
+        runs.setdefault(record.get("run"), []).append(record)
+
+    # Each run's editor deltas refer to that run's own drafts
+    steps: List[dict] = []
+    for records in runs.values():
+        steps.extend(materialize_history(records))
+    return steps
+
+def load_trace(path: str, run: Optional[str] = None) -> List[dict]:
+    """
+    Rebuilds the service `trace` of one run from a JSONL report.
+    """
+    from app.history import build_trace
+
+    return build_trace(read_report(path, run))
+
+def _print_calls(calls: List[dict]):
+    for call in calls:
+        tokens = f"{call.get('input_tokens') or 0}/{call.get('output_tokens') or 0} tokens"
+        cached = " (cached)" if call.get("cached") else ""
+        retries = f" | {call['retries']} retries" if call.get("retries") else ""
+        print(f"Model: {call.get('model')} | {call.get('latency_ms')} ms | {tokens}{cached}{retries}")
+
 def print_step_summary(step_data: dict):
     """
     Prints a readable summary of a step to the console.
@@ -41,3 +214,8 @@ def print_step_summary(step_data: dict):
         print("\n--- [EDITOR] Improving Text ---")
         iteration = step_data.get("iteration")
         print(f"Iteration: {iteration}")
+        size = step_data.get("patch_size")
+        if size:
+            print(f"Patch: {size['ops']} edits, {size['chars']} chars")
+
+    _print_calls(step_data.get("calls", []))
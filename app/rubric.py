@@ -1,5 +1,5 @@
 # rubric.py
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 
 class ValidationResult(BaseModel):
@@ -14,3 +14,13 @@ class ReportStep(BaseModel):
     step_type: str  # 'writer', 'critic', 'editor'
     content: str
     feedback: Optional[ValidationResult] = None
+
+class EditOperation(BaseModel):
+    op: Literal["replace", "insert_after", "delete"] = Field(..., description="Kind of edit")
+    paragraph: int = Field(..., ge=0, description="1-based paragraph number (0 = before the first paragraph, insert_after only)")
+    find: Optional[str] = Field(None, description="Exact text inside the paragraph to replace")
+    replace: Optional[str] = Field(None, description="Replacement text")
+    text: Optional[str] = Field(None, description="New paragraph text for insert_after")
+
+class EditPatch(BaseModel):
+    edits: List[EditOperation] = Field(default_factory=list, description="Edit operations against the numbered draft")
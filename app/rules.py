@@ -0,0 +1,224 @@
+# rules.py
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional
+
+# Output token budget per word of target length. Cyrillic text costs about
+# 2-3 tokens per word, so this leaves headroom for the longest allowed answer.
+TOKENS_PER_WORD = 3.0
+TOKEN_MARGIN = 100
+
+# A single target ("(120 слов)") is treated as soft and allows this deviation
+SINGLE_TARGET_TOLERANCE = 0.2
+# An explicit range ("120–150 слов") is hard, with a little slack for counting differences
+RANGE_TOLERANCE = 0.05
+
+_WORDS = r"(?:слов[а-я]*|words?)"
+_RANGE = re.compile(rf"(\d+)\s*(?:-|–|—|to|до)\s*(\d+)\s*{_WORDS}", re.IGNORECASE)
+_MAX = re.compile(rf"(?:не более|не больше|до|максимум|up to|at most|no more than|max(?:imum)?)\s*(\d+)\s*{_WORDS}", re.IGNORECASE)
+_MIN = re.compile(rf"(?:не менее|не меньше|от|минимум|at least|min(?:imum)?)\s*(\d+)\s*{_WORDS}", re.IGNORECASE)
+_SINGLE = re.compile(rf"(\d+)\s*{_WORDS}", re.IGNORECASE)
+# A length that applies to parts of the text ("10 tips, each up to 20 words",
+# "2 words in the title", "5 пунктов по 20 слов") says nothing about the whole
+_PER_ITEM = re.compile(
+    r"\b(?:each|per|every|title|heading|headline|кажд[а-я]*|заголов[а-я]*|по\s+\d+)\b",
+    re.IGNORECASE,
+)
+_CLAUSE_BREAK = re.compile(r"[,;:.!?\n]")
+
+_WORD = re.compile(r"\w+(?:[-'’]\w+)*")
+_INTERJECTION = r"(?:sure|certainly|of course|конечно|разумеется)"
+# Only a whole lead-in line counts: "Sure!" alone, or "Here is the revised
+# text:" / "Конечно! Вот исправленный текст:" ending the line. "Here is how
+# graphs work. ..." and "Конечно, ..." start the content itself.
+_FILLER_START = re.compile(
+    rf"^\s*(?:{_INTERJECTION}\s*[,!.]?"
+    rf"|(?:{_INTERJECTION}\s*[,!.]\s*)?"
+    r"(?:here is|here's|here are|вот (?:ваш |исправленный |готовый )?текст|ниже (?:представлен|приведен))"
+    r"[^\n.!?]*[:.]?)[ \t]*(?:\n|$)",
+    re.IGNORECASE,
+)
+# Only a closing line in which the assistant offers more work counts: "Please
+# let me know if you have any questions." ends a normal letter.
+_FILLER_END = re.compile(
+    r"(?:if you(?:'d| would)? (?:like|want|need)(?: it)?,? I (?:can|could)|would you like me to|"
+    r"let me know if you(?:'d| would)? (?:like|want) me to|I can also (?:shorten|expand|rewrite|adjust)|"
+    r"если (?:нужно|хотите|потребуется),? (?:я )?(?:могу|смогу)|хотите, (?:я|чтобы я)|"
+    r"могу также (?:сократить|расширить|переписать|доработать))[^\n]*\s*$",
+    re.IGNORECASE,
+)
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+# Paragraph structure is expected once a text is longer than this
+PARAGRAPH_MIN_WORDS = 120
+# A content word is "overused" above this share of all words
+OVERUSE_SHARE = 0.04
+OVERUSE_MIN_COUNT = 5
+
+
+@dataclass(frozen=True)
+class LengthConstraint:
+    min_words: Optional[int] = None
+    max_words: Optional[int] = None
+    hard: bool = False          # explicit range/limit in the task
+
+
+@dataclass(frozen=True)
+class RuleIssue:
+    rule: str
+    message: str
+    suggestion: str
+    hard: bool                  # hard failures skip the LLM critic
+
+
+def _clause(task: str, match) -> str:
+    breaks = [m.start() for m in _CLAUSE_BREAK.finditer(task)]
+    start = max((b for b in breaks if b < match.start()), default=-1) + 1
+    end = min((b for b in breaks if b >= match.end()), default=len(task))
+    return task[start:end]
+
+
+def parse_length(task: str) -> Optional[LengthConstraint]:
+    """
+    Extracts a word-count constraint from the task text, e.g. "120–150 слов",
+    "не более 200 слов", "at least 300 words" or "(120 слов)". Returns None
+    when the task has several lengths or one that applies per item: such a
+    limit is not one for the whole text.
+    """
+    lengths = list(_SINGLE.finditer(task))
+    if len(lengths) != 1 or _PER_ITEM.search(_clause(task, lengths[0])):
+        return None
+    match = _RANGE.search(task)
+    if match:
+        low, high = sorted((int(match.group(1)), int(match.group(2))))
+        return LengthConstraint(
+            min_words=int(low * (1 - RANGE_TOLERANCE)),
+            max_words=int(high * (1 + RANGE_TOLERANCE) + 0.5),
+            hard=True,
+        )
+    match = _MAX.search(task)
+    if match:
+        return LengthConstraint(max_words=int(int(match.group(1)) * (1 + RANGE_TOLERANCE) + 0.5), hard=True)
+    match = _MIN.search(task)
+    if match:
+        return LengthConstraint(min_words=int(int(match.group(1)) * (1 - RANGE_TOLERANCE)), hard=True)
+    match = _SINGLE.search(task)
+    if match:
+        target = int(match.group(1))
+        return LengthConstraint(
+            min_words=int(target * (1 - SINGLE_TARGET_TOLERANCE)),
+            max_words=int(target * (1 + SINGLE_TARGET_TOLERANCE) + 0.5),
+        )
+    return None
+
+
+def length_constraint(task: str, share: float = 1.0) -> Optional[LengthConstraint]:
+    """
+    The task's length constraint for a run that writes `share` of the text
+    (a chunk of a long document, see app.chunking). A chunk gets its share of
+    the target as a soft constraint: the split is by structure, not by size.
+    """
+    constraint = parse_length(task)
+    if constraint is None or share >= 1:
+        return constraint
+    return LengthConstraint(
+        min_words=None if constraint.min_words is None else int(constraint.min_words * share),
+        max_words=None if constraint.max_words is None else int(constraint.max_words * share + 0.5),
+    )
+
+
+def max_tokens_for(task: str, share: float = 1.0) -> Optional[int]:
+    """
+    Output token limit for writer/editor calls derived from the task's length
+    target. Only a hard limit caps the output; a soft target is left to the critic.
+    """
+    constraint = length_constraint(task, share)
+    if constraint is None or not constraint.hard or constraint.max_words is None:
+        return None
+    return int(constraint.max_words * TOKENS_PER_WORD) + TOKEN_MARGIN
+
+
+def count_words(text: str) -> int:
+    return len(_WORD.findall(text))
+
+
+def check_draft(task: str, draft: str, share: float = 1.0) -> List[RuleIssue]:
+    """
+    Runs the local rules against a draft. Pure Python, no LLM calls.
+    `share` is the part of the task's length target the draft covers.
+    """
+    issues: List[RuleIssue] = []
+    words = _WORD.findall(draft)
+
+    constraint = length_constraint(task, share)
+    if constraint is not None:
+        count = len(words)
+        if constraint.max_words is not None and count > constraint.max_words:
+            issues.append(RuleIssue(
+                "length",
+                f"Text has {count} words, above the limit of {constraint.max_words}.",
+                f"Shorten the text to at most {constraint.max_words} words.",
+                constraint.hard,
+            ))
+        elif constraint.min_words is not None and count < constraint.min_words:
+            issues.append(RuleIssue(
+                "length",
+                f"Text has {count} words, below the minimum of {constraint.min_words}.",
+                f"Expand the text to at least {constraint.min_words} words.",
+                constraint.hard,
+            ))
+
+    if _FILLER_START.search(draft) or _FILLER_END.search(draft):
+        issues.append(RuleIssue(
+            "filler",
+            "Text contains conversational filler around the content.",
+            "Remove introductory/closing remarks and output only the content itself.",
+            True,
+        ))
+
+    lowered = [w.lower() for w in words]
+    duplicates = sorted({a for a, b in zip(lowered, lowered[1:]) if a == b and not a.isdigit()})
+    if duplicates:
+        issues.append(RuleIssue(
+            "repeated_words",
+            f"Immediately repeated words: {', '.join(duplicates)}.",
+            "Remove the accidental word repetitions.",
+            False,
+        ))
+
+    if len(words) >= 50:
+        counts = Counter(w for w in lowered if len(w) >= 5)
+        overused = [w for w, n in counts.most_common(3) if n >= OVERUSE_MIN_COUNT and n / len(words) > OVERUSE_SHARE]
+        if overused:
+            issues.append(RuleIssue(
+                "overused_words",
+                f"Overused words: {', '.join(overused)}.",
+                "Vary the wording and use synonyms for the repeated words.",
+                False,
+            ))
+
+    paragraphs = [p for p in _PARAGRAPH_BREAK.split(draft) if p.strip()]
+    if len(words) > PARAGRAPH_MIN_WORDS and len(paragraphs) < 2:
+        issues.append(RuleIssue(
+            "structure",
+            "Text has no paragraph structure.",
+            "Split the text into paragraphs with a clear thesis, body and conclusion.",
+            False,
+        ))
+
+    return issues
+
+
+def to_critique(issues: List[RuleIssue]) -> dict:
+    """
+    Converts rule failures into a ValidationResult-compatible critique.
+    """
+    return {
+        "passed": False,
+        "issues": [i.message for i in issues],
+        "suggestions": [i.suggestion for i in issues],
+        "style_check": "Not evaluated: failed local checks.",
+        "clarity_check": "Not evaluated: failed local checks.",
+        "score": 0.0,
+    }
@@ -0,0 +1,510 @@
+# server.py
+"""
+Async HTTP service on top of the service layer, for callers that cannot or
+should not spawn the CLI. Runs share one process, so compiled graphs and
+pooled LLM clients are reused across requests.
+
+    python -m app.server --port 8080 --workers 4 --max-queue 100
+
+Endpoints (JSON unless noted):
+    POST   /jobs               submit {"task", "mode", "user_text", "max_iterations", "options", "graph", "run_id"}
+                               -> 202 {"id", "status"}; 429 with Retry-After when the queue is full
+    GET    /jobs/<id>          status
+    GET    /jobs/<id>/result   result once finished (409 before that)
+    GET    /jobs/<id>/stream   text/event-stream of service events, replayed from the start
+    DELETE /jobs/<id>          cancel a queued or running job (a shared job keeps
+                               running until every submitter cancelled it)
+    GET    /health             queue, worker and coalescing counters
+
+Identical submissions share one job: while it is queued or running, and for
+a short time after it finished (see app.coalesce), they get the same job id.
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import os
+import time
+import uuid
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+
+# Add project root to sys path to allow running as module
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.checkpoints import get_checkpoint_store
+from app.coalesce import DEFAULT_MEMO_TTL, RunCoalescer, run_key
+from app.graph import GraphConfig, precompile_graphs
+from app.service import RESULT, astream_text_editor_agent
+from app.state import RunOptions
+from app.stopping import StopPolicy
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUE = 100
+DEFAULT_RESULT_TTL = 3600.0         # seconds a finished job stays queryable
+MAX_BODY_BYTES = 10 * 1024 * 1024
+# Limits on what one request may cost: every iteration and every candidate is
+# one or more LLM calls paid by the service's API key
+MAX_ITERATIONS = 10
+MAX_CANDIDATES = 5
+
+# Allowed values of request fields, beyond their type: (low, high) or a tuple of choices
+_LIMITS = {
+    "max_iterations": (1, MAX_ITERATIONS),
+    "options.editor_mode": ("rewrite", "patch"),
+    "options.critic_mode": ("full", "incremental"),
+    "options.writer_candidates": (1, MAX_CANDIDATES),
+    "options.editor_candidates": (1, MAX_CANDIDATES),
+    "options.candidate_temperature": (0.0, 2.0),
+    "options.length_share": (0.0, 1.0),
+    "graph.stop_policy.min_edit_cycles": (0, MAX_ITERATIONS),
+    "graph.stop_policy.target_score": (0.0, 1.0),
+    "graph.stop_policy.plateau_epsilon": (0.0, 1.0),
+    "graph.stop_policy.plateau_rounds": (1, MAX_ITERATIONS),
+    "graph.stop_policy.max_llm_calls": (1, 1000),
+}
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            409: "Conflict", 413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+class QueueFull(Exception):
+    """
+    Raised when a job is submitted while the queue is at capacity.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    id: str
+    task: str
+    mode: str
+    user_text: str
+    max_iterations: int
+    options: RunOptions
+    graph_config: GraphConfig
+    run_id: Optional[str] = None    # checkpointed run to start or resume (see app.checkpoints)
+    status: str = QUEUED
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+    runner: Optional[asyncio.Task] = None
+    key: str = ""                   # run_key of the inputs, for coalescing
+    followers: int = 0              # identical submissions sharing this job
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error,
+        }
+
+    def publish(self, event: Dict[str, Any]):
+        self.events.append(event)
+        # Wake current stream readers; the next wait uses a fresh event
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+def parse_job_request(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validates a submit request. Raises ValueError with a client-facing message.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("request body must be a JSON object")
+    task = body.get("task")
+    if not isinstance(task, str) or not task.strip():
+        raise ValueError("'task' is required")
+    mode = body.get("mode", "generate")
+    if mode not in ("generate", "revise"):
+        raise ValueError("'mode' must be 'generate' or 'revise'")
+    user_text = body.get("user_text", "") or ""
+    if not isinstance(user_text, str):
+        raise ValueError("'user_text' must be a string")
+    if mode == "revise" and not user_text:
+        raise ValueError("'user_text' is required for revise mode")
+    max_iterations = _checked("max_iterations", body.get("max_iterations", 3), int)
+
+    options = _dataclass_from(RunOptions, body.get("options") or {}, "options")
+    graph = dict(body.get("graph") or {})
+    policy = _dataclass_from(StopPolicy, graph.pop("stop_policy", None) or {}, "graph.stop_policy")
+    graph_config = _dataclass_from(GraphConfig, {**graph, "stop_policy": policy}, "graph")
+    run_id = body.get("run_id")
+    if run_id is not None:
+        if not isinstance(run_id, str) or not run_id:
+            raise ValueError("'run_id' must be a non-empty string")
+        if get_checkpoint_store() is None:
+            raise ValueError("'run_id' needs a checkpoint store (start the service with CHECKPOINT_PATH)")
+    return {
+        "task": task,
+        "mode": mode,
+        "user_text": user_text,
+        "max_iterations": max_iterations,
+        "options": options,
+        "graph_config": graph_config,
+        "run_id": run_id,
+    }
+
+
+def _dataclass_from(cls, values: Dict[str, Any], name: str):
+    if not isinstance(values, dict):
+        raise ValueError(f"'{name}' must be an object")
+    allowed = {f.name for f in fields(cls)}
+    unknown = set(values) - allowed
+    if unknown:
+        raise ValueError(f"unknown '{name}' fields: {', '.join(sorted(unknown))}")
+    hints = get_type_hints(cls)
+    return cls(**{key: _checked(f"{name}.{key}", value, hints[key]) for key, value in values.items()})
+
+
+def _checked(name: str, value: Any, hint) -> Any:
+    """
+    Returns `value` if it matches the field type `hint` and the _LIMITS of
+    `name`; raises ValueError otherwise. Values end up in GraphConfig, which
+    must stay hashable, so only scalars of the declared type are accepted.
+    """
+    if get_origin(hint) is Union:
+        if value is None and type(None) in get_args(hint):
+            return value
+        hint = next(arg for arg in get_args(hint) if arg is not type(None))
+    valid = isinstance(value, (int, float) if hint is float else hint)
+    # bool is an int subclass, but true is not an iteration count
+    if not valid or (isinstance(value, bool) and hint is not bool):
+        raise ValueError(f"'{name}' must be of type {hint.__name__}")
+    limits = _LIMITS.get(name)
+    if limits is None:
+        return value
+    if isinstance(value, str):
+        if value not in limits:
+            raise ValueError(f"'{name}' must be one of: {', '.join(limits)}")
+    elif not limits[0] <= value <= limits[1]:
+        raise ValueError(f"'{name}' must be between {limits[0]} and {limits[1]}")
+    return value
+
+
+class JobManager:
+    """
+    Bounded job queue served by a fixed number of worker tasks.
+    Must be started (and used) inside a running event loop. Identical
+    submissions share one job through `coalescer` (see app.coalesce).
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE,
+                 result_ttl: float = DEFAULT_RESULT_TTL, memo_ttl: float = DEFAULT_MEMO_TTL,
+                 coalescer: Optional[RunCoalescer] = None):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.result_ttl = result_ttl
+        # Jobs are bound to this manager's event loop, so the coalescer is its own by default
+        self.coalescer = coalescer or RunCoalescer(ttl=memo_ttl)
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running = 0
+        self._durations: List[float] = []
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for job in self.jobs.values():
+            if job.runner is not None and not job.runner.done():
+                job.runner.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": self._running,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "jobs": len(self.jobs),
+            **{name: value for name, value in self.coalescer.stats().items()
+               if name in ("coalesced", "memo_hits", "llm_calls_saved")},
+        }
+
+    def retry_after(self) -> int:
+        """
+        Seconds until a queue slot is likely free, from recent run durations.
+        """
+        recent = self._durations[-20:]
+        average = sum(recent) / len(recent) if recent else 30.0
+        # Workers finish a run every average/workers seconds, each freeing a slot
+        return max(1, math.ceil(average / self.workers))
+
+    def submit(self, request: Dict[str, Any]) -> Job:
+        self._purge()
+        # A checkpointed run must not execute twice at once, whatever the inputs
+        key = f"run:{request['run_id']}" if request.get("run_id") else run_key(
+            request["task"], request["mode"], request["user_text"], request["max_iterations"],
+            request["graph_config"], request["options"],
+        )
+
+        def enqueue() -> Job:
+            job = Job(id=uuid.uuid4().hex, key=key, **request)
+            try:
+                self._queue.put_nowait(job)
+            except asyncio.QueueFull:
+                raise QueueFull(self.retry_after()) from None
+            return job
+
+        job, leader = self.coalescer.share(key, enqueue)
+        if leader:
+            self.jobs[job.id] = job
+        return job
+
+    def cancel(self, job: Job) -> bool:
+        """
+        Withdraws one submitter from a queued or running job. The run itself is
+        cancelled only when no other submitter shares it (see RunCoalescer.share).
+        Returns False if it already finished.
+        """
+        if job.status in FINISHED:
+            return False
+        if job.followers > 0:
+            job.followers -= 1
+            return True
+        if job.runner is not None:
+            job.runner.cancel()
+        else:
+            # Still queued: the worker that picks it up skips it
+            self._finish(job, CANCELLED)
+        return True
+
+    def _finish(self, job: Job, status: str, result=None, error: Optional[str] = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished = time.time()
+        job.publish({"type": "status", "status": status})
+
+    def _purge(self):
+        cutoff = time.time() - self.result_ttl
+        for job_id, job in list(self.jobs.items()):
+            if job.status in FINISHED and job.finished < cutoff:
+                del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == QUEUED:
+                    job.runner = asyncio.create_task(self._run(job))
+                    await asyncio.wait([job.runner])
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status = RUNNING
+        job.started = time.time()
+        job.publish({"type": "status", "status": RUNNING})
+        self._running += 1
+        try:
+            async for event in astream_text_editor_agent(
+                job.task, job.mode, job.user_text, job.max_iterations,
+                graph_config=job.graph_config, options=job.options, thread_id=job.run_id,
+            ):
+                if event["type"] == RESULT:
+                    job.result = event["result"]
+                else:
+                    job.publish(event)
+        except asyncio.CancelledError:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            self._finish(job, FAILED, error=str(e))
+        else:
+            self._durations.append(time.time() - job.started)
+            self._finish(job, DONE, result=job.result)
+            self.coalescer.finish(job)
+        finally:
+            self._running -= 1
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        raise ConnectionError("empty request")
+    method, path, _ = request_line.split(" ", 2)
+    headers: Dict[str, str] = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0) or 0)
+    if length > MAX_BODY_BYTES:
+        raise OverflowError
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path.split("?", 1)[0], headers, body
+
+
+def _response(status: int, payload: Any = None, headers: Optional[Dict[str, str]] = None) -> bytes:
+    body = json.dumps(payload if payload is not None else {}, ensure_ascii=False).encode("utf-8")
+    lines = [
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        "Connection: close",
+    ]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+class EditorServer:
+    """
+    Minimal HTTP/1.1 front end (one request per connection) for a JobManager.
+    """
+
+    def __init__(self, manager: JobManager):
+        self.manager = manager
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, path, _, body = await _read_request(reader)
+            except OverflowError:
+                writer.write(_response(413, {"error": "request body too large"}))
+                return
+            except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+                return
+            await self._route(method, path, body, writer)
+        except Exception as e:
+            writer.write(_response(500, {"error": str(e)}))
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _route(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter):
+        parts = [p for p in path.split("/") if p]
+
+        if parts == ["health"] and method == "GET":
+            writer.write(_response(200, self.manager.stats()))
+            return
+
+        if parts == ["jobs"]:
+            if method != "POST":
+                writer.write(_response(405, {"error": "use POST to submit a job"}))
+                return
+            try:
+                request = parse_job_request(json.loads(body or b"{}"))
+            except (ValueError, TypeError) as e:
+                writer.write(_response(400, {"error": str(e)}))
+                return
+            try:
+                job = self.manager.submit(request)
+            except QueueFull as e:
+                writer.write(_response(429, {"error": str(e)}, {"Retry-After": str(e.retry_after)}))
+                return
+            writer.write(_response(202, job.describe()))
+            return
+
+        if len(parts) not in (2, 3) or parts[0] != "jobs":
+            writer.write(_response(404, {"error": "not found"}))
+            return
+        job = self.manager.jobs.get(parts[1])
+        if job is None:
+            writer.write(_response(404, {"error": "unknown job"}))
+            return
+        action = parts[2] if len(parts) == 3 else None
+
+        if action is None and method == "GET":
+            writer.write(_response(200, job.describe()))
+        elif action is None and method == "DELETE":
+            if not self.manager.cancel(job):
+                writer.write(_response(409, {"error": f"job already {job.status}", **job.describe()}))
+            else:
+                writer.write(_response(200, job.describe()))
+        elif action == "result" and method == "GET":
+            if job.status == DONE:
+                writer.write(_response(200, job.result))
+            else:
+                writer.write(_response(409, {"error": f"job is {job.status}", **job.describe()}))
+        elif action == "stream" and method == "GET":
+            await self._stream(job, writer)
+        else:
+            writer.write(_response(405, {"error": "method not allowed"}))
+
+    async def _stream(self, job: Job, writer: asyncio.StreamWriter):
+        writer.write((
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/event-stream\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("latin-1"))
+        sent = 0
+        while True:
+            changed = job.changed
+            for event in job.events[sent:]:
+                writer.write(f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            sent = len(job.events)
+            await writer.drain()
+            if job.status in FINISHED:
+                if job.status == DONE:
+                    event = {"type": RESULT, "result": job.result}
+                    writer.write(f"event: {RESULT}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                return
+            await changed.wait()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8080, workers: int = DEFAULT_WORKERS,
+                max_queue: int = DEFAULT_MAX_QUEUE, ready: Optional[asyncio.Future] = None):
+    """
+    Runs the HTTP service until cancelled. `ready`, if given, receives the bound (host, port).
+    """
+    precompile_graphs()
+    store = get_checkpoint_store()
+    if store is not None:
+        precompile_graphs(checkpointer=store)
+    manager = JobManager(workers, max_queue)
+    manager.start()
+    server = await asyncio.start_server(EditorServer(manager).handle, host, port)
+    if ready is not None:
+        ready.set_result(server.sockets[0].getsockname()[:2])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await manager.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI Text Editor Agent HTTP service")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Runs executed concurrently")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="Queued jobs before 429 responses")
+    args = parser.parse_args()
+
+    print(f"[START] Serving on http://{args.host}:{args.port} ({args.workers} workers, queue {args.max_queue})")
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_queue))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,32 @@
 # service.py
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
 
-from app.graph import build_graph
+import time
+from dataclasses import asdict
 
+from app.checkpoints import get_checkpoint_store
+from app.graph import GraphConfig, get_graph
+from app.history import RunResult, build_trace
+from app.metrics import run_metrics
+from app.nodes import acritic_node, critic_node
+from app.state import RunOptions
+from app.stopping import stop_reason
 
-def run_text_editor_agent(task: str, mode: str, user_text: str, max_iterations: int = 3) -> Dict[str, Any]:
-    """
-    Service layer: runs the LangGraph agent and returns a UI/CLI-friendly result.
 
-    Returns:
-      {
-        "final_text": str,
-        "iterations": int,
-        "stopped_by": "passed" | "max_iterations",
-        "trace": [
-            {"iteration": int, "draft": str, "critic": dict|None, "edited": str|None},
-            ...
-        ],
-        "raw_history": list
-      }
+def build_initial_state(
+    task: str,
+    mode: str,
+    user_text: str,
+    max_iterations: int = 3,
+    options: Optional[RunOptions] = None,
+) -> Dict[str, Any]:
     """
-    initial_state: Dict[str, Any] = {
+    Returns the graph input for one run.
+    """
+    return {
+        **asdict(options or RunOptions()),
         "task": task,
         "mode": mode,
         "user_text": user_text or "",
@@ -32,97 +36,259 @@ def run_text_editor_agent(task: str, mode: str, user_text: str, max_iterations:
         "history": [],
         "max_iterations": max_iterations,
         "quality_passed": False,
+        "step_finished_at": time.time(),
     }
 
-    app = build_graph()
-    final_state: Dict[str, Any] = app.invoke(initial_state)
 
+def build_result(
+    final_state: Dict[str, Any],
+    max_iterations: int = 3,
+    graph_config: Optional[GraphConfig] = None,
+) -> Dict[str, Any]:
+    """
+    Converts the final graph state into the service result (see run_text_editor_agent).
+    `stopped_by` is evaluated with the same stop policy and iteration cost the graph used.
+    """
+    graph_config = graph_config or GraphConfig()
     raw_history: List[dict] = final_state.get("history", [])
 
-    # Build a clean trace for UI:
-    # Iteration 0: draft from writer -> critic -> edited (from editor)
-    # Iteration 1..N: draft (previous edited) -> critic -> edited ...
-    trace: List[Dict[str, Any]] = []
-    current: Dict[str, Any] | None = None
-
-    last_draft: str = ""
-    current_iteration: int = 0
-
-    for step in raw_history:
-        step_type = step.get("step")
-
-        if step_type == "writer":
-            # Start iteration 0 with draft from writer
-            current_iteration = 0
-            last_draft = step.get("content", "")
-            current = {
-                "iteration": current_iteration,
-                "draft": last_draft,
-                "critic": None,
-                "edited": None,
-            }
-            trace.append(current)
-
-        elif step_type == "critic":
-            # Attach critic feedback to the current block (or create one if missing)
-            feedback = step.get("feedback") or step.get("critique") or {}
-            if current is None:
-                current = {
-                    "iteration": current_iteration,
-                    "draft": last_draft,
-                    "critic": None,
-                    "edited": None,
-                }
-                trace.append(current)
-            current["critic"] = feedback
-
-        elif step_type == "editor":
-            # Editor produces an improved draft and increments iteration
-            edited_text = step.get("content", "")
-            new_iter = step.get("iteration", current_iteration + 1)
-
-            # Ensure we have a current block to attach "edited"
-            if current is None:
-                current = {
-                    "iteration": current_iteration,
-                    "draft": last_draft,
-                    "critic": None,
-                    "edited": None,
-                }
-                trace.append(current)
-
-            current["edited"] = edited_text
-
-            # Prepare next cycle block: draft becomes the edited text
-            last_draft = edited_text
-            current_iteration = new_iter
-
-            current = {
-                "iteration": current_iteration,
-                "draft": last_draft,
-                "critic": None,
-                "edited": None,
-            }
-            trace.append(current)
-
-        else:
-            # Unknown step type -> ignore safely
-            continue
-
-    # Remove trailing empty block if it has no critic and no edited (can happen in edge cases)
-    while trace and (trace[-1].get("critic") is None and trace[-1].get("edited") is None):
-        trace.pop()
-
     iterations = int(final_state.get("iteration", 0))
     max_iter_final = int(final_state.get("max_iterations", max_iterations))
-    quality_passed = bool(final_state.get("quality_passed", False))
 
-    stopped_by = "passed" if (quality_passed and iterations < max_iter_final) else "max_iterations"
+    stop_state = {**final_state, "iteration": iterations, "max_iterations": max_iter_final}
+    stopped_by = stop_reason(stop_state, graph_config.stop_policy, graph_config.iteration_calls) or "max_iterations"
 
-    return {
+    return RunResult({
         "final_text": final_state.get("draft", ""),
         "iterations": iterations,
         "stopped_by": stopped_by,
-        "trace": trace,
         "raw_history": raw_history,
-    }
+        "metrics": run_metrics(raw_history),
+    })
+
+
+# Receives each history step as its node finishes (e.g. JsonlReportWriter.write_step)
+StepCallback = Callable[[Dict[str, Any]], None]
+# Enough to see each node's history entries and the final state
+STEP_STREAM_MODES = ["updates", "values"]
+
+
+def _start(
+    initial_state: Dict[str, Any],
+    graph_config: Optional[GraphConfig],
+    thread_id: Optional[str],
+) -> tuple:
+    """
+    Returns (compiled graph, graph input, run kwargs) for one run.
+
+    With a thread id the run is checkpointed after every node (see
+    app.checkpoints). If the store already holds that thread, the graph input is
+    None: an unfinished run resumes after its last completed node and a
+    finished one returns its final state without running any node.
+    """
+    if thread_id is None:
+        return get_graph(graph_config), initial_state, {}
+    store = get_checkpoint_store()
+    if store is None:
+        raise ValueError("Resumable runs need a checkpoint store (CHECKPOINT_PATH or configure_checkpoints)")
+    app = get_graph(graph_config, store)
+    run_kwargs = {"config": {"configurable": {"thread_id": thread_id}}, "durability": "sync"}
+    started = store.get_tuple(run_kwargs["config"]) is not None
+    return app, None if started else initial_state, run_kwargs
+
+
+def run_text_editor_agent(
+    task: str,
+    mode: str,
+    user_text: str,
+    max_iterations: int = 3,
+    graph_config: Optional[GraphConfig] = None,
+    options: Optional[RunOptions] = None,
+    on_step: Optional[StepCallback] = None,
+    thread_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Service layer: runs the LangGraph agent and returns a UI/CLI-friendly result.
+    The compiled graph for `graph_config` is shared across runs (see app.graph.get_graph);
+    `options` are per-run switches such as the editor mode (see app.state.RunOptions).
+    `on_step` receives every history step as soon as it is produced, so reports
+    can be written incrementally (see app.report.JsonlReportWriter).
+    With `thread_id` the run is checkpointed and calling again with the same id
+    resumes it after its last completed node (see app.checkpoints).
+
+    Returns:
+      {
+        "final_text": str,
+        "iterations": int,
+        "stopped_by": "passed" | "max_iterations" | "target_score" | "plateau" | "budget",
+        "trace": [            # built from raw_history on first use, see app.history.RunResult
+            {"iteration": int, "draft": str, "critic": dict|None, "edited": str|None},
+            ...
+        ],
+        "raw_history": list,  # compact: editor steps hold deltas, see app.history.materialize_history
+        "metrics": dict       # per-run and per-node time, tokens and retries, see app.metrics.run_metrics
+      }
+    """
+    initial_state = build_initial_state(task, mode, user_text, max_iterations, options)
+    app, graph_input, run_kwargs = _start(initial_state, graph_config, thread_id)
+    if on_step is None:
+        final_state: Dict[str, Any] = app.invoke(graph_input, **run_kwargs)
+    else:
+        translator = _StreamTranslator(on_step)
+        for stream_mode, payload in app.stream(graph_input, stream_mode=STEP_STREAM_MODES, **run_kwargs):
+            translator.events(stream_mode, payload)
+        final_state = translator.state
+    return build_result(final_state, max_iterations, graph_config)
+
+
+async def arun_text_editor_agent(
+    task: str,
+    mode: str,
+    user_text: str,
+    max_iterations: int = 3,
+    graph_config: Optional[GraphConfig] = None,
+    options: Optional[RunOptions] = None,
+    on_step: Optional[StepCallback] = None,
+    thread_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Async variant of run_text_editor_agent: drives the graph with `ainvoke`, so many
+    runs can share one event loop. Returns the same result structure.
+    """
+    initial_state = build_initial_state(task, mode, user_text, max_iterations, options)
+    app, graph_input, run_kwargs = _start(initial_state, graph_config, thread_id)
+    if on_step is None:
+        final_state: Dict[str, Any] = await app.ainvoke(graph_input, **run_kwargs)
+    else:
+        translator = _StreamTranslator(on_step)
+        async for stream_mode, payload in app.astream(graph_input, stream_mode=STEP_STREAM_MODES, **run_kwargs):
+            translator.events(stream_mode, payload)
+        final_state = translator.state
+    return build_result(final_state, max_iterations, graph_config)
+
+
+def critique_draft(task: str, draft: str) -> Dict[str, Any]:
+    """
+    Runs a single Critic review outside the graph. Lets callers defer the
+    terminal critique of runs that use StopPolicy(skip_terminal_critique=True).
+    """
+    return critic_node({"task": task, "draft": draft, "history": []})["critique"]
+
+
+async def acritique_draft(task: str, draft: str) -> Dict[str, Any]:
+    """
+    Async variant of critique_draft.
+    """
+    return (await acritic_node({"task": task, "draft": draft, "history": []}))["critique"]
+
+
+# Streaming event types
+NODE_START = "node_start"   # {"type", "node"}
+TOKEN = "token"             # {"type", "node", "text"}: draft token delta from writer/editor
+CRITIQUE = "critique"       # {"type", "iteration", "critique"}
+NODE_END = "node_end"       # {"type", "node", "step"}: history entry the node produced
+RESULT = "result"           # {"type", "result"}: same dict run_text_editor_agent returns
+
+# Only these nodes produce draft text; critic tokens are raw JSON and are
+# reported once parsed, as a CRITIQUE event.
+TEXT_NODES = ("writer", "editor")
+STREAM_MODES = ["tasks", "messages", "updates", "values"]
+
+
+class _StreamTranslator:
+    """
+    Converts LangGraph (mode, payload) stream chunks into service events.
+    `on_step` is called with every history entry as soon as its node finishes.
+    """
+
+    def __init__(self, on_step: Optional[StepCallback] = None):
+        self.state: Dict[str, Any] = {}
+        self.on_step = on_step
+
+    def events(self, mode: str, payload: Any) -> List[Dict[str, Any]]:
+        if mode == "tasks":
+            # Task results arrive as NODE_END via "updates"; only starts matter here
+            if "result" in payload:
+                return []
+            return [{"type": NODE_START, "node": payload["name"]}]
+
+        if mode == "messages":
+            chunk, metadata = payload
+            node = metadata.get("langgraph_node")
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            # Patch-mode editor output is JSON edit operations, not draft text
+            if node == "editor" and self.state.get("editor_mode") == "patch":
+                return []
+            if node in TEXT_NODES and text:
+                return [{"type": TOKEN, "node": node, "text": text}]
+            return []
+
+        if mode == "updates":
+            events: List[Dict[str, Any]] = []
+            for node, update in payload.items():
+                update = update or {}
+                if self.on_step is not None:
+                    for step in update.get("history") or []:
+                        self.on_step(step)
+                history = update.get("history") or [{}]
+                # Both the critic and the fused critique_edit node publish a critique
+                if "critique" in update:
+                    events.append({
+                        "type": CRITIQUE,
+                        "iteration": self.state.get("iteration", 0),
+                        "critique": update.get("critique", {}),
+                    })
+                events.append({"type": NODE_END, "node": node, "step": history[-1]})
+            return events
+
+        if mode == "values":
+            self.state = payload
+        return []
+
+
+def stream_text_editor_agent(
+    task: str,
+    mode: str,
+    user_text: str,
+    max_iterations: int = 3,
+    graph_config: Optional[GraphConfig] = None,
+    options: Optional[RunOptions] = None,
+    on_step: Optional[StepCallback] = None,
+    thread_id: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Runs the agent and yields events as they happen: NODE_START, TOKEN deltas of the
+    writer/editor drafts, CRITIQUE after each review, NODE_END, and finally RESULT.
+    """
+    initial_state = build_initial_state(task, mode, user_text, max_iterations, options)
+    app, graph_input, run_kwargs = _start(initial_state, graph_config, thread_id)
+    translator = _StreamTranslator(on_step)
+
+    for stream_mode, payload in app.stream(graph_input, stream_mode=STREAM_MODES, **run_kwargs):
+        yield from translator.events(stream_mode, payload)
+
+    yield {"type": RESULT, "result": build_result(translator.state, max_iterations, graph_config)}
+
+
+async def astream_text_editor_agent(
+    task: str,
+    mode: str,
+    user_text: str,
+    max_iterations: int = 3,
+    graph_config: Optional[GraphConfig] = None,
+    options: Optional[RunOptions] = None,
+    on_step: Optional[StepCallback] = None,
+    thread_id: Optional[str] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async variant of stream_text_editor_agent.
+    """
+    initial_state = build_initial_state(task, mode, user_text, max_iterations, options)
+    app, graph_input, run_kwargs = _start(initial_state, graph_config, thread_id)
+    translator = _StreamTranslator(on_step)
+
+    async for stream_mode, payload in app.astream(graph_input, stream_mode=STREAM_MODES, **run_kwargs):
+        for event in translator.events(stream_mode, payload):
+            yield event
+
+    yield {"type": RESULT, "result": build_result(translator.state, max_iterations, graph_config)}
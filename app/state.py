@@ -1,4 +1,6 @@
-from typing import TypedDict, List, Optional, Any
+import operator
+from dataclasses import dataclass
+from typing import Annotated, TypedDict, List, Optional, Any
 
 class AgentState(TypedDict):
     """
@@ -8,9 +10,36 @@ class AgentState(TypedDict):
     mode: str                   # 'generate' or 'revise'
     user_text: Optional[str]    # Original text provided by user (if any)
     draft: str                  # Current version of the text
+    previous_draft: str         # Draft before the last Editor pass (set in incremental critic mode only)
     critique: Optional[dict]    # Structured feedback from the Critic
     iteration: int              # Current iteration count
-    history: List[dict]         # Log of steps for reporting
+    history: Annotated[List[dict], operator.add]  # Append-only log of steps; nodes return only new entries
     max_iterations: int         # Configured max iterations
     # Flags
     quality_passed: bool        # Logic flag from Critic
+    # Per-run options (see RunOptions)
+    editor_mode: str            # 'rewrite' (full text) or 'patch' (structured edits)
+    critic_mode: str            # 'full' or 'incremental' (re-assess changed paragraphs only)
+    local_rules: bool           # Run app.rules checks before the Critic and cap output tokens
+    writer_candidates: int      # Drafts the Writer samples and has scored; the best is kept
+    editor_candidates: int      # Same for every Editor pass
+    candidate_temperature: float  # Sampling temperature of all candidates but the first
+    length_share: float         # Part of the task's length target this run writes
+    candidate_review: Optional[dict]  # Critique the chosen candidate got, reused by the next Critic step
+    # Profiling
+    step_finished_at: float     # time.time() when the last node finished (for per-step queue time)
+
+
+@dataclass
+class RunOptions:
+    """
+    Per-run behaviour switches. Copied into the initial state, so they change
+    what nodes do without changing the compiled graph (see app.graph.GraphConfig).
+    """
+    editor_mode: str = "rewrite"    # 'patch': editor returns edit operations applied locally
+    critic_mode: str = "full"       # 'incremental': critic re-assesses only changed paragraphs
+    local_rules: bool = True        # Deterministic pre-critic checks and length-based max_tokens
+    writer_candidates: int = 1      # >1: sample that many first drafts concurrently, keep the best-scoring one
+    editor_candidates: int = 1      # >1: same for every Editor pass
+    candidate_temperature: float = 0.8  # Temperature of candidates after the first (which stays at 0)
+    length_share: float = 1.0       # <1: a chunk of a long document; length rules use that share of the target
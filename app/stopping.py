@@ -0,0 +1,86 @@
+# stopping.py
+from dataclasses import dataclass
+from typing import List, Optional
+
+from app.state import AgentState
+
+# Steps that may call the LLM; other history entries (e.g. stitching) do not count
+LLM_STEPS = ("writer", "critic", "editor")
+# LLM calls another iteration costs: an Editor call plus its review, or one fused call
+ITERATION_CALLS = 2
+FUSED_ITERATION_CALLS = 1
+
+
+@dataclass(frozen=True)
+class StopPolicy:
+    """
+    When the Critic -> Editor loop ends. Part of GraphConfig, so each policy
+    is compiled into its own graph. Rules are checked in this order:
+    max_iterations, min_edit_cycles, passed, target_score, plateau, budget.
+    """
+    min_edit_cycles: int = 1                  # Editor runs at least this many times, even if the Critic passes
+    target_score: Optional[float] = None      # Stop once the critic score reaches this value
+    plateau_epsilon: Optional[float] = None   # Stop when the score moves less than this ...
+    plateau_rounds: int = 2                   # ... over this many consecutive reviews
+    max_llm_calls: Optional[int] = None       # Stop before an iteration would exceed this many calls
+    skip_terminal_critique: bool = False      # End right after the last Editor pass, without a final review
+
+
+def llm_calls(history: List[dict]) -> int:
+    """
+    Number of LLM calls made so far. Steps that avoided or added calls record "llm_calls".
+    """
+    return sum(step.get("llm_calls", 1) for step in history if step.get("step") in LLM_STEPS)
+
+
+def critic_scores(history: List[dict]) -> List[float]:
+    """
+    Scores of LLM reviews, oldest first. Rule-based and carried-forward verdicts are skipped.
+    """
+    scores = []
+    for step in history:
+        if step.get("step") != "critic":
+            continue
+        # Reviews reused from candidate selection were LLM reviews too
+        if step.get("llm_calls", 1) == 0 and step.get("source") != "candidates":
+            continue
+        score = (step.get("feedback") or {}).get("score")
+        if isinstance(score, (int, float)):
+            scores.append(float(score))
+    return scores
+
+
+def stop_reason(state: AgentState, policy: Optional[StopPolicy] = None,
+                iteration_calls: int = ITERATION_CALLS) -> Optional[str]:
+    """
+    Returns why the loop should stop after the current review, or None to continue editing.
+    `iteration_calls` is what another iteration costs (GraphConfig.iteration_calls).
+    """
+    policy = policy or StopPolicy()
+    iteration = state["iteration"]
+    max_iter = state.get("max_iterations", 3)
+    history = state.get("history", [])
+
+    if iteration >= max_iter:
+        return "max_iterations"
+    if iteration < policy.min_edit_cycles:
+        return None
+    if state.get("quality_passed", False):
+        return "passed"
+
+    score = (state.get("critique") or {}).get("score")
+    if policy.target_score is not None and isinstance(score, (int, float)) and score >= policy.target_score:
+        return "target_score"
+
+    if policy.plateau_epsilon is not None:
+        scores = critic_scores(history)
+        recent = scores[-(policy.plateau_rounds + 1):]
+        if len(recent) == policy.plateau_rounds + 1 and all(
+            abs(b - a) < policy.plateau_epsilon for a, b in zip(recent, recent[1:])
+        ):
+            return "plateau"
+
+    if policy.max_llm_calls is not None and llm_calls(history) + iteration_calls > policy.max_llm_calls:
+        return "budget"
+
+    return None
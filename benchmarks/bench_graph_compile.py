@@ -0,0 +1,78 @@
+"""
+Measures per-request overhead of building the graph on every run versus
+reusing the cached compiled graph. LLM calls are replaced by an instant fake,
+so the numbers isolate framework cost.
+
+    python -m benchmarks.bench_graph_compile --runs 200
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain_core.messages import AIMessage
+
+from app import service
+from app.graph import build_graph, clear_graph_cache, get_graph
+
+PASSING_CRITIQUE = json.dumps({
+    "passed": True, "issues": [], "suggestions": [],
+    "style_check": "ok", "clarity_check": "ok", "score": 1.0,
+})
+
+
+class InstantLLM:
+    def __init__(self, json_mode: bool):
+        self.json_mode = json_mode
+
+    def invoke(self, messages, config=None):
+        return AIMessage(content=PASSING_CRITIQUE if self.json_mode else "Draft text")
+
+
+def fake_get_llm(json_mode: bool = False, **_):
+    return InstantLLM(json_mode)
+
+
+def _time_runs(runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        service.run_text_editor_agent("Benchmark task", "generate", "", 3)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _summary(label: str, timings: list):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<22} mean={statistics.mean(timings):7.2f} ms  p50={statistics.median(timings):7.2f} ms  p95={p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graph compile overhead benchmark")
+    parser.add_argument("--runs", type=int, default=100)
+    args = parser.parse_args()
+
+    with patch("app.nodes.get_llm", fake_get_llm):
+        # Before: compile a fresh graph for every request
+        with patch("app.service.get_graph", lambda config=None: build_graph(config)):
+            before = _time_runs(args.runs)
+
+        # After: compiled once, shared across requests
+        clear_graph_cache()
+        get_graph()
+        after = _time_runs(args.runs)
+
+    _summary("build per request", before)
+    _summary("cached compiled graph", after)
+    saved = statistics.mean(before) - statistics.mean(after)
+    print(f"Saved per request: {saved:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Measures memory held per in-flight run (the graph state, whose history grows
+with every step) with delta-encoded history versus storing the full draft in
+every editor step. LLM calls are replaced by a fake that returns a long text
+and changes one paragraph per edit.
+
+    python -m benchmarks.bench_history_memory --runs 50 --paragraphs 40
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tracemalloc
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain_core.messages import AIMessage
+
+from app import service
+from app.graph import get_graph
+from app.state import RunOptions
+
+FAILING_CRITIQUE = json.dumps({
+    "passed": False, "issues": ["weak"], "suggestions": ["improve"],
+    "style_check": "ok", "clarity_check": "ok", "score": 0.5,
+})
+
+
+class LongTextLLM:
+    def __init__(self, json_mode: bool, paragraphs: int, edits):
+        self.json_mode = json_mode
+        self.paragraphs = paragraphs
+        self.edits = edits
+
+    def invoke(self, messages, config=None):
+        if self.json_mode:
+            return AIMessage(content=FAILING_CRITIQUE)
+        edit = next(self.edits)
+        text = [
+            f"Paragraph {i} revision {edit if i == edit % self.paragraphs else 0}: " + "lorem ipsum dolor " * 30
+            for i in range(self.paragraphs)
+        ]
+        return AIMessage(content="\n\n".join(text))
+
+
+def _full_copies(state: dict) -> dict:
+    """
+    Full texts a finished run still holds besides the delta history.
+    """
+    writer = next(step for step in state["history"] if step["step"] == "writer")
+    return {
+        "draft": len(state["draft"]),
+        "writer step": len(writer["content"]),
+        "previous_draft": len(state.get("previous_draft") or ""),
+    }
+
+
+def _measure(runs: int, paragraphs: int, iterations: int, critic_mode: str = "full") -> tuple:
+    edits = itertools.count()
+
+    def fake_get_llm(json_mode: bool = False, **_):
+        return LongTextLLM(json_mode, paragraphs, edits)
+
+    app = get_graph()
+    states = []
+    with patch("app.nodes.get_llm", fake_get_llm):
+        tracemalloc.start()
+        for _ in range(runs):
+            states.append(app.invoke(service.build_initial_state(
+                "Benchmark task", "generate", "", iterations, RunOptions(critic_mode=critic_mode)
+            )))
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    history_chars = sum(len(json.dumps(s["history"], ensure_ascii=False)) for s in states) / runs
+    return current / runs, peak, history_chars, _full_copies(states[-1])
+
+
+def _full_content(previous: str, new_draft: str) -> dict:
+    return {"content": new_draft}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="History memory benchmark")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=40)
+    parser.add_argument("--iterations", type=int, default=3)
+    args = parser.parse_args()
+
+    # Before: every editor step keeps the full draft
+    with patch("app.nodes.editor_content", _full_content):
+        before = _measure(args.runs, args.paragraphs, args.iterations)
+    # After: editor steps keep a delta against the previous draft
+    after = _measure(args.runs, args.paragraphs, args.iterations)
+
+    # The incremental critic also keeps the draft before the last edit
+    incremental = _measure(args.runs, args.paragraphs, args.iterations, critic_mode="incremental")
+
+    rows = (("full drafts", before), ("delta history", after), ("+ incremental", incremental))
+    for label, (per_run, peak, history_chars, _) in rows:
+        print(f"{label:<15} retained/run={per_run / 1024:8.1f} KiB  peak={peak / 1024:9.1f} KiB  raw_history={history_chars / 1024:7.1f} KiB")
+    print(f"Saved per run: {(before[0] - after[0]) / 1024:.1f} KiB")
+    # The result trace is built on first use (app.history.RunResult), so it holds no copies here
+    for label, (_, _, _, copies) in rows[1:]:
+        held = ", ".join(f"{name} {size / 1024:.1f} KiB" for name, size in copies.items() if size)
+        print(f"Full-text copies left ({label.lstrip('+ ')}): {held}")
+
+
+if __name__ == "__main__":
+    main()
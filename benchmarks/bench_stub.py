@@ -0,0 +1,251 @@
+"""
+End-to-end benchmarks against the local stub server (benchmarks/stub_server.py):
+real ChatOpenAI clients, HTTP, JSON parsing and graph scheduling, no network.
+
+Scenarios: sync (run_text_editor_agent), async (arun_text_editor_agent under
+concurrency), batch (app.batch.run_batch) and cli (python -m app.main). Each is
+run for every concurrency level and document size; results can be saved as a
+baseline and compared against later.
+
+    python -m benchmarks.bench_stub --scenarios sync,async --concurrency 1,8 --words 200,2000
+    python -m benchmarks.bench_stub --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_stub --compare benchmarks/baseline.json --fail-on-regression 0.15
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.stub_server import StubConfig, start_in_thread
+
+SCENARIOS = ("sync", "async", "batch", "cli")
+TASK = "Write a short essay about writing benchmarks"
+# Metrics where a higher value is better; for the others lower is better
+HIGHER_IS_BETTER = ("runs_per_sec",)
+COMPARED = ("runs_per_sec", "p50_ms", "p95_ms", "overhead_ms_per_iteration")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _summarize(latencies: List[float], wall: float, results: List[dict], who=resource.RUSAGE_SELF) -> Dict[str, Any]:
+    """
+    Throughput and latency percentiles; framework overhead is the run time
+    not spent waiting on LLM calls, per edit iteration.
+    """
+    overheads = []
+    for latency, result in zip(latencies, results):
+        metrics = result.get("metrics")
+        if metrics:
+            overheads.append(max(latency * 1000 - metrics["llm_ms"], 0.0) / max(result["iterations"], 1))
+    return {
+        "runs": len(latencies),
+        "runs_per_sec": round(len(latencies) / wall, 3) if wall > 0 else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+        "overhead_ms_per_iteration": round(statistics.mean(overheads), 2) if overheads else None,
+        "peak_rss_mb": round(_peak_rss_mb(who), 1),
+    }
+
+
+def bench_sync(runs: int, concurrency: int, max_iterations: int) -> Dict[str, Any]:
+    # Sequential by definition; concurrency only applies to the other scenarios
+    from app.service import run_text_editor_agent
+
+    latencies, results = [], []
+    started = time.perf_counter()
+    for _ in range(runs):
+        start = time.perf_counter()
+        results.append(run_text_editor_agent(TASK, "generate", "", max_iterations))
+        latencies.append(time.perf_counter() - start)
+    return _summarize(latencies, time.perf_counter() - started, results)
+
+
+def bench_async(runs: int, concurrency: int, max_iterations: int) -> Dict[str, Any]:
+    from app.service import arun_text_editor_agent
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, results = [], []
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                results.append(await arun_text_editor_agent(TASK, "generate", "", max_iterations))
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(runs)))
+        return _summarize(latencies, time.perf_counter() - started, results)
+
+    return asyncio.run(main())
+
+
+def bench_batch(runs: int, concurrency: int, max_iterations: int) -> Dict[str, Any]:
+    from app.batch import run_batch
+
+    items = [
+        {"id": f"doc{i}", "task": TASK, "mode": "generate", "user_text": "", "max_iterations": max_iterations}
+        for i in range(runs)
+    ]
+    # run_batch prints a line per document
+    with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+        summary = asyncio.run(run_batch(items, output_dir, concurrency))
+    return {
+        "runs": summary["completed"],
+        "runs_per_sec": round(summary["docs_per_sec"], 3),
+        "p50_ms": round(summary["p50_s"] * 1000, 1),
+        "p95_ms": round(summary["p95_s"] * 1000, 1),
+        "overhead_ms_per_iteration": None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def bench_cli(runs: int, concurrency: int, max_iterations: int) -> Dict[str, Any]:
+    # Includes interpreter start-up and imports, as users see them
+    root = os.path.join(os.path.dirname(__file__), "..")
+    latencies = []
+    with tempfile.TemporaryDirectory() as tmp:
+        command = [
+            sys.executable, "-m", "app.main", "--mode", "generate", "--task", TASK,
+            "--max-iterations", str(max_iterations), "--report", os.path.join(tmp, "report.json"),
+            # Measures the in-process path even when a daemon is running
+            "--no-daemon",
+        ]
+        started = time.perf_counter()
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=root, env=os.environ.copy(), check=True, capture_output=True)
+            latencies.append(time.perf_counter() - start)
+    return _summarize(latencies, time.perf_counter() - started, [], resource.RUSAGE_CHILDREN)
+
+
+BENCHMARKS = {"sync": bench_sync, "async": bench_async, "batch": bench_batch, "cli": bench_cli}
+
+
+def run_suite(args) -> List[Dict[str, Any]]:
+    from app.llm import reset_llm_clients
+
+    rows = []
+    for words in args.words:
+        config = StubConfig(args.latency, args.token_rate, words, args.pass_pattern)
+        server, base_url = start_in_thread(config)
+        os.environ["OPENAI_BASE_URL"] = base_url
+        try:
+            for scenario in args.scenarios:
+                levels = [1] if scenario in ("sync", "cli") else args.concurrency
+                for concurrency in levels:
+                    # Every measurement starts from cold connection pools
+                    reset_llm_clients()
+                    runs = args.runs if scenario != "cli" else max(1, args.runs // 5)
+                    stats = BENCHMARKS[scenario](runs, concurrency, args.max_iterations)
+                    row = {"scenario": scenario, "concurrency": concurrency, "words": words, **stats}
+                    rows.append(row)
+                    _print_row(row)
+        finally:
+            server.shutdown()
+    return rows
+
+
+def _key(row: Dict[str, Any]) -> str:
+    return f"{row['scenario']}/c{row['concurrency']}/w{row['words']}"
+
+
+def _print_row(row: Dict[str, Any]):
+    overhead = row.get("overhead_ms_per_iteration")
+    overhead = f"{overhead:7.2f}" if overhead is not None else "      -"
+    print(f"{_key(row):<22} {row['runs_per_sec']:8.2f} runs/s  p50={row['p50_ms']:8.1f} ms  "
+          f"p95={row['p95_ms']:8.1f} ms  overhead/iter={overhead} ms  rss={row['peak_rss_mb']:7.1f} MB")
+
+
+def compare(rows: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """
+    Prints changes against the baseline and returns the regressions beyond `threshold` (a fraction).
+    """
+    previous = {_key(row): row for row in baseline}
+    regressions = []
+    print("\nCompared to baseline:")
+    for row in rows:
+        old = previous.get(_key(row))
+        if old is None:
+            continue
+        for metric in COMPARED:
+            before, after = old.get(metric), row.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            print(f"  {_key(row):<22} {metric:<26} {before:10.2f} -> {after:10.2f} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append(f"{_key(row)} {metric}")
+    return regressions
+
+
+def _csv(cast):
+    return lambda value: [cast(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks against a stub LLM server")
+    parser.add_argument("--scenarios", type=_csv(str), default=["sync", "async", "batch"],
+                        help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--runs", type=int, default=20, help="Runs per scenario (cli uses a fifth)")
+    parser.add_argument("--concurrency", type=_csv(int), default=[1, 8], help="Concurrency levels for async/batch")
+    parser.add_argument("--words", type=_csv(int), default=[200, 2000], help="Document sizes in words")
+    parser.add_argument("--max-iterations", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub time to first token (s)")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="Stub completion tokens per second (0 = instant)")
+    parser.add_argument("--pass-pattern", default="FP", help="Critic verdicts cycled per review, e.g. FFP")
+    parser.add_argument("--save-baseline", type=str, help="Write results to this JSON file")
+    parser.add_argument("--compare", type=str, help="Compare results with a saved baseline")
+    parser.add_argument("--fail-on-regression", type=float, default=None,
+                        help="Exit with status 1 if a metric is worse than the baseline by this fraction")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Measure the agent, not the response cache
+    os.environ.pop("LLM_CACHE_PATH", None)
+    os.environ["OPENAI_API_KEY"] = os.environ.get("OPENAI_API_KEY") or "stub"
+
+    rows = run_suite(args)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(rows, json.load(f), args.fail_on_regression or 0.1)
+        if regressions and args.fail_on_regression is not None:
+            print(f"\n{len(regressions)} regression(s) beyond {args.fail_on_regression:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Local OpenAI-compatible chat-completions server for offline benchmarks.
+
+Responses are shaped like the real API (including SSE streaming and usage),
+so benchmarks exercise client construction, HTTP, JSON parsing and graph
+scheduling. Latency, token rate and the critic's verdicts are configurable.
+
+    python -m benchmarks.stub_server --port 8765 --latency 0.2 --token-rate 80 --pass-pattern FFP
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python -m app.main ...
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, Optional
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua").split()
+
+
+@dataclass
+class StubConfig:
+    latency: float = 0.05       # seconds before the first token
+    token_rate: float = 0.0     # completion tokens per second; 0 = instant
+    words: int = 200            # length of generated drafts
+    pass_pattern: str = "FP"    # critic verdicts, cycled per review: P = pass, F = fail
+    model: str = "stub-model"
+
+
+def _draft(words: int, seed: int) -> str:
+    text = [WORDS[(seed + i) % len(WORDS)] for i in range(words)]
+    # Paragraphs of ~60 words, so local structure checks see a normal text
+    paragraphs = [" ".join(text[i:i + 60]).capitalize() + "." for i in range(0, len(text), 60)]
+    return "\n\n".join(paragraphs)
+
+
+def _critique(passed: bool) -> dict:
+    return {
+        "passed": passed,
+        "issues": [] if passed else ["Transitions between paragraphs are abrupt."],
+        "suggestions": [] if passed else ["Add linking sentences between paragraphs."],
+        "style_check": "Consistent.",
+        "clarity_check": "Clear." if passed else "Mostly clear.",
+        "score": 0.9 if passed else 0.6,
+    }
+
+
+class StubState:
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self._verdicts = itertools.cycle(config.pass_pattern.upper() or "P")
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def next_verdict(self) -> bool:
+        with self._lock:
+            return next(self._verdicts) == "P"
+
+    def next_seed(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return next(self._counter)
+
+    def reply(self, body: dict) -> str:
+        """
+        Content for a request, chosen by what the prompts ask for.
+        """
+        messages = body.get("messages", [])
+        system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        seed = self.next_seed()
+
+        if not json_mode:
+            return _draft(self.config.words, seed)
+        if "joining independently revised parts" in system:
+            return json.dumps({"end": "Joined ending.", "start": "Joined opening."})
+        if '"edits"' in system:
+            return json.dumps({"edits": [{"op": "insert_after", "paragraph": 0, "text": _draft(20, seed)}]})
+        critique = _critique(self.next_verdict())
+        if "revised_draft" in system:
+            return json.dumps({"critique": critique, "revised_draft": _draft(self.config.words, seed)})
+        return json.dumps(critique)
+
+
+def _tokens(text: str) -> list:
+    # One "token" per word keeps token rates easy to reason about
+    return [token + " " for token in text.split(" ")]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StubState = None  # set by make_server
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        config = self.state.config
+        content = self.state.reply(body)
+        prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+        tokens = _tokens(content)
+        usage = {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_chars // 4 + len(tokens),
+        }
+
+        time.sleep(config.latency)
+        if body.get("stream"):
+            self._stream(body, tokens, usage)
+        else:
+            if config.token_rate:
+                time.sleep(len(tokens) / config.token_rate)
+            self._json({
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": config.model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+    def _json(self, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunks(self, tokens: list, usage: dict, include_usage: bool) -> Iterator[dict]:
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": self.state.config.model}
+        yield {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]}
+        for token in tokens:
+            yield {**base, "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        if include_usage:
+            yield {**base, "choices": [], "usage": usage}
+
+    def _stream(self, body: dict, tokens: list, usage: dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        rate = self.state.config.token_rate
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        for chunk in self._chunks(tokens, usage, include_usage):
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if rate and chunk["choices"] and chunk["choices"][0]["delta"].get("content"):
+                time.sleep(1 / rate)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def make_server(config: StubConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Creates the stub server; port 0 picks a free port (see server.server_address).
+    """
+    handler = type("BoundStubHandler", (StubHandler,), {"state": StubState(config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(config: StubConfig, host: str = "127.0.0.1", port: int = 0):
+    """
+    Starts the stub server in a daemon thread. Returns (server, base_url).
+    """
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}/v1"
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=StubConfig.latency, help="Seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=StubConfig.token_rate, help="Completion tokens per second (0 = instant)")
+    parser.add_argument("--words", type=int, default=StubConfig.words, help="Words per generated draft")
+    parser.add_argument("--pass-pattern", default=StubConfig.pass_pattern, help="Critic verdicts cycled per review, e.g. FFP")
+    args = parser.parse_args(argv)
+
+    config = StubConfig(args.latency, args.token_rate, args.words, args.pass_pattern)
+    server = make_server(config, args.host, args.port)
+    print(f"Stub server on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
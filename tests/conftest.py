@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from langchain_core.messages import AIMessage
 
 @pytest.fixture
@@ -10,6 +10,8 @@ def mock_llm():
     mock = MagicMock()
     # default response
     mock.invoke.return_value = AIMessage(content="Mocked Content")
+    # ainvoke mirrors invoke, so tests configure responses once for both paths
+    mock.ainvoke = AsyncMock(side_effect=lambda *args, **kwargs: mock.invoke(*args, **kwargs))
     return mock
 
 @pytest.fixture
@@ -0,0 +1,82 @@
+import threading
+
+from app import background
+from app.background import BackgroundRun, start_run
+from app.coalesce import RunCoalescer
+
+
+def _fake_stream(gate: threading.Event):
+    """
+    Emits one finished iteration, then waits for `gate` before finishing the run.
+    """
+    def stream(task, mode, user_text, max_iterations, graph_config=None, options=None, on_step=None):
+        yield {"type": "node_start", "node": "writer"}
+        yield {"type": "token", "node": "writer", "text": "Dra"}
+        yield {"type": "token", "node": "writer", "text": "ft"}
+        for step in ({"step": "writer", "content": "Draft"},
+                     {"step": "critic", "feedback": {"passed": False}},
+                     {"step": "editor", "content": "Edited", "iteration": 1}):
+            on_step(step)
+        yield {"type": "node_start", "node": "critic"}
+        gate.wait(5)
+        yield {"type": "result", "result": {"final_text": "Edited", "trace": [{"iteration": 0}]}}
+    return stream
+
+def test_background_run_reports_completed_iterations_before_it_finishes(monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setattr(background, "stream_text_editor_agent", _fake_stream(gate))
+
+    run = BackgroundRun("t", "generate", "").start()
+    while run.snapshot()["node"] != "critic":
+        pass
+    snapshot = run.snapshot()
+    assert snapshot["status"] == "running"
+    assert [block["edited"] for block in snapshot["trace"]] == ["Edited"]
+
+    gate.set()
+    run.join(5)
+    snapshot = run.snapshot()
+    assert snapshot["status"] == "done"
+    assert snapshot["result"]["final_text"] == "Edited"
+
+def test_background_run_can_be_cancelled(monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setattr(background, "stream_text_editor_agent", _fake_stream(gate))
+
+    run = BackgroundRun("t", "generate", "").start()
+    run.cancel()
+    gate.set()
+    run.join(5)
+    assert run.snapshot()["status"] == "cancelled"
+    assert run.snapshot()["result"] is None
+
+def test_background_run_records_errors(monkeypatch):
+    def failing(*args, **kwargs):
+        raise RuntimeError("no key")
+        yield
+
+    monkeypatch.setattr(background, "stream_text_editor_agent", failing)
+    run = BackgroundRun("t", "generate", "").start()
+    run.join(5)
+    assert (run.status, run.error) == ("failed", "no key")
+
+def test_identical_runs_share_one_background_run(monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setattr(background, "stream_text_editor_agent", _fake_stream(gate))
+    coalescer = RunCoalescer()
+
+    first = start_run("t", "generate", "", coalescer=coalescer)
+    second = start_run("t", "generate", "", coalescer=coalescer)
+    other = start_run("other", "generate", "", coalescer=coalescer)
+    assert first is second and first is not other
+
+    # One caller stopping does not stop the run for the other
+    second.cancel()
+    gate.set()
+    first.join(5)
+    other.join(5)
+    assert first.status == "done"
+    # Reused from the memo after it finished
+    assert start_run("t", "generate", "", coalescer=coalescer) is first
+    stats = coalescer.stats()
+    assert (stats["executions"], stats["coalesced"], stats["memo_hits"]) == (2, 1, 1)
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+from app.batch import load_batch_tasks, run_batch
+
+
+def _fake_result(text="Final"):
+    return {
+        "final_text": text,
+        "iterations": 1,
+        "stopped_by": "passed",
+        "trace": [],
+        "raw_history": [{"step": "writer", "content": text}],
+    }
+
+def test_load_batch_tasks_from_directory(tmp_path):
+    (tmp_path / "b.txt").write_text("second", encoding="utf-8")
+    (tmp_path / "a.txt").write_text("first", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("ignored", encoding="utf-8")
+
+    items = load_batch_tasks(str(tmp_path), task="fix", max_iterations=2)
+
+    assert [i["id"] for i in items] == ["a", "b"]
+    assert items[0]["user_text"] == "first"
+    assert items[0]["mode"] == "revise"
+    assert items[0]["max_iterations"] == 2
+
+def test_load_batch_tasks_from_manifest(tmp_path):
+    (tmp_path / "doc.txt").write_text("file text", encoding="utf-8")
+    manifest = tmp_path / "tasks.jsonl"
+    manifest.write_text(
+        json.dumps({"id": "gen", "task": "write"}) + "\n\n"
+        + json.dumps({"task": "fix", "text_file": "doc.txt", "max_iterations": 1}) + "\n",
+        encoding="utf-8",
+    )
+
+    items = load_batch_tasks(str(manifest))
+
+    assert items[0] == {"id": "gen", "task": "write", "mode": "generate", "user_text": "", "max_iterations": 3}
+    assert items[1]["id"] == "3"
+    assert items[1]["mode"] == "revise"
+    assert items[1]["user_text"] == "file text"
+
+def test_run_batch_writes_results_and_skips_done(tmp_path):
+    items = [
+        {"id": "one", "task": "t", "mode": "generate", "user_text": "", "max_iterations": 1},
+        {"id": "two", "task": "t", "mode": "generate", "user_text": "", "max_iterations": 1},
+    ]
+    out = tmp_path / "out"
+
+    async def fake_run(task, mode, user_text, max_iterations, **kwargs):
+        return _fake_result()
+
+    with patch("app.batch.arun_text_editor_agent", side_effect=fake_run) as run:
+        summary = asyncio.run(run_batch(items, str(out), concurrency=2))
+        assert summary["completed"] == 2
+        assert (out / "one.result.json").exists()
+        assert (out / "one.report.json").exists()
+
+        # Rerun skips finished documents
+        summary = asyncio.run(run_batch(items, str(out), concurrency=2))
+        assert summary["skipped"] == 2
+        assert run.call_count == 2
+
+def test_run_batch_records_failures(tmp_path):
+    items = [{"id": "bad", "task": "t", "mode": "generate", "user_text": "", "max_iterations": 1}]
+
+    async def failing_run(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    with patch("app.batch.arun_text_editor_agent", side_effect=failing_run):
+        summary = asyncio.run(run_batch(items, str(tmp_path), concurrency=1))
+
+    assert summary["failed"] == 1
+    assert summary["failures"][0]["error"] == "boom"
+    assert not (tmp_path / "bad.result.json").exists()
+
+def test_run_batch_appends_steps_to_shared_jsonl_report(tmp_path):
+    from app.report import JsonlReportWriter, read_report
+
+    items = [{"id": name, "task": "t", "mode": "generate", "user_text": "", "max_iterations": 1} for name in ("one", "two")]
+    out = tmp_path / "out"
+
+    async def fake_run(task, mode, user_text, max_iterations, on_step=None, **kwargs):
+        result = _fake_result()
+        for step in result["raw_history"]:
+            on_step(step)
+        return result
+
+    with patch("app.batch.arun_text_editor_agent", side_effect=fake_run):
+        with JsonlReportWriter(str(tmp_path / "batch.jsonl")) as report:
+            asyncio.run(run_batch(items, str(out), concurrency=2, report=report))
+
+    assert not (out / "one.report.json").exists()
+    assert read_report(str(tmp_path / "batch.jsonl"), run="two") == [{"step": "writer", "content": "Final"}]
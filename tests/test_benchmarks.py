@@ -0,0 +1,17 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("module, args", [
+    ("benchmarks.bench_graph_compile", ["--runs", "2"]),
+    ("benchmarks.bench_history_memory", ["--runs", "1", "--paragraphs", "3"]),
+])
+def test_offline_benchmarks_run(module, args):
+    # Their fake LLMs must keep up with how app.metrics calls the model
+    proc = subprocess.run([sys.executable, "-m", module, *args], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
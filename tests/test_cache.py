@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+from app.cache import ResponseCache, configure_response_cache
+from app.llm import get_llm, reset_llm_clients
+
+
+def _gen(text):
+    return [ChatGeneration(message=AIMessage(content=text))]
+
+def test_cache_roundtrip_and_counters(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+
+    assert cache.lookup("prompt", "model-a") is None
+    cache.update("prompt", "model-a", _gen("answer"))
+    hit = cache.lookup("prompt", "model-a")
+
+    assert hit[0].text == "answer"
+    assert hit[0].message.response_metadata["cache_hit"] is True
+    # Different llm settings never share entries
+    assert cache.lookup("prompt", "model-b") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 1
+
+def test_cache_bypass_skips_lookup(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), bypass=True)
+    cache.update("p", "m", _gen("x"))
+    assert cache.lookup("p", "m") is None
+    assert cache.stats()["bypassed"] == 1
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=400)  # room for two entries
+    cache.update("old", "m", _gen("a" * 100))
+    time.sleep(0.01)
+    cache.update("new", "m", _gen("b" * 100))
+    time.sleep(0.01)
+    cache.lookup("old", "m")  # refresh "old"
+    cache.update("newest", "m", _gen("c" * 100))
+
+    assert cache.lookup("new", "m") is None
+    assert cache.lookup("old", "m") is not None
+    assert cache.stats()["evictions"] >= 1
+
+def test_cache_expires_by_age(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_age=-1)
+    cache.update("p", "m", _gen("x"))
+    assert cache.lookup("p", "m") is None
+
+def test_cache_shared_between_threads(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = ResponseCache(path)
+    reader = ResponseCache(path)  # second handle, as another process would open
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda i: writer.update(f"p{i}", "m", _gen(str(i))), range(20)))
+
+    assert reader.lookup("p7", "m")[0].text == "7"
+
+def test_get_llm_attaches_cache_only_for_deterministic_calls(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    reset_llm_clients()
+    cache = configure_response_cache(str(tmp_path / "cache.db"))
+    try:
+        assert get_llm().cache is cache
+        assert get_llm(temperature=0.7).cache is None
+    finally:
+        configure_response_cache(None)
+        reset_llm_clients()
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app import checkpoints
+from app.batch import batch_run_id, run_batch
+from app.checkpoints import CheckpointStore, configure_checkpoints
+from app.service import arun_text_editor_agent, run_text_editor_agent
+from app.state import RunOptions
+
+OPTIONS = RunOptions(local_rules=False)
+
+
+def _critique(passed):
+    return AIMessage(content=json.dumps({
+        "passed": passed, "issues": [] if passed else ["Too short."], "suggestions": [],
+        "style_check": "ok", "clarity_check": "ok", "score": 0.9 if passed else 0.5,
+    }))
+
+def _responses(fail_editor_once):
+    """
+    writer -> critic (fail) -> editor -> critic (pass); the first editor call can raise.
+    """
+    replies = [AIMessage(content="Draft"), _critique(False), AIMessage(content="Edited draft"), _critique(True)]
+    if fail_editor_once:
+        replies.insert(2, RuntimeError("timed out"))
+    replies = iter(replies)
+
+    def respond(*args, **kwargs):
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+    return respond
+
+@pytest.fixture
+def store(tmp_path):
+    yield configure_checkpoints(str(tmp_path / "checkpoints.db"))
+    configure_checkpoints(None)
+
+def test_failed_run_resumes_after_last_completed_node(store, mock_get_llm, mock_llm):
+    mock_llm.invoke.side_effect = _responses(fail_editor_once=True)
+
+    with pytest.raises(RuntimeError):
+        run_text_editor_agent("Write", "generate", "", 1, options=OPTIONS, thread_id="run-1")
+    assert mock_llm.invoke.call_count == 3
+
+    result = run_text_editor_agent("Write", "generate", "", 1, options=OPTIONS, thread_id="run-1")
+
+    # Writer and the first review were not repeated
+    assert mock_llm.invoke.call_count == 5
+    assert result["final_text"] == "Edited draft"
+    assert [step["step"] for step in result["raw_history"]] == ["writer", "critic", "editor", "critic"]
+
+def test_finished_run_is_returned_without_llm_calls(store, mock_get_llm, mock_llm):
+    mock_llm.invoke.side_effect = _responses(fail_editor_once=False)
+    first = run_text_editor_agent("Write", "generate", "", 1, options=OPTIONS, thread_id="run-2")
+    calls = mock_llm.invoke.call_count
+
+    again = run_text_editor_agent("Write", "generate", "", 1, options=OPTIONS, thread_id="run-2")
+
+    assert mock_llm.invoke.call_count == calls
+    assert again["final_text"] == first["final_text"]
+    assert again["raw_history"] == first["raw_history"]
+
+def test_async_run_resumes(store, mock_get_llm, mock_llm):
+    mock_llm.invoke.side_effect = _responses(fail_editor_once=True)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await arun_text_editor_agent("Write", "generate", "", 1, options=OPTIONS, thread_id="run-3")
+        return await arun_text_editor_agent("Write", "generate", "", 1, options=OPTIONS, thread_id="run-3")
+
+    assert asyncio.run(main())["final_text"] == "Edited draft"
+
+def test_store_keeps_only_latest_checkpoints_and_gc_removes_old_runs(store, mock_get_llm, mock_llm):
+    mock_llm.invoke.side_effect = _responses(fail_editor_once=False)
+    run_text_editor_agent("Write", "generate", "", 1, options=OPTIONS, thread_id="run-4")
+
+    assert store.stats()["runs"] == 1
+    assert store.stats()["checkpoints"] == 1
+
+    assert store.gc(max_age=0) == 1
+    assert store.stats() == {"runs": 0, "checkpoints": 0, "writes": 0}
+
+def test_keep_last_is_configurable(tmp_path, mock_get_llm, mock_llm, monkeypatch):
+    monkeypatch.setattr(checkpoints, "_store", CheckpointStore(str(tmp_path / "c.db"), keep_last=3))
+    monkeypatch.setattr(checkpoints, "_store_configured", True)
+    mock_llm.invoke.side_effect = _responses(fail_editor_once=False)
+
+    run_text_editor_agent("Write", "generate", "", 1, options=OPTIONS, thread_id="run-5")
+
+    assert checkpoints.get_checkpoint_store().stats()["checkpoints"] == 3
+
+def test_thread_id_requires_a_store(mock_get_llm):
+    configure_checkpoints(None)
+    with pytest.raises(ValueError):
+        run_text_editor_agent("Write", "generate", "", 1, thread_id="run-6")
+
+def test_batch_drops_checkpoints_of_finished_documents(store, mock_get_llm, mock_llm, tmp_path):
+    mock_llm.invoke.side_effect = _responses(fail_editor_once=False)
+    out = tmp_path / "out"
+    items = [{"id": "one", "task": "t", "mode": "generate", "user_text": "", "max_iterations": 1}]
+
+    summary = asyncio.run(run_batch(items, str(out), options=OPTIONS))
+
+    assert summary["completed"] == 1
+    assert store.get_tuple({"configurable": {"thread_id": batch_run_id(str(out), "one")}}) is None
+    assert store.stats()["runs"] == 0
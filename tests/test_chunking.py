@@ -0,0 +1,119 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.chunking import split_text, stitch_chunks, arun_long_document
+
+
+@pytest.fixture
+def stitch_llm(mock_llm):
+    with patch("app.chunking.get_llm", return_value=mock_llm):
+        yield mock_llm
+
+def test_split_text_respects_paragraph_boundaries():
+    text = "\n\n".join(f"Paragraph {i} " + "x" * 40 for i in range(6))
+    chunks = split_text(text, max_chars=120)
+
+    assert len(chunks) == 3
+    assert "\n\n".join(chunks) == text
+    assert all(c.startswith("Paragraph") for c in chunks)
+
+def test_split_text_starts_new_chunk_at_heading():
+    text = "Intro " + "x" * 60 + "\n\n# Section\n\nBody"
+    chunks = split_text(text, max_chars=100)
+    assert chunks[1].startswith("# Section")
+
+def test_split_text_keeps_oversized_paragraph_whole():
+    assert split_text("y" * 500, max_chars=100) == ["y" * 500]
+
+def test_stitch_chunks_changes_only_seams(stitch_llm):
+    stitch_llm.invoke.return_value = AIMessage(content=json.dumps({"end": "A2 smooth", "start": "B1 smooth"}))
+
+    result = asyncio.run(stitch_chunks(["A1\n\nA2", "B1\n\nB2"]))
+
+    assert result["text"] == "A1\n\nA2 smooth\n\nB1 smooth\n\nB2"
+    assert result["changed_seams"] == [0]
+
+def test_stitch_chunks_ignores_malformed_response(stitch_llm):
+    stitch_llm.invoke.return_value = AIMessage(content="not json")
+    result = asyncio.run(stitch_chunks(["A", "B"]))
+    assert result["text"] == "A\n\nB"
+    assert result["changed_seams"] == []
+
+def test_stitch_chunks_ignores_non_object_response(stitch_llm):
+    stitch_llm.invoke.return_value = AIMessage(content='["A", "B"]')
+    result = asyncio.run(stitch_chunks(["A", "B"]))
+    assert result["text"] == "A\n\nB"
+    assert result["changed_seams"] == []
+
+def test_failed_seam_keeps_the_other_seams(stitch_llm):
+    def invoke(messages, config=None):
+        if "A1" in messages[1].content:
+            raise RuntimeError("stitch model unavailable")
+        return AIMessage(content=json.dumps({"end": "smooth end", "start": "smooth start"}))
+
+    stitch_llm.invoke.side_effect = invoke
+    result = asyncio.run(stitch_chunks(["A1", "B1", "C1"]))
+
+    assert result["failed_seams"] == [{"seam": 0, "error": "stitch model unavailable"}]
+    assert result["changed_seams"] == [1]
+    assert result["text"] == "A1\n\nsmooth end\n\nsmooth start"
+
+@pytest.mark.parametrize("reasons, expected", [
+    (["passed", "passed"], "passed"),
+    (["passed", "plateau"], "plateau"),
+    (["budget", "budget"], "budget"),
+    (["target_score", "max_iterations"], "mixed"),
+])
+def test_long_document_reports_the_chunks_stop_reasons(stitch_llm, reasons, expected):
+    async def fake_run(task, mode, user_text, max_iterations, **kwargs):
+        reason = reasons[int(user_text.split()[1])]
+        return {"final_text": user_text, "iterations": 1, "stopped_by": reason, "raw_history": []}
+
+    stitch_llm.invoke.return_value = AIMessage(content="not json")
+    text = "\n\n".join(f"part {i} " + "z" * 50 for i in range(len(reasons)))
+
+    with patch("app.chunking.arun_text_editor_agent", side_effect=fake_run):
+        result = asyncio.run(arun_long_document("fix", text, chunk_chars=70))
+
+    assert result["stopped_by"] == expected
+    assert [c["stopped_by"] for c in result["chunks"]] == reasons
+
+def test_arun_long_document_reassembles_in_order(stitch_llm):
+    async def fake_run(task, mode, user_text, max_iterations, **kwargs):
+        return {
+            "final_text": user_text.upper(),
+            "iterations": 1,
+            "stopped_by": "passed",
+            "trace": [{"iteration": 0, "draft": user_text, "critic": {}, "edited": user_text.upper()}],
+            "raw_history": [{"step": "writer", "content": user_text.upper()}],
+        }
+
+    stitch_llm.invoke.return_value = AIMessage(content="not json")
+    text = "\n\n".join(f"part {i} " + "z" * 50 for i in range(4))
+
+    with patch("app.chunking.arun_text_editor_agent", side_effect=fake_run):
+        result = asyncio.run(arun_long_document("fix", text, chunk_chars=70))
+
+    assert result["final_text"] == text.upper()
+    assert [c["chunk"] for c in result["chunks"]] == [0, 1, 2, 3]
+    assert result["stopped_by"] == "passed"
+    assert result["raw_history"][-1]["step"] == "stitch"
+
+def test_chunks_get_their_share_of_the_length_target(stitch_llm):
+    shares = []
+
+    async def fake_run(task, mode, user_text, max_iterations, options=None, **kwargs):
+        shares.append(options.length_share)
+        return {"final_text": user_text, "iterations": 1, "stopped_by": "passed", "trace": [], "raw_history": []}
+
+    stitch_llm.invoke.return_value = AIMessage(content="not json")
+    text = "one two three\n\nfour"
+
+    with patch("app.chunking.arun_text_editor_agent", side_effect=fake_run):
+        asyncio.run(arun_long_document("fix (100 words)", text, chunk_chars=10))
+
+    assert sorted(shares) == [0.25, 0.75]
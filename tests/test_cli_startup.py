@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the CLI must not import before a run starts
+HEAVY = ("langgraph", "langchain_core", "langchain_openai", "openai", "dotenv", "app.service", "app.graph")
+# Total import time of a validation-only invocation; a cold start with the
+# service layer loaded takes about 2 s
+BUDGET_US = 500_000
+
+
+def _imports(*cli_args):
+    """
+    Runs `python -X importtime -m app.main ...` and returns its exit code and
+    {module: self time in microseconds}.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "app.main", *cli_args],
+        cwd=ROOT, capture_output=True, text=True, timeout=60,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(self_us)
+    return proc.returncode, modules
+
+@pytest.mark.parametrize("cli_args, exit_code", [
+    (["--help"], 0),
+    (["--mode", "revise", "--task", "Fix"], 1),   # --text-file missing
+    (["--task", "Fix"], 2),                       # --mode missing
+    (["--mode", "generate", "--task", "Write", "--long-doc"], 2),   # --long-doc needs revise
+])
+def test_validation_paths_skip_heavy_imports(cli_args, exit_code):
+    code, modules = _imports(*cli_args)
+
+    assert code == exit_code
+    assert "app.state" in modules
+    loaded = [name for name in modules if name.split(".")[0] in HEAVY or name in HEAVY]
+    assert loaded == []
+    assert sum(modules.values()) < BUDGET_US
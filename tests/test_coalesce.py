@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import coalesce
+from app.coalesce import RunCoalescer, run_key
+from app.state import RunOptions
+
+
+def _result(task):
+    return {"final_text": f"Final: {task}", "raw_history": [], "metrics": {"llm_calls": 4}}
+
+@pytest.fixture
+def fake_run(monkeypatch):
+    calls = []
+
+    def run(task, mode, user_text, max_iterations=3, graph_config=None, options=None):
+        calls.append(task)
+        time.sleep(0.05)
+        if task == "boom":
+            raise RuntimeError("failed")
+        return _result(task)
+
+    async def arun(task, mode, user_text, max_iterations=3, graph_config=None, options=None):
+        calls.append(task)
+        await asyncio.sleep(0.05)
+        return _result(task)
+
+    monkeypatch.setattr(coalesce, "run_text_editor_agent", run)
+    monkeypatch.setattr(coalesce, "arun_text_editor_agent", arun)
+    return calls
+
+def test_run_key_depends_on_all_inputs():
+    base = run_key("Task", "generate", "")
+    assert base == run_key("Task", "generate", "")
+    assert base != run_key("Task", "generate", "", max_iterations=4)
+    assert base != run_key("Task", "generate", "", options=RunOptions(editor_mode="full"))
+
+def test_concurrent_identical_runs_share_one_execution(fake_run):
+    coalescer = RunCoalescer()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(coalescer.run("Task", "generate", "")))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fake_run == ["Task"]
+    assert [r["final_text"] for r in results] == ["Final: Task"] * 4
+    # Every caller gets its own copy
+    assert len({id(r) for r in results}) == 4
+    stats = coalescer.stats()
+    assert (stats["executions"], stats["coalesced"], stats["llm_calls_saved"]) == (1, 3, 12)
+
+def test_memo_serves_repeats_until_ttl(fake_run):
+    coalescer = RunCoalescer(ttl=0.2)
+    coalescer.run("Task", "generate", "")
+    coalescer.run("Task", "generate", "")
+    assert fake_run == ["Task"]
+    assert coalescer.stats()["memo_hits"] == 1
+
+    time.sleep(0.25)
+    coalescer.run("Task", "generate", "")
+    assert fake_run == ["Task", "Task"]
+
+def test_errors_are_not_memoized(fake_run):
+    coalescer = RunCoalescer()
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            coalescer.run("boom", "generate", "")
+    assert fake_run == ["boom", "boom"]
+    assert coalescer.stats()["memo_entries"] == 0
+
+def test_async_identical_runs_share_one_execution(fake_run):
+    coalescer = RunCoalescer()
+
+    async def main():
+        return await asyncio.gather(*(coalescer.arun("Task", "generate", "") for _ in range(3)),
+                                    coalescer.arun("Other", "generate", ""))
+
+    results = asyncio.run(main())
+    assert sorted(fake_run) == ["Other", "Task"]
+    assert [r["final_text"] for r in results] == ["Final: Task"] * 3 + ["Final: Other"]
+    assert coalescer.stats()["coalesced"] == 2
+
+def test_cancelled_leader_does_not_fail_followers(fake_run):
+    coalescer = RunCoalescer()
+
+    async def main():
+        leader = asyncio.create_task(coalescer.arun("Task", "generate", ""))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(coalescer.arun("Task", "generate", ""))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main())["final_text"] == "Final: Task"
+    assert fake_run == ["Task"]
+
+def test_execution_is_cancelled_when_every_caller_is(monkeypatch):
+    finished = []
+
+    async def arun(task, mode, user_text, max_iterations=3, graph_config=None, options=None):
+        await asyncio.sleep(0.05)
+        finished.append(task)
+        return _result(task)
+
+    monkeypatch.setattr(coalesce, "arun_text_editor_agent", arun)
+    coalescer = RunCoalescer()
+
+    async def main():
+        callers = [asyncio.create_task(coalescer.arun("Task", "generate", "")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0.1)
+        # A new identical call starts its own execution
+        return await coalescer.arun("Task", "generate", "")
+
+    assert asyncio.run(main())["final_text"] == "Final: Task"
+    assert finished == ["Task"]
+    assert coalescer.stats()["executions"] == 2
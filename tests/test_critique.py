@@ -0,0 +1,131 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.critique import CritiqueParseError, decode_object, parse_critique
+from app.metrics import format_profile, run_metrics
+from app.nodes import critic_node, critique_edit_node, editor_node
+from app.service import run_text_editor_agent
+from app.state import RunOptions
+
+CRITIQUE = {
+    "passed": False, "issues": ["Too short.", "No thesis."], "suggestions": ["Expand."],
+    "style_check": "ok", "clarity_check": "ok", "score": 0.5,
+}
+TEXT = json.dumps(CRITIQUE)
+
+
+@pytest.mark.parametrize("reply, repairs", [
+    (TEXT, []),
+    (f"```json\n{TEXT}\n```", ["code_fence"]),
+    (f"Here is my evaluation:\n{TEXT}\nLet me know if {{anything}} else is needed.", ["leading_text", "trailing_text"]),
+    (TEXT[:-1], ["truncated"]),
+])
+def test_replies_are_repaired_locally(reply, repairs):
+    assert parse_critique(reply) == (CRITIQUE, repairs)
+
+def test_truncated_array_keeps_complete_items():
+    data, repairs = decode_object('{"passed": false, "issues": ["Too short.", "No th')
+    assert data == {"passed": False, "issues": ["Too short."]}
+    data, _ = decode_object('{"passed": false, "score": 0.')
+    assert data == {"passed": False}
+    assert repairs == ["truncated"]
+
+def test_braces_inside_strings_do_not_end_the_object():
+    data, repairs = decode_object('{"issues": ["Use {x} consistently"]} trailing')
+    assert data == {"issues": ["Use {x} consistently"]}
+    assert repairs == ["trailing_text"]
+
+@pytest.mark.parametrize("reply", ["no json at all", "[1, 2]", '{"passed": true}', '{"passed": "maybe", "score": 1}'])
+def test_unusable_replies_raise(reply):
+    with pytest.raises(CritiqueParseError):
+        parse_critique(reply)
+
+def test_missing_keys_come_from_the_previous_evaluation():
+    critique, _ = parse_critique('{"passed": true, "score": 0.9}', base=CRITIQUE)
+    assert critique == {**CRITIQUE, "passed": True, "score": 0.9}
+
+def _state(**extra):
+    return {"task": "t", "draft": "Draft", "iteration": 0, "max_iterations": 3, "history": [],
+            "local_rules": False, **extra}
+
+def test_critic_retries_with_fix_instruction(mock_get_llm, mock_llm):
+    mock_llm.invoke.side_effect = [AIMessage(content='{"passed": true}'), AIMessage(content=TEXT)]
+
+    result = critic_node(_state())
+
+    assert result["critique"] == CRITIQUE
+    retry_messages = mock_llm.invoke.call_args_list[1].args[0]
+    first_messages = mock_llm.invoke.call_args_list[0].args[0]
+    assert retry_messages[:-1] == first_messages
+    assert "'score'" in retry_messages[-1].content
+    step = result["history"][0]
+    assert step["llm_calls"] == 2
+    assert step["parse"] == {"reviews": 1, "repaired": 0, "retries": 1, "failures": 0}
+    assert "escalated_from" not in step
+
+def test_unusable_critic_reply_records_a_failing_review(mock_get_llm, mock_llm, monkeypatch):
+    monkeypatch.setenv("CRITIQUE_PARSE_RETRIES", "0")
+    mock_llm.invoke.return_value = AIMessage(content="I think the text is fine.")
+
+    result = critic_node(_state(critique=CRITIQUE))
+
+    assert mock_llm.invoke.call_count == 1
+    assert result["quality_passed"] is False
+    critique = result["critique"]
+    assert critique["parse_error"] == "the reply is not valid JSON"
+    assert critique["score"] is None
+    # The editor still gets the earlier findings
+    assert critique["issues"] == CRITIQUE["issues"]
+    assert result["history"][0]["parse"]["failures"] == 1
+
+def test_run_continues_after_an_unusable_critic_reply(mock_get_llm, mock_llm, monkeypatch):
+    monkeypatch.setenv("CRITIQUE_PARSE_RETRIES", "0")
+    mock_llm.invoke.side_effect = [
+        AIMessage(content="Draft"), AIMessage(content="not json"),
+        AIMessage(content="Edited"), AIMessage(content=json.dumps({**CRITIQUE, "passed": True, "score": 0.9})),
+    ]
+
+    result = run_text_editor_agent("t", "generate", "", max_iterations=3,
+                                   options=RunOptions(local_rules=False))
+
+    assert result["final_text"] == "Edited"
+    assert result["stopped_by"] == "passed"
+
+def test_unusable_candidate_review_ranks_last(mock_get_llm, mock_llm, monkeypatch):
+    monkeypatch.setenv("CRITIQUE_PARSE_RETRIES", "0")
+    drafts = iter(["Draft A", "Draft B"])
+
+    def respond(messages, *args, **kwargs):
+        if "critic" not in messages[0].content:
+            return AIMessage(content=next(drafts))
+        return AIMessage(content="not json" if "Draft A" in messages[-1].content else TEXT)
+
+    mock_llm.invoke.side_effect = respond
+    state = _state(critique=CRITIQUE, editor_candidates=2, candidate_temperature=0.8)
+
+    update = editor_node(state)
+
+    assert update["draft"] == "Draft B"
+    step = update["history"][0]
+    assert step["parse"] == {"reviews": 2, "repaired": 0, "retries": 0, "failures": 1}
+    assert run_metrics(update["history"])["parse_failures"] == 1
+
+def test_unusable_fused_reply_falls_back_to_a_separate_review(mock_get_llm, mock_llm):
+    mock_llm.invoke.side_effect = [
+        AIMessage(content='{"critique": {"passed": false}, "revised_draft": "New"}'),
+        AIMessage(content=TEXT),
+        AIMessage(content="Edited"),
+    ]
+
+    update = critique_edit_node(_state())
+
+    critic, editor = update["history"]
+    assert critic["fused_fallback"].startswith("invalid critique")
+    assert critic["llm_calls"] == 2
+    assert critic["parse"]["failures"] == 1
+    assert update["draft"] == "Edited" and editor["step"] == "editor"
+    metrics = run_metrics(update["history"])
+    assert (metrics["parse_reviews"], metrics["parse_failures"]) == (2, 1)
+    assert any(line.startswith("Critic replies: 2") for line in format_profile(metrics))
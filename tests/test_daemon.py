@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from app import daemon
+from app import server as server_module
+from app.daemon import DaemonRejected, connect, daemon_events, env_fingerprint, serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _fake_stream(fail=False):
+    async def fake(task, mode, user_text, max_iterations, **kwargs):
+        yield {"type": "node_start", "node": "writer"}
+        yield {"type": "token", "node": "writer", "text": "Final"}
+        if fail:
+            raise RuntimeError("no key")
+        yield {"type": "result", "result": {"final_text": f"Final: {task}", "iterations": 1, "stopped_by": "passed"}}
+    return fake
+
+def _run_with_daemon(monkeypatch, tmp_path, scenario, fail=False):
+    monkeypatch.setattr(server_module, "astream_text_editor_agent", _fake_stream(fail))
+    monkeypatch.setattr(daemon, "warm_up", lambda: None)
+
+    async def main():
+        ready = asyncio.get_running_loop().create_future()
+        service = asyncio.create_task(serve(str(tmp_path / "d.sock"), ready=ready))
+        path = await ready
+        try:
+            return await scenario(path)
+        finally:
+            service.cancel()
+            await asyncio.gather(service, return_exceptions=True)
+
+    return asyncio.run(main())
+
+def _request(path, request):
+    # The client is blocking, as in the CLI
+    request = {"env": env_fingerprint(), **request}
+    return asyncio.to_thread(lambda: list(daemon_events(connect(path), request)))
+
+def test_run_returns_result_and_streams_events_on_request(monkeypatch, tmp_path):
+    async def scenario(path):
+        quiet = await _request(path, {"task": "Write"})
+        streamed = await _request(path, {"task": "Write more", "stream": True})
+        return quiet, streamed
+
+    quiet, streamed = _run_with_daemon(monkeypatch, tmp_path, scenario)
+
+    assert [e["type"] for e in quiet] == ["result"]
+    assert quiet[0]["result"]["final_text"] == "Final: Write"
+    assert [e["type"] for e in streamed] == ["node_start", "token", "result"]
+    assert not (tmp_path / "d.sock").exists()
+
+def test_socket_is_private_from_creation(monkeypatch, tmp_path):
+    async def scenario(path):
+        return os.stat(path).st_mode & 0o777
+
+    assert _run_with_daemon(monkeypatch, tmp_path, scenario) == 0o600
+    # The process umask is restored
+    previous = os.umask(0o022)
+    os.umask(previous)
+    assert previous != 0o177
+
+def test_invalid_request_is_rejected(monkeypatch, tmp_path):
+    async def scenario(path):
+        with pytest.raises(DaemonRejected):
+            await _request(path, {"task": "Fix", "mode": "revise"})
+
+    _run_with_daemon(monkeypatch, tmp_path, scenario)
+
+def test_run_with_other_settings_is_rejected(monkeypatch, tmp_path):
+    async def scenario(path):
+        other = {**env_fingerprint(), "OPENAI_MODEL_WRITER": "0" * 16}
+        with pytest.raises(DaemonRejected, match="OPENAI_MODEL_WRITER"):
+            await _request(path, {"task": "Write", "env": other})
+        with pytest.raises(DaemonRejected):
+            await asyncio.to_thread(lambda: list(daemon_events(connect(path), {"task": "Write"})))
+
+    _run_with_daemon(monkeypatch, tmp_path, scenario)
+
+def test_env_fingerprint_covers_run_settings(monkeypatch):
+    monkeypatch.setenv("OPENAI_MODEL_EDITOR", "small")
+    before = env_fingerprint()
+    monkeypatch.setenv("OPENAI_MODEL_EDITOR", "large")
+    monkeypatch.setenv("UNRELATED_SETTING", "1")
+    after = env_fingerprint()
+    assert before["OPENAI_MODEL_EDITOR"] != after["OPENAI_MODEL_EDITOR"]
+    assert "UNRELATED_SETTING" not in after
+    assert "large" not in after.values()
+
+def test_failed_run_raises(monkeypatch, tmp_path):
+    async def scenario(path):
+        with pytest.raises(RuntimeError, match="no key"):
+            await _request(path, {"task": "Write"})
+
+    _run_with_daemon(monkeypatch, tmp_path, scenario, fail=True)
+
+def test_connect_without_daemon(tmp_path):
+    assert connect(str(tmp_path / "missing.sock")) is None
+    # A socket file left behind by a daemon that died
+    stale = tmp_path / "stale.sock"
+    stale.touch()
+    assert connect(str(stale)) is None
+
+def test_cli_uses_daemon_without_loading_the_service_layer(monkeypatch, tmp_path):
+    async def scenario(path):
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-X", "importtime", "-m", "app.main", "--mode", "generate", "--task", "Write",
+            "--report", "", "--daemon-socket", path,
+            cwd=ROOT, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        out, err = await proc.communicate()
+        return proc.returncode, out.decode(), err.decode()
+
+    code, out, err = _run_with_daemon(monkeypatch, tmp_path, scenario)
+
+    assert code == 0
+    assert "Final: Write" in out
+    assert "langgraph" not in err and "app.service" not in err
@@ -0,0 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.graph import GraphConfig, get_graph, precompile_graphs, clear_graph_cache
+from app.stopping import StopPolicy
+
+
+def test_get_graph_returns_cached_instance():
+    clear_graph_cache()
+    assert get_graph() is get_graph(GraphConfig())
+
+def test_get_graph_keys_by_config():
+    clear_graph_cache()
+    default = get_graph()
+    strict = get_graph(GraphConfig(stop_policy=StopPolicy(min_edit_cycles=2)))
+    assert default is not strict
+
+def test_get_graph_is_thread_safe():
+    clear_graph_cache()
+    precompile_graphs([])
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        graphs = list(pool.map(lambda _: get_graph(), range(32)))
+    assert all(g is graphs[0] for g in graphs)
@@ -0,0 +1,61 @@
+import copy
+import json
+
+from app.history import RunResult, build_trace, materialize_history
+from app.patches import text_delta
+
+
+def _editor(old, new, **extra):
+    return {"step": "editor", "delta": text_delta(old, new), **extra}
+
+def test_materialize_history_rebuilds_editor_drafts():
+    history = [
+        {"step": "writer", "content": "A\nB\nC"},
+        {"step": "critic", "feedback": {"passed": False}},
+        _editor("A\nB\nC", "A\nB2\nC", iteration=1),
+        _editor("A\nB2\nC", "A\nB2\nC\nD", iteration=2),
+    ]
+
+    steps = materialize_history(history)
+
+    assert [s.get("content") for s in steps if s["step"] == "editor"] == ["A\nB2\nC", "A\nB2\nC\nD"]
+    assert all("delta" not in s for s in steps)
+    # The compact history is left untouched
+    assert "delta" in history[2]
+
+def test_materialize_history_keeps_chunks_apart():
+    history = [
+        {"step": "writer", "content": "one", "chunk": 0},
+        _editor("one", "one!", chunk=0),
+        {"step": "writer", "content": "two", "chunk": 1},
+        _editor("two", "two!", chunk=1),
+    ]
+
+    contents = [s["content"] for s in materialize_history(history)]
+
+    assert contents == ["one", "one!", "two", "two!"]
+
+def test_trace_is_built_per_chunk():
+    history = [
+        {"step": "writer", "content": "one", "chunk": 0},
+        {"step": "critic", "feedback": {"passed": False}, "chunk": 0},
+        _editor("one", "one!", iteration=1, chunk=0),
+        {"step": "writer", "content": "two", "chunk": 1},
+        {"step": "critic", "feedback": {"passed": True}, "chunk": 1},
+        {"step": "stitch", "seams": 1},
+    ]
+
+    trace = build_trace(history)
+
+    assert [(b["chunk"], b["draft"], b["edited"]) for b in trace] == [(0, "one", "one!"), (1, "two", None)]
+
+def test_run_result_builds_trace_on_first_use():
+    history = [{"step": "writer", "content": "one"}, _editor("one", "one!", iteration=1)]
+    result = RunResult({"final_text": "one!", "raw_history": history})
+
+    copied = copy.deepcopy(result)
+    assert not dict.__contains__(copied, "trace")
+    assert "trace" in result and not dict.__contains__(result, "trace")
+    assert result["trace"][0]["edited"] == "one!"
+    assert json.loads(json.dumps(copied))["trace"] == result["trace"]
+    assert result.get("missing") is None
@@ -71,3 +71,72 @@ def test_max_iterations_limit(mock_get_llm, mock_llm):
     # Should stop at iteration 2
     assert final["iteration"] == 2
     assert final["quality_passed"] is False
+
+def test_full_flow_async(mock_get_llm, mock_llm):
+    """
+    The async path runs the same Writer -> Critic -> Editor -> Critic loop via ainvoke.
+    """
+    import asyncio
+    from app.service import arun_text_editor_agent
+
+    critic_pass = AIMessage(content=json.dumps({
+        "passed": True, "issues": [], "suggestions": [],
+        "style_check": "ok", "clarity_check": "ok", "score": 1.0
+    }))
+    mock_llm.invoke.side_effect = [
+        AIMessage(content="Draft 1"), critic_pass, AIMessage(content="Draft 2"), critic_pass
+    ]
+
+    result = asyncio.run(arun_text_editor_agent("Test Task", "generate", "", 3))
+
+    assert result["final_text"] == "Draft 2"
+    assert result["stopped_by"] == "passed"
+    assert mock_llm.ainvoke.await_count == 4
+    assert len(result["trace"]) == 2
+
+def _fused(passed, score, revised):
+    return AIMessage(content=json.dumps({
+        "critique": {
+            "passed": passed, "issues": [] if passed else ["bad"], "suggestions": [] if passed else ["fix"],
+            "style_check": "ok", "clarity_check": "ok", "score": score
+        },
+        "revised_draft": revised,
+    }))
+
+def test_fused_flow_keeps_history_shape(mock_get_llm, mock_llm):
+    """
+    Writer -> CritiqueEdit (fail, revise) -> CritiqueEdit (pass): one call per iteration.
+    """
+    from app.graph import GraphConfig
+    from app.service import run_text_editor_agent
+
+    mock_llm.invoke.side_effect = [
+        AIMessage(content="Draft 1"),
+        _fused(False, 0.5, "Draft 2"),
+        _fused(True, 0.9, "Draft 2 again"),
+    ]
+
+    result = run_text_editor_agent("Test Task", "generate", "", 3, graph_config=GraphConfig(fused=True))
+
+    assert mock_llm.invoke.call_count == 3
+    assert [s["step"] for s in result["raw_history"]] == ["writer", "critic", "editor", "critic"]
+    assert result["final_text"] == "Draft 2"
+    assert result["stopped_by"] == "passed"
+    assert result["trace"][0]["edited"] == "Draft 2"
+    assert result["trace"][1]["critic"]["passed"] is True
+
+def test_fused_flow_terminal_review_is_critique_only(mock_get_llm, mock_llm):
+    from app.graph import GraphConfig
+    from app.service import run_text_editor_agent
+
+    critic_fail = AIMessage(content=json.dumps({
+        "passed": False, "issues": ["bad"], "suggestions": ["fix"],
+        "style_check": "ok", "clarity_check": "ok", "score": 0.5
+    }))
+    mock_llm.invoke.side_effect = [AIMessage(content="Draft 1"), _fused(False, 0.5, "Draft 2"), critic_fail]
+
+    result = run_text_editor_agent("Test Task", "generate", "", 1, graph_config=GraphConfig(fused=True))
+
+    assert [s["step"] for s in result["raw_history"]] == ["writer", "critic", "editor", "critic"]
+    assert "fused" not in result["raw_history"][-1]
+    assert result["stopped_by"] == "max_iterations"
@@ -0,0 +1,80 @@
+import pytest
+
+from app import llm as llm_module
+from app.llm import (
+    escalation_model, get_llm, model_for, pool_stats, evict_idle_clients, reset_llm_clients
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_registry(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+    reset_llm_clients()
+    yield
+    reset_llm_clients()
+
+
+def test_get_llm_reuses_client_for_same_settings():
+    first = get_llm(json_mode=False)
+    second = get_llm(json_mode=False)
+
+    assert first is second
+    stats = pool_stats()
+    assert stats["clients_created"] == 1
+    assert stats["clients_reused"] == 1
+
+def test_get_llm_separates_clients_by_settings():
+    plain = get_llm(json_mode=False)
+    json_llm = get_llm(json_mode=True)
+    other_model = get_llm(json_mode=False, model="gpt-4o-mini")
+
+    assert plain is not json_llm
+    assert plain is not other_model
+    # All clients share one connection pool
+    assert plain.http_client is json_llm.http_client is other_model.http_client
+
+def test_idle_clients_are_evicted():
+    get_llm(json_mode=False)
+    assert evict_idle_clients(max_idle=-1) == 1
+    assert pool_stats()["clients_active"] == 0
+
+def test_get_llm_requires_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY")
+    with pytest.raises(ValueError):
+        get_llm()
+
+def test_trace_hook_counts_new_connections():
+    llm_module._on_trace("connection.connect_tcp.complete", {})
+    llm_module._bump("requests", 3)
+
+    stats = pool_stats()
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 2
+
+def test_model_for_routes_by_node(monkeypatch):
+    monkeypatch.setenv("OPENAI_MODEL", "gpt-4o")
+    monkeypatch.setenv("OPENAI_MODEL_CRITIC", "gpt-4o-mini")
+    monkeypatch.delenv("OPENAI_MODEL_EDITOR", raising=False)
+
+    assert model_for("critic") == "gpt-4o-mini"
+    assert model_for("editor") == "gpt-4o"
+    assert get_llm(node="critic").model_name == "gpt-4o-mini"
+    # An explicit model wins over routing
+    assert get_llm(node="critic", model="gpt-4.1").model_name == "gpt-4.1"
+
+def test_escalation_model_only_near_threshold(monkeypatch):
+    monkeypatch.delenv("OPENAI_MODEL_CRITIC_ESCALATION", raising=False)
+    assert escalation_model(0.8) is None
+
+    monkeypatch.setenv("OPENAI_MODEL_CRITIC_ESCALATION", "gpt-4o")
+    monkeypatch.setenv("CRITIC_ESCALATION_THRESHOLD", "0.8")
+    monkeypatch.setenv("CRITIC_ESCALATION_BAND", "0.1")
+    monkeypatch.setenv("OPENAI_MODEL_CRITIC", "gpt-4o-mini")
+    assert escalation_model(0.75) == "gpt-4o"
+    assert escalation_model(0.4) is None
+    assert escalation_model(0.95) is None
+    assert escalation_model(None) is None
+    # The critic already runs on the escalation model
+    monkeypatch.setenv("OPENAI_MODEL_CRITIC", "gpt-4o")
+    assert escalation_model(0.8) is None
@@ -0,0 +1,78 @@
+import json
+
+import httpx
+import openai
+import pytest
+from langchain_core.messages import AIMessage
+
+from app import metrics
+from app.metrics import format_profile, invoke_llm, run_metrics
+from app.service import run_text_editor_agent
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(metrics, "RETRY_BASE_DELAY", 0.0)
+
+def _connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+def test_invoke_llm_counts_retries(mock_llm):
+    mock_llm.invoke.side_effect = [_connection_error(), AIMessage(
+        content="ok",
+        usage_metadata={"input_tokens": 10, "output_tokens": 2, "total_tokens": 12,
+                        "input_token_details": {"cache_read": 8}},
+    )]
+    calls = []
+
+    assert invoke_llm(mock_llm, [], calls).content == "ok"
+    assert calls[0]["retries"] == 1
+    assert calls[0]["cached_tokens"] == 8
+
+def test_invoke_llm_gives_up_after_max_retries(mock_llm, monkeypatch):
+    monkeypatch.setenv("LLM_MAX_RETRIES", "1")
+    mock_llm.invoke.side_effect = _connection_error()
+
+    with pytest.raises(openai.APIConnectionError):
+        invoke_llm(mock_llm, [], [])
+    assert mock_llm.invoke.call_count == 2
+
+def test_run_metrics_aggregates_per_node():
+    history = [
+        {"step": "writer", "wall_ms": 100.0, "queue_ms": 1.0,
+         "calls": [{"latency_ms": 90.0, "input_tokens": 50, "output_tokens": 200, "retries": 0}]},
+        {"step": "critic", "wall_ms": 40.0, "queue_ms": 2.0,
+         "calls": [{"latency_ms": 35.0, "input_tokens": 300, "output_tokens": 60, "retries": 1}]},
+        # Response-cache hits are counted but their tokens were not paid for
+        {"step": "critic", "wall_ms": 1.0, "calls": [{"latency_ms": 0.5, "input_tokens": 300, "cached": True}]},
+        {"step": "critic", "source": "rules", "llm_calls": 0, "wall_ms": 0.2},
+    ]
+
+    totals = run_metrics(history)
+
+    assert totals["steps"] == 4
+    assert totals["llm_calls"] == 3
+    assert totals["input_tokens"] == 350
+    assert totals["retries"] == 1
+    assert totals["cache_hits"] == 1
+    assert totals["nodes"]["critic"]["steps"] == 3
+    assert totals["nodes"]["critic"]["wall_ms"] == 41.2
+    assert format_profile(totals)[-1].startswith("total")
+
+def test_run_result_includes_step_timings_and_metrics(mock_get_llm, mock_llm):
+    mock_llm.invoke.side_effect = [
+        AIMessage(content="Draft 1", usage_metadata={"input_tokens": 5, "output_tokens": 7, "total_tokens": 12}),
+        AIMessage(content=json.dumps({"passed": True, "issues": [], "suggestions": [],
+                                      "style_check": "", "clarity_check": "", "score": 1.0})),
+        AIMessage(content="Draft 2"),
+        AIMessage(content=json.dumps({"passed": True, "issues": [], "suggestions": [],
+                                      "style_check": "", "clarity_check": "", "score": 1.0})),
+    ]
+
+    result = run_text_editor_agent("t", "generate", "", 3)
+
+    for step in result["raw_history"]:
+        assert step["wall_ms"] >= 0
+        assert step["queue_ms"] >= 0
+    assert result["metrics"]["nodes"]["writer"]["output_tokens"] == 7
+    assert result["metrics"]["llm_calls"] == 4
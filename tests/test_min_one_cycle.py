@@ -1,4 +1,5 @@
 from app.graph import verify_cycle, END
+from app.stopping import StopPolicy
 
 def test_verify_cycle_minimum_one_run():
     """
@@ -47,3 +48,14 @@ def test_verify_cycle_stops_at_max():
     }
     next_node = verify_cycle(state_mock)
     assert next_node == END
+
+def test_verify_cycle_respects_min_edit_cycles():
+    """
+    With min_edit_cycles=2, a passing critique after one edit still goes to 'editor'.
+    """
+    state_mock = {
+        "iteration": 1,
+        "max_iterations": 3,
+        "quality_passed": True
+    }
+    assert verify_cycle(state_mock, StopPolicy(min_edit_cycles=2)) == "editor"
@@ -80,3 +80,270 @@ def test_editor_node(mock_get_llm, mock_llm):
     assert result["iteration"] == 1
     assert len(result["history"]) == 1
     assert result["history"][0]["step"] == "editor"
+    # The step stores a delta against the draft it revised, not the full text
+    assert "content" not in result["history"][0]
+    assert result["history"][0]["delta"]
+    assert state["history"] == []
+
+def test_async_nodes_match_sync(mock_get_llm, mock_llm):
+    import asyncio
+    from app.nodes import awriter_node, acritic_node
+
+    mock_llm.invoke.return_value = AIMessage(content="Async Draft")
+    result = asyncio.run(awriter_node({"task": "t", "mode": "generate", "history": []}))
+    assert result["draft"] == "Async Draft"
+    assert mock_llm.ainvoke.await_count == 1
+
+    feedback = {"passed": True, "issues": [], "suggestions": [],
+                "style_check": "ok", "clarity_check": "ok", "score": 0.9}
+    mock_llm.invoke.return_value = AIMessage(content=json.dumps(feedback))
+    result = asyncio.run(acritic_node({"task": "t", "draft": "d", "history": []}))
+    assert result["quality_passed"] is True
+
+def test_editor_node_patch_mode(mock_get_llm, mock_llm):
+    patch = {"edits": [{"op": "replace", "paragraph": 1, "find": "Old", "replace": "New"}]}
+    mock_llm.invoke.return_value = AIMessage(content=json.dumps(patch))
+    state = {
+        "task": "t",
+        "draft": "Old Draft",
+        "critique": {"issues": ["error"], "suggestions": ["fix"]},
+        "iteration": 0,
+        "history": [],
+        "editor_mode": "patch",
+    }
+
+    result = editor_node(state)
+
+    assert result["draft"] == "New Draft"
+    assert result["history"][0]["edit_mode"] == "patch"
+    assert result["history"][0]["patch_size"] == {"ops": 1, "chars": 3}
+    assert mock_get_llm.call_args.kwargs["json_mode"] is True
+
+def test_editor_node_patch_falls_back_to_rewrite(mock_get_llm, mock_llm):
+    bad_patch = {"edits": [{"op": "replace", "paragraph": 1, "find": "absent", "replace": "x"}]}
+    mock_llm.invoke.side_effect = [AIMessage(content=json.dumps(bad_patch)), AIMessage(content="Rewritten")]
+    state = {
+        "task": "t",
+        "draft": "Old Draft",
+        "critique": {"issues": [], "suggestions": []},
+        "iteration": 0,
+        "history": [],
+        "editor_mode": "patch",
+    }
+
+    result = editor_node(state)
+
+    assert result["draft"] == "Rewritten"
+    assert result["history"][0]["edit_mode"] == "rewrite"
+    assert "exactly once" in result["history"][0]["patch_fallback"]
+
+PRIOR_CRITIQUE = {
+    "passed": False, "issues": ["intro is vague", "weak ending"], "suggestions": ["sharpen intro"],
+    "style_check": "ok", "clarity_check": "ok", "score": 0.6
+}
+
+def _incremental_state(draft):
+    return {
+        "task": "t",
+        "draft": draft,
+        "previous_draft": "Intro.\n\nBody one.\n\nBody two.\n\nEnding.",
+        "critique": PRIOR_CRITIQUE,
+        "critic_mode": "incremental",
+        "history": [],
+    }
+
+def test_critic_node_incremental_sends_only_changes(mock_get_llm, mock_llm):
+    mock_llm.invoke.return_value = AIMessage(content=json.dumps(
+        {"passed": True, "issues": ["weak ending"], "suggestions": [], "score": 0.8}
+    ))
+    state = _incremental_state("Sharp intro.\n\nBody one.\n\nBody two.\n\nEnding.")
+
+    result = critic_node(state)
+
+    prompt = mock_llm.invoke.call_args[0][0][1].content
+    assert "Sharp intro." in prompt
+    assert "Body two." not in prompt
+    assert "intro is vague" in prompt  # previous evaluation is included
+    # Missing keys are carried over from the previous critique
+    assert result["critique"]["style_check"] == "ok"
+    assert result["critique"]["score"] == 0.8
+    assert result["history"][0]["critic_mode"] == "incremental"
+    assert result["history"][0]["changed_paragraphs"] == 1
+
+def test_critic_node_incremental_carries_forward_unchanged_draft(mock_get_llm, mock_llm):
+    state = _incremental_state("Intro.\n\nBody one.\n\nBody two.\n\nEnding.")
+
+    result = critic_node(state)
+
+    mock_llm.invoke.assert_not_called()
+    assert result["critique"] == PRIOR_CRITIQUE
+    assert result["history"][0]["critic_mode"] == "carried_forward"
+
+def test_critic_node_incremental_falls_back_on_large_change(mock_get_llm, mock_llm):
+    mock_llm.invoke.return_value = AIMessage(content=json.dumps(PRIOR_CRITIQUE))
+    state = _incremental_state("All\n\nnew\n\ntext\n\nhere.")
+
+    result = critic_node(state)
+
+    assert "Current Draft:" in mock_llm.invoke.call_args[0][0][1].content
+    assert "critic_mode" not in result["history"][0]
+
+def test_critic_node_hard_rule_skips_llm(mock_get_llm, mock_llm):
+    state = {"task": "Объясни графы (120–150 слов)", "draft": "Слишком коротко.", "history": []}
+
+    result = critic_node(state)
+
+    mock_llm.invoke.assert_not_called()
+    assert result["quality_passed"] is False
+    assert result["history"][0]["source"] == "rules"
+    assert "below the minimum" in result["critique"]["issues"][0]
+
+def test_critic_node_merges_soft_rule_issues(mock_get_llm, mock_llm):
+    feedback = {"passed": True, "issues": [], "suggestions": [],
+                "style_check": "ok", "clarity_check": "ok", "score": 0.9}
+    mock_llm.invoke.return_value = AIMessage(content=json.dumps(feedback))
+    state = {"task": "t", "draft": "Graphs are are useful.", "history": []}
+
+    result = critic_node(state)
+
+    assert result["critique"]["issues"] == ["Immediately repeated words: are."]
+    assert result["history"][0]["rule_issues"] == ["repeated_words"]
+
+def test_writer_node_caps_tokens_from_length_target(mock_get_llm, mock_llm):
+    writer_node({"task": "Эссе (120–150 слов)", "mode": "generate", "history": []})
+    assert mock_get_llm.call_args.kwargs["max_tokens"] == 158 * 3 + 100
+
+    writer_node({"task": "Эссе (120–150 слов)", "mode": "generate", "history": [], "local_rules": False})
+    assert mock_get_llm.call_args.kwargs["max_tokens"] is None
+
+def test_steps_record_model_latency_and_tokens(mock_get_llm, mock_llm):
+    mock_llm.invoke.return_value = AIMessage(
+        content="Draft",
+        response_metadata={"model_name": "gpt-4o-2024-08-06"},
+        usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15},
+    )
+    result = writer_node({"task": "t", "mode": "generate", "history": []})
+
+    assert mock_get_llm.call_args.kwargs["node"] == "writer"
+    call = result["history"][0]["calls"][0]
+    assert call["model"] == "gpt-4o-2024-08-06"
+    assert (call["input_tokens"], call["output_tokens"]) == (12, 3)
+    assert call["latency_ms"] >= 0
+
+def test_critic_node_escalates_borderline_score(mock_get_llm, mock_llm, monkeypatch):
+    monkeypatch.setenv("OPENAI_MODEL_CRITIC", "gpt-4o-mini")
+    monkeypatch.setenv("OPENAI_MODEL_CRITIC_ESCALATION", "gpt-4o")
+    monkeypatch.setenv("CRITIC_ESCALATION_THRESHOLD", "0.8")
+    monkeypatch.setenv("CRITIC_ESCALATION_BAND", "0.1")
+    small = {"passed": False, "issues": ["meh"], "suggestions": [], "style_check": "", "clarity_check": "", "score": 0.75}
+    large = {**small, "passed": True, "issues": [], "score": 0.85}
+    mock_llm.invoke.side_effect = [
+        AIMessage(content=json.dumps(small), response_metadata={"model_name": "gpt-4o-mini"}),
+        AIMessage(content=json.dumps(large), response_metadata={"model_name": "gpt-4o"}),
+    ]
+    state = {"task": "t", "draft": "Draft", "history": [], "local_rules": False}
+
+    result = critic_node(state)
+
+    assert result["quality_passed"] is True
+    step = result["history"][0]
+    assert step["escalated_from"] == "gpt-4o-mini"
+    assert step["llm_calls"] == 2
+    assert [c["model"] for c in step["calls"]] == ["gpt-4o-mini", "gpt-4o"]
+    assert mock_get_llm.call_args.kwargs["model"] == "gpt-4o"
+
+def test_unusable_escalated_review_keeps_the_first_verdict(mock_get_llm, mock_llm, monkeypatch):
+    import asyncio
+    from app.nodes import acritic_node
+
+    monkeypatch.setenv("OPENAI_MODEL_CRITIC", "gpt-4o-mini")
+    monkeypatch.setenv("OPENAI_MODEL_CRITIC_ESCALATION", "gpt-4o")
+    monkeypatch.setenv("CRITIC_ESCALATION_THRESHOLD", "0.8")
+    monkeypatch.setenv("CRITIQUE_PARSE_RETRIES", "0")
+    small = {"passed": False, "issues": ["meh"], "suggestions": [], "style_check": "", "clarity_check": "", "score": 0.75}
+    replies = [
+        AIMessage(content=json.dumps(small), response_metadata={"model_name": "gpt-4o-mini"}),
+        AIMessage(content="Looks fine to me.", response_metadata={"model_name": "gpt-4o"}),
+    ]
+    state = {"task": "t", "draft": "Draft", "history": [], "local_rules": False}
+
+    mock_llm.invoke.side_effect = list(replies)
+    result = critic_node(state)
+    mock_llm.invoke.side_effect = list(replies)
+    async_result = asyncio.run(acritic_node(state))
+
+    for result in (result, async_result):
+        assert result["critique"]["score"] == 0.75
+        step = result["history"][0]
+        assert "escalated_from" not in step
+        assert step["llm_calls"] == 2
+
+def test_critic_node_does_not_escalate_to_its_own_model(mock_get_llm, mock_llm, monkeypatch):
+    monkeypatch.setenv("OPENAI_MODEL_CRITIC", "gpt-4o")
+    monkeypatch.setenv("OPENAI_MODEL_CRITIC_ESCALATION", "gpt-4o")
+    monkeypatch.setenv("CRITIC_ESCALATION_THRESHOLD", "0.8")
+    critique = {"passed": False, "issues": ["meh"], "suggestions": [], "style_check": "", "clarity_check": "", "score": 0.75}
+    # The API reports a dated snapshot of the requested model
+    mock_llm.invoke.return_value = AIMessage(content=json.dumps(critique), response_metadata={"model_name": "gpt-4o-2024-08-06"})
+
+    step = critic_node({"task": "t", "draft": "Draft", "history": [], "local_rules": False})["history"][0]
+
+    assert len(step["calls"]) == 1
+    assert "escalated_from" not in step
+
+def _candidate_llm(drafts, best):
+    """
+    Writer/editor calls return the drafts in turn; the critic passes only `best`.
+    """
+    import itertools
+    import threading
+
+    counter, lock = itertools.count(), threading.Lock()
+
+    def respond(messages, *args, **kwargs):
+        if "critic" in messages[0].content:
+            passed = best in messages[-1].content
+            return AIMessage(content=json.dumps({
+                "passed": passed, "issues": [], "suggestions": [], "style_check": "ok",
+                "clarity_check": "ok", "score": 0.9 if passed else 0.4,
+            }))
+        with lock:
+            return AIMessage(content=drafts[next(counter) % len(drafts)])
+    return respond
+
+def test_editor_candidates_advance_best_and_critic_reuses_its_review(mock_get_llm, mock_llm):
+    from app.metrics import run_metrics
+    from app.nodes import _merge
+
+    mock_llm.invoke.side_effect = _candidate_llm(["Draft one", "Draft two", "Draft three"], "Draft two")
+    state = {
+        "task": "t", "draft": "Old Draft", "critique": {"issues": ["error"], "suggestions": ["fix"]},
+        "iteration": 0, "history": [], "editor_candidates": 3, "local_rules": False,
+    }
+
+    update = editor_node(state)
+
+    assert update["draft"] == "Draft two"
+    step = update["history"][0]
+    assert [c["passed"] for c in step["candidates"]].count(True) == 1
+    assert step["llm_calls"] == 6 and len(step["calls"]) == 6
+    assert run_metrics(update["history"])["speculative_calls"] == 4
+
+    calls = mock_llm.invoke.call_count
+    review = critic_node(_merge(state, update))
+    assert mock_llm.invoke.call_count == calls
+    assert review["quality_passed"] is True
+    assert review["history"][0]["source"] == "candidates"
+
+def test_writer_candidates_async(mock_get_llm, mock_llm):
+    import asyncio
+    from app.nodes import awriter_node
+
+    mock_llm.invoke.side_effect = _candidate_llm(["First", "Second"], "Second")
+    state = {"task": "t", "mode": "generate", "history": [], "writer_candidates": 2, "local_rules": False}
+
+    result = asyncio.run(awriter_node(state))
+
+    assert result["draft"] == "Second"
+    assert result["history"][0]["chosen"] == 1
+    assert mock_llm.ainvoke.await_count == 4
@@ -0,0 +1,61 @@
+import pytest
+
+from app.patches import (
+    PatchError, apply_delta, apply_patch, changed_paragraphs, number_paragraphs, patch_size, text_delta
+)
+from app.rubric import EditPatch
+
+DRAFT = "First paragraph.\n\nSecond one here.\n\nThird."
+
+
+def _patch(*edits):
+    return EditPatch(edits=list(edits))
+
+def test_number_paragraphs():
+    assert number_paragraphs(DRAFT) == "[1] First paragraph.\n\n[2] Second one here.\n\n[3] Third."
+
+def test_apply_patch_uses_original_numbering():
+    patch = _patch(
+        {"op": "delete", "paragraph": 1},
+        {"op": "replace", "paragraph": 2, "find": "one here", "replace": "paragraph"},
+        {"op": "insert_after", "paragraph": 2, "text": "Inserted."},
+        {"op": "insert_after", "paragraph": 0, "text": "Title"},
+    )
+    assert apply_patch(DRAFT, patch) == "Title\n\nSecond paragraph.\n\nInserted.\n\nThird."
+
+def test_empty_patch_keeps_draft():
+    assert apply_patch(DRAFT, _patch()) == DRAFT
+
+@pytest.mark.parametrize("edit", [
+    {"op": "delete", "paragraph": 4},
+    {"op": "replace", "paragraph": 1, "find": "missing", "replace": "x"},
+    {"op": "replace", "paragraph": 1, "find": "", "replace": "x"},
+    {"op": "insert_after", "paragraph": 1},
+])
+def test_apply_patch_rejects_invalid_edits(edit):
+    with pytest.raises(PatchError):
+        apply_patch(DRAFT, _patch(edit))
+
+def test_patch_size():
+    patch = _patch({"op": "replace", "paragraph": 1, "find": "First", "replace": "1st"},
+                   {"op": "delete", "paragraph": 3})
+    assert patch_size(patch) == {"ops": 2, "chars": 3}
+
+def test_changed_paragraphs_reports_only_changed_regions():
+    new = "First paragraph.\n\nSecond, rewritten.\n\nThird.\n\nFourth."
+    regions = changed_paragraphs(DRAFT, new)
+
+    assert regions == [
+        {"start": 2, "old": ["Second one here."], "new": ["Second, rewritten."]},
+        {"start": 4, "old": [], "new": ["Fourth."]},
+    ]
+    assert changed_paragraphs(DRAFT, DRAFT) == []
+
+def test_text_delta_round_trip():
+    new = "First paragraph.\n\nSecond one, rewritten.\n\nThird.\n\nFourth."
+    delta = text_delta(DRAFT, new)
+
+    assert apply_delta(DRAFT, delta) == new
+    # Only the changed lines are stored
+    assert sum(len(text) for _, _, text in delta) < len(new)
+    assert text_delta(DRAFT, DRAFT) == []
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.patches import text_delta
+from app.report import JsonlReportWriter, load_trace, read_report, report_parts
+from app.service import run_text_editor_agent
+
+STEPS = [
+    {"step": "writer", "content": "Draft 1"},
+    {"step": "critic", "feedback": {"passed": False, "score": 0.5}},
+    {"step": "editor", "delta": text_delta("Draft 1", "Draft 2"), "iteration": 1},
+    {"step": "critic", "feedback": {"passed": True, "score": 1.0}},
+]
+
+def test_jsonl_report_rebuilds_report_json_format(tmp_path):
+    path = str(tmp_path / "report.jsonl")
+    with JsonlReportWriter(path) as writer:
+        for step in STEPS:
+            writer.write_step(step)
+
+    steps = read_report(path)
+
+    assert steps[2] == {"step": "editor", "content": "Draft 2", "iteration": 1}
+    trace = load_trace(path)
+    assert [block["edited"] for block in trace] == ["Draft 2", None]
+
+@pytest.mark.parametrize("suffix", [".jsonl.gz", ".jsonl.zst"])
+def test_compressed_report_rotates_and_survives_crash(tmp_path, suffix):
+    if suffix.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    path = str(tmp_path / f"batch{suffix}")
+    writer = JsonlReportWriter(path, fsync=True, max_bytes=120)
+    for step in STEPS:
+        writer.write_step(step, run="doc1")
+    writer.write_step({"step": "writer", "content": "Other"}, run="doc2")
+    # Never closed, as after a crash: every flushed line is still readable
+
+    assert len(report_parts(path)) > 1
+    doc1 = read_report(path, run="doc1")
+    assert [s["step"] for s in doc1] == ["writer", "critic", "editor", "critic"]
+    assert doc1[2]["content"] == "Draft 2"
+    assert read_report(path, run="doc2") == [{"step": "writer", "content": "Other"}]
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = tmp_path / "report.jsonl"
+    path.write_text(json.dumps(STEPS[0]) + "\n" + '{"step": "crit', encoding="utf-8")
+
+    assert read_report(str(path)) == [STEPS[0]]
+
+def test_run_writes_steps_as_nodes_finish(tmp_path, mock_get_llm, mock_llm):
+    mock_llm.invoke.side_effect = [
+        AIMessage(content="Draft 1"),
+        AIMessage(content=json.dumps({"passed": False, "issues": ["bad"], "suggestions": ["fix"],
+                                      "style_check": "", "clarity_check": "", "score": 0.5})),
+        AIMessage(content="Draft 2"),
+        AIMessage(content=json.dumps({"passed": True, "issues": [], "suggestions": [],
+                                      "style_check": "", "clarity_check": "", "score": 1.0})),
+    ]
+    path = str(tmp_path / "report.jsonl")
+
+    with JsonlReportWriter(path) as writer:
+        result = run_text_editor_agent("t", "generate", "", 3, on_step=writer.write_step)
+
+    assert result["final_text"] == "Draft 2"
+    assert load_trace(path) == result["trace"]
@@ -0,0 +1,94 @@
+import pytest
+
+from app.rubric import ValidationResult
+from app.rules import LengthConstraint, check_draft, length_constraint, max_tokens_for, parse_length, to_critique
+
+
+@pytest.mark.parametrize("task, expected", [
+    ("Объясни теорию графов простыми словами (120–150 слов)", LengthConstraint(114, 158, True)),
+    ("Напиши от 100 до 200 слов", LengthConstraint(95, 210, True)),
+    ("Write no more than 200 words", LengthConstraint(None, 210, True)),
+    ("Напиши краткую актуальность проекта (120 слов)", LengthConstraint(96, 144, False)),
+    ("Напиши: Привет.", None),
+])
+def test_parse_length(task, expected):
+    assert parse_length(task) == expected
+
+@pytest.mark.parametrize("task", [
+    "Write 10 tips, each up to 20 words",
+    "Use 2 words in title; essay of 300 words",
+    "Напиши 5 советов по 20 слов",
+    "Напиши эссе (300 слов), заголовок не длиннее 5 слов",
+    "Write a summary of at most 50 words per paragraph",
+])
+def test_per_item_or_several_lengths_are_no_constraint(task):
+    assert parse_length(task) is None
+    assert max_tokens_for(task) is None
+    assert "length" not in _rules(task, "слово " * 5)
+
+def test_max_tokens_for_uses_upper_bound():
+    assert max_tokens_for("(120–150 слов)") == 158 * 3 + 100
+    assert max_tokens_for("at least 300 words") is None
+
+def test_max_tokens_only_for_hard_limits():
+    assert max_tokens_for("Explain the difference between 2 words in 120 words") is None
+    assert max_tokens_for("(120–150 слов)", share=0.5) is None
+
+def test_chunk_gets_a_soft_share_of_the_length_target():
+    assert length_constraint("(120–150 слов)", share=0.5) == LengthConstraint(57, 79, False)
+    assert _rules("(120–150 слов)", "слово " * 20 + "текст", share=0.15) == {"repeated_words": False}
+
+def _rules(task, draft, share=1.0):
+    return {i.rule: i.hard for i in check_draft(task, draft, share)}
+
+def test_length_violation_is_hard_for_explicit_range():
+    assert _rules("(120–150 слов)", "слово " * 20) == {"length": True, "repeated_words": False}
+
+@pytest.mark.parametrize("draft", [
+    "Конечно! Вот исправленный текст:\n\nТеория графов изучает связи.",
+    "Sure!\nGraphs model relations.",
+    "Here's the revised text\n\nGraphs model relations.",
+])
+def test_lead_in_line_is_filler(draft):
+    assert _rules("t", draft)["filler"] is True
+
+@pytest.mark.parametrize("draft", [
+    "Here is how graphs work. A graph models relations.",
+    "Конечно, теория графов сложна, но её основы просты.",
+    "Certainly the most useful structure is a tree.",
+])
+def test_content_starting_like_filler_passes(draft):
+    assert "filler" not in _rules("t", draft)
+
+@pytest.mark.parametrize("closing", [
+    "If you need, I can also shorten the text.",
+    "Would you like me to add examples?",
+    "Если нужно, я могу сократить текст.",
+])
+def test_assistant_offer_at_the_end_is_filler(closing):
+    assert _rules("t", f"Graphs model relations.\n\n{closing}")["filler"] is True
+
+@pytest.mark.parametrize("closing", [
+    "Please let me know if you have any questions.\n\nBest regards,\nAnna",
+    "Feel free to drop by any time!",
+    "I hope this helps with your planning. Let me know if anything changes.",
+    "Дайте знать, если появятся вопросы.\n\nС уважением,\nАнна",
+])
+def test_letter_closings_are_not_filler(closing):
+    draft = f"Dear team,\n\nThe meeting moves to Friday at 10:00.\n\n{closing}"
+    assert "filler" not in _rules("t", draft)
+
+def test_filler_is_hard():
+    assert _rules("t", "Graphs model relations.\n\nIf you want, I can expand it.")["filler"] is True
+
+def test_clean_text_passes():
+    draft = "Граф состоит из вершин и рёбер.\n\nОн описывает связи между объектами."
+    assert check_draft("Объясни графы", draft) == []
+
+def test_long_single_paragraph_flags_structure():
+    draft = " ".join(f"w{i}" for i in range(150))
+    assert _rules("t", draft) == {"structure": False}
+
+def test_to_critique_matches_schema():
+    critique = to_critique(check_draft("(120–150 слов)", "короткий текст"))
+    assert ValidationResult(**critique).passed is False
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app import server as server_module
+from app.server import parse_job_request, serve
+
+
+def _fake_stream(delay=0.0):
+    async def fake(task, mode, user_text, max_iterations, **kwargs):
+        yield {"type": "node_start", "node": "writer"}
+        await asyncio.sleep(delay)
+        yield {"type": "token", "node": "writer", "text": "Final"}
+        yield {"type": "result", "result": {"final_text": f"Final: {task}", "iterations": 1, "stopped_by": "passed"}}
+    return fake
+
+def _run_with_server(monkeypatch, scenario, delay=0.0, **serve_kwargs):
+    monkeypatch.setattr(server_module, "astream_text_editor_agent", _fake_stream(delay))
+
+    async def main():
+        ready = asyncio.get_running_loop().create_future()
+        service = asyncio.create_task(serve(port=0, ready=ready, **serve_kwargs))
+        host, port = await ready
+        try:
+            async with httpx.AsyncClient(base_url=f"http://{host}:{port}") as client:
+                return await scenario(client)
+        finally:
+            service.cancel()
+            await asyncio.gather(service, return_exceptions=True)
+
+    return asyncio.run(main())
+
+async def _wait_for(client, job_id, status):
+    for _ in range(200):
+        current = (await client.get(f"/jobs/{job_id}")).json()["status"]
+        if current == status:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job never reached {status}")
+
+def test_submit_and_fetch_result(monkeypatch):
+    async def scenario(client):
+        submitted = await client.post("/jobs", json={"task": "Write"})
+        assert submitted.status_code == 202
+        job_id = submitted.json()["id"]
+        await _wait_for(client, job_id, "done")
+        result = await client.get(f"/jobs/{job_id}/result")
+        assert result.json()["final_text"] == "Final: Write"
+
+        stream = await client.get(f"/jobs/{job_id}/stream")
+        events = [json.loads(line[len("data: "):]) for line in stream.text.splitlines() if line.startswith("data: ")]
+        assert [e["type"] for e in events][-2:] == ["status", "result"]
+
+    _run_with_server(monkeypatch, scenario)
+
+def test_full_queue_is_rejected_with_retry_after(monkeypatch):
+    async def scenario(client):
+        responses = []
+        for i in range(3):
+            responses.append(await client.post("/jobs", json={"task": f"Write {i}"}))
+            await asyncio.sleep(0.02)
+        # One job runs, one waits in the queue, the third is turned away
+        assert [r.status_code for r in responses] == [202, 202, 429]
+        assert int(responses[2].headers["Retry-After"]) >= 1
+        assert (await client.get("/health")).json()["queued"] == 1
+
+    _run_with_server(monkeypatch, scenario, delay=5.0, workers=1, max_queue=1)
+
+def test_cancel_running_job(monkeypatch):
+    async def scenario(client):
+        job_id = (await client.post("/jobs", json={"task": "Write"})).json()["id"]
+        await _wait_for(client, job_id, "running")
+        assert (await client.delete(f"/jobs/{job_id}")).status_code == 200
+        await _wait_for(client, job_id, "cancelled")
+        assert (await client.get(f"/jobs/{job_id}/result")).status_code == 409
+
+    _run_with_server(monkeypatch, scenario, delay=5.0)
+
+def test_invalid_requests_are_rejected(monkeypatch):
+    async def scenario(client):
+        assert (await client.post("/jobs", json={"mode": "generate"})).status_code == 400
+        assert (await client.post("/jobs", json={"task": "t", "options": {"bogus": 1}})).status_code == 400
+        assert (await client.get("/jobs/unknown")).status_code == 404
+
+    _run_with_server(monkeypatch, scenario)
+
+def test_parse_job_request_builds_run_config():
+    request = parse_job_request({
+        "task": "t", "options": {"editor_mode": "patch"},
+        "graph": {"fused": True, "stop_policy": {"target_score": 0.9}},
+    })
+
+    assert request["options"].editor_mode == "patch"
+    assert request["graph_config"].fused is True
+    assert request["graph_config"].stop_policy.target_score == 0.9
+
+def test_identical_submissions_share_one_job(monkeypatch):
+    async def scenario(client):
+        first = (await client.post("/jobs", json={"task": "Same"})).json()["id"]
+        second = (await client.post("/jobs", json={"task": "Same"})).json()["id"]
+        other = (await client.post("/jobs", json={"task": "Other"})).json()["id"]
+        assert first == second != other
+        await _wait_for(client, first, "done")
+        # Reused from the memo after it finished
+        assert (await client.post("/jobs", json={"task": "Same"})).json()["id"] == first
+        health = (await client.get("/health")).json()
+        assert (health["coalesced"], health["memo_hits"]) == (1, 1)
+
+    _run_with_server(monkeypatch, scenario, delay=0.05)
+
+def test_shared_job_is_cancelled_only_by_its_last_submitter(monkeypatch):
+    async def scenario(client):
+        job_id = (await client.post("/jobs", json={"task": "Same"})).json()["id"]
+        assert (await client.post("/jobs", json={"task": "Same"})).json()["id"] == job_id
+        await _wait_for(client, job_id, "running")
+        assert (await client.delete(f"/jobs/{job_id}")).status_code == 200
+        await asyncio.sleep(0.05)
+        assert (await client.get(f"/jobs/{job_id}")).json()["status"] == "running"
+        assert (await client.delete(f"/jobs/{job_id}")).status_code == 200
+        await _wait_for(client, job_id, "cancelled")
+
+    _run_with_server(monkeypatch, scenario, delay=5.0)
+
+@pytest.mark.parametrize("body, error", [
+    ({"max_iterations": 1000}, "'max_iterations' must be between 1 and 10"),
+    ({"max_iterations": True}, "'max_iterations' must be of type int"),
+    ({"options": {"editor_candidates": 50}}, "'options.editor_candidates' must be between 1 and 5"),
+    ({"options": {"editor_mode": "full"}}, "'options.editor_mode' must be one of: rewrite, patch"),
+    ({"options": {"local_rules": "no"}}, "'options.local_rules' must be of type bool"),
+    ({"graph": {"fused": [1]}}, "'graph.fused' must be of type bool"),
+    ({"graph": {"stop_policy": {"target_score": {"a": 1}}}}, "'graph.stop_policy.target_score' must be of type float"),
+    ({"user_text": ["a"]}, "'user_text' must be a string"),
+])
+def test_parse_job_request_rejects_bad_values(body, error):
+    with pytest.raises(ValueError) as excinfo:
+        parse_job_request({"task": "t", **body})
+    assert str(excinfo.value) == error
+
+def test_parse_job_request_accepts_numbers_for_floats():
+    request = parse_job_request({"task": "t", "options": {"candidate_temperature": 1},
+                                 "graph": {"stop_policy": {"target_score": None, "max_llm_calls": 8}}})
+    assert request["options"].candidate_temperature == 1
+    hash(request["graph_config"])
@@ -27,7 +27,7 @@ def test_run_text_editor_agent_success():
     }
     mock_app.invoke.return_value = mock_final_state
     
-    with patch("app.service.build_graph", return_value=mock_app):
+    with patch("app.service.get_graph", return_value=mock_app):
         result = run_text_editor_agent("task", "generate", "")
         
         trace = result["trace"]
@@ -59,6 +59,39 @@ def test_run_text_editor_agent_max_iterations():
     }
     mock_app.invoke.return_value = mock_final_state
     
-    with patch("app.service.build_graph", return_value=mock_app):
+    with patch("app.service.get_graph", return_value=mock_app):
         result = run_text_editor_agent("task", "generate", "")
         assert result["stopped_by"] == "max_iterations"
+
+def test_stream_text_editor_agent_event_order(mock_get_llm, mock_llm):
+    import json
+    from langchain_core.messages import AIMessage
+    from app.service import stream_text_editor_agent
+
+    critic_pass = AIMessage(content=json.dumps({
+        "passed": True, "issues": [], "suggestions": [],
+        "style_check": "ok", "clarity_check": "ok", "score": 1.0
+    }))
+    mock_llm.invoke.side_effect = [
+        AIMessage(content="D1"), critic_pass, AIMessage(content="D2"), critic_pass
+    ]
+
+    events = list(stream_text_editor_agent("task", "generate", "", 3))
+    types = [(e["type"], e.get("node")) for e in events]
+
+    assert types[:2] == [("node_start", "writer"), ("node_end", "writer")]
+    assert ("critique", None) in types
+    assert events[-1]["type"] == "result"
+    assert events[-1]["result"]["final_text"] == "D2"
+    assert [e["iteration"] for e in events if e["type"] == "critique"] == [0, 1]
+
+def test_stream_translator_emits_draft_tokens_only():
+    from langchain_core.messages import AIMessageChunk
+    from app.service import _StreamTranslator
+
+    translator = _StreamTranslator()
+    writer_chunk = (AIMessageChunk(content="Hel"), {"langgraph_node": "writer"})
+    critic_chunk = (AIMessageChunk(content='{"passed"'), {"langgraph_node": "critic"})
+
+    assert translator.events("messages", writer_chunk) == [{"type": "token", "node": "writer", "text": "Hel"}]
+    assert translator.events("messages", critic_chunk) == []
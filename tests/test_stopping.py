@@ -0,0 +1,88 @@
+import json
+
+from langchain_core.messages import AIMessage
+
+from app.graph import GraphConfig
+from app.service import run_text_editor_agent
+from app.stopping import FUSED_ITERATION_CALLS, StopPolicy, critic_scores, llm_calls, stop_reason
+
+
+def _critic(score, **extra):
+    return {"step": "critic", "feedback": {"passed": False, "score": score}, **extra}
+
+def _state(iteration, scores, **extra):
+    history = [{"step": "writer", "content": "d"}]
+    for score in scores:
+        history += [_critic(score), {"step": "editor", "content": "d", "iteration": 1}]
+    history.pop()
+    return {
+        "iteration": iteration,
+        "max_iterations": 5,
+        "quality_passed": False,
+        "critique": {"score": scores[-1]},
+        "history": history,
+        **extra,
+    }
+
+def test_history_helpers_skip_calls_that_did_not_happen():
+    history = [
+        {"step": "writer"},
+        _critic(0.0, source="rules", llm_calls=0),
+        {"step": "editor", "llm_calls": 2},
+        _critic(0.7),
+        {"step": "stitch"},
+    ]
+    assert llm_calls(history) == 4
+    assert critic_scores(history) == [0.7]
+
+def test_stop_reason_default_matches_original_rules():
+    assert stop_reason(_state(5, [0.5])) == "max_iterations"
+    assert stop_reason(_state(0, [0.5], quality_passed=True)) is None
+    assert stop_reason(_state(1, [0.5], quality_passed=True)) == "passed"
+    assert stop_reason(_state(1, [0.5])) is None
+
+def test_stop_reason_target_score():
+    policy = StopPolicy(target_score=0.8)
+    assert stop_reason(_state(1, [0.5, 0.85]), policy) == "target_score"
+    assert stop_reason(_state(1, [0.5, 0.75]), policy) is None
+
+def test_stop_reason_plateau():
+    policy = StopPolicy(plateau_epsilon=0.02, plateau_rounds=2)
+    assert stop_reason(_state(2, [0.82, 0.83, 0.83]), policy) == "plateau"
+    assert stop_reason(_state(2, [0.70, 0.83, 0.83]), policy) is None
+    assert stop_reason(_state(1, [0.83, 0.83]), policy) is None
+
+def test_stop_reason_budget():
+    # writer + 2 critics + 1 editor = 4 calls; one more iteration needs 2
+    assert stop_reason(_state(1, [0.5, 0.6]), StopPolicy(max_llm_calls=5)) == "budget"
+    assert stop_reason(_state(1, [0.5, 0.6]), StopPolicy(max_llm_calls=6)) is None
+
+def test_fused_iteration_costs_one_call():
+    assert GraphConfig(fused=True).iteration_calls == FUSED_ITERATION_CALLS == 1
+    assert stop_reason(_state(1, [0.5, 0.6]), StopPolicy(max_llm_calls=5), FUSED_ITERATION_CALLS) is None
+    assert stop_reason(_state(1, [0.5, 0.6]), StopPolicy(max_llm_calls=4), FUSED_ITERATION_CALLS) == "budget"
+
+CRITIC_FAIL = AIMessage(content=json.dumps({
+    "passed": False, "issues": ["bad"], "suggestions": ["fix"],
+    "style_check": "ok", "clarity_check": "ok", "score": 0.5
+}))
+
+def test_skip_terminal_critique_ends_after_last_edit(mock_get_llm, mock_llm):
+    mock_llm.invoke.side_effect = [AIMessage(content="Draft")] + [CRITIC_FAIL, AIMessage(content="Edited")] * 5
+    config = GraphConfig(stop_policy=StopPolicy(skip_terminal_critique=True))
+
+    result = run_text_editor_agent("Test Task", "generate", "", 2, graph_config=config)
+
+    # writer, critic, editor, critic, editor - no review of the final draft
+    assert mock_llm.invoke.call_count == 5
+    assert result["raw_history"][-1]["step"] == "editor"
+    assert result["stopped_by"] == "max_iterations"
+
+def test_plateau_is_reported_as_stop_reason(mock_get_llm, mock_llm):
+    mock_llm.invoke.side_effect = [AIMessage(content="Draft")] + [CRITIC_FAIL, AIMessage(content="Edited")] * 5
+    config = GraphConfig(stop_policy=StopPolicy(plateau_epsilon=0.01, plateau_rounds=1))
+
+    result = run_text_editor_agent("Test Task", "generate", "", 5, graph_config=config)
+
+    assert result["stopped_by"] == "plateau"
+    assert result["iterations"] == 1
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.cache import configure_response_cache
+from app.llm import reset_llm_clients
+from app.service import arun_text_editor_agent, run_text_editor_agent
+from benchmarks.stub_server import StubConfig, start_in_thread
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """
+    Runs the benchmark stub server and points the real LLM clients at it.
+    """
+    server, base_url = start_in_thread(StubConfig(latency=0.0, words=80, pass_pattern="FP"))
+    monkeypatch.setenv("OPENAI_BASE_URL", base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    configure_response_cache(None)
+    reset_llm_clients()
+    yield server
+    reset_llm_clients()
+    server.shutdown()
+
+def test_run_against_stub_server(stub):
+    result = run_text_editor_agent("Write about benchmarks", "generate", "", 3)
+
+    # Writer, failing review, edit, passing review
+    assert [s["step"] for s in result["raw_history"]] == ["writer", "critic", "editor", "critic"]
+    assert result["stopped_by"] == "passed"
+    assert result["metrics"]["nodes"]["writer"]["output_tokens"] > 0
+    assert result["raw_history"][0]["calls"][0]["model"] == "stub-model"
+
+def test_async_runs_against_stub_server(stub):
+    async def run_many():
+        return await asyncio.gather(*(
+            arun_text_editor_agent("Write about benchmarks", "generate", "", 2) for _ in range(4)
+        ))
+
+    results = asyncio.run(run_many())
+
+    assert all(r["final_text"] for r in results)
+
+def test_async_runs_in_separate_event_loops(stub):
+    # Pooled connections belong to the loop that opened them
+    first = asyncio.run(arun_text_editor_agent("Write about benchmarks", "generate", "", 2))
+    second = asyncio.run(arun_text_editor_agent("Write about benchmarks", "generate", "", 2))
+
+    assert first["final_text"] and second["final_text"]
@@ -1,3 +1,4 @@
+import difflib
 import streamlit as st
 import sys
 import os
@@ -5,29 +6,154 @@ import os
 # Ensure app can be imported
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from app.service import run_text_editor_agent
+from app.background import start_run
+from app.graph import get_graph, precompile_graphs
+from app.llm import ROUTED_NODES, get_llm
+
+# Polling interval of the live view while a run is in progress
+REFRESH_SECONDS = 0.5
+# Completed runs kept per browser session
+MAX_RUNS = 10
+
+
+@st.cache_resource
+def shared_resources() -> dict:
+    """
+    Compiled graph and LLM clients, created once per server process and shared by all sessions.
+    """
+    precompile_graphs()
+    resources = {"graph": get_graph(), "llm": {}}
+    try:
+        for node in ROUTED_NODES:
+            resources["llm"][node] = get_llm(json_mode=node == "critic", node=node)
+    except ValueError:
+        # No API key yet: clients are created on the first run instead
+        pass
+    return resources
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def text_diff(before: str, after: str) -> str:
+    return "\n".join(difflib.unified_diff(
+        before.splitlines(), after.splitlines(), "draft", "edited", lineterm=""
+    ))
+
 
 st.set_page_config(page_title="AI Text Editor Agent", layout="wide")
 
+shared_resources()
+
+# Survives reruns triggered by widget interaction
+st.session_state.setdefault("active_run", None)
+st.session_state.setdefault("runs", [])
+
 st.title("📝 AI Text Editor Agent")
 st.markdown("Iterative self-correcting writing assistant.")
 
 # Sidebar Controls
 with st.sidebar:
     st.header("Configuration")
-    
+
     mode = st.radio("Mode", ["generate", "revise"])
-    
+
     max_iterations = st.slider("Max Iterations", min_value=1, max_value=6, value=3)
-    
+
     # Optional parameters (visual only for now as prompt handles them via task description usually,
     # but we can append them to task if we want rigorous usage)
     st.subheader("Style Parameters")
     style = st.selectbox("Style", ["Neutral", "Academic", "Business", "Creative"])
     audience = st.selectbox("Audience", ["General", "Expert", "Student", "Child"])
     length = st.selectbox("Length", ["Medium", "Short", "Long"])
-    
+
     show_trace = st.checkbox("Show Iteration Trace", value=True)
+    show_profile = st.checkbox("Show Profile", value=False)
+
+
+def render_trace(trace: list, key: str):
+    for step in trace:
+        iteration = step.get("iteration", "?")
+        with st.expander(f"Iteration {iteration}"):
+            edited = step.get("edited")
+            cols = st.columns(3 if edited is not None else 2)
+
+            with cols[0]:
+                st.markdown("**Draft / Content**")
+                st.code(step.get("draft", ""), language=None)
+
+            with cols[1]:
+                st.markdown("**Critique**")
+                if step.get("critic") is not None:
+                    st.json(step["critic"])
+                else:
+                    st.info("No critique produced.")
+
+            if edited is not None:
+                with cols[2]:
+                    st.markdown("**Edited Version**")
+                    st.code(edited, language=None)
+                # Expander bodies always execute, so the diff is only computed on request
+                if st.toggle("Show diff", key=f"diff-{key}-{iteration}"):
+                    st.code(text_diff(step.get("draft", ""), edited) or "(no changes)", language="diff")
+
+
+def render_profile(metrics: dict):
+    st.subheader("Profile")
+    cols = st.columns(4)
+    cols[0].metric("Wall time", f"{metrics['wall_ms'] / 1000:.1f} s")
+    cols[1].metric("LLM calls", metrics["llm_calls"])
+    cols[2].metric("Tokens in / out", f"{metrics['input_tokens']} / {metrics['output_tokens']}")
+    cols[3].metric("Retries", metrics["retries"])
+    st.dataframe(
+        [{"node": name, **values} for name, values in metrics["nodes"].items()],
+        use_container_width=True,
+    )
+
+
+def render_result(entry: dict, key: str):
+    result = entry["result"]
+    st.success(f"Completed in {result['iterations']} iterations. Stop reason: {result['stopped_by']}")
+    st.text_area("Final Text", value=result['final_text'], height=300, key=f"final-{key}")
+
+    # Per-node time and token breakdown
+    if show_profile:
+        st.divider()
+        render_profile(result["metrics"])
+
+    if show_trace:
+        st.divider()
+        st.subheader("Process Trace")
+        render_trace(result.get("trace", []), key)
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def live_view():
+    """
+    Re-runs on its own every REFRESH_SECONDS while the agent works in the
+    background; the rest of the page stays interactive.
+    """
+    run = st.session_state.active_run
+    if run is None:
+        return
+    snapshot = run.snapshot()
+    if run.done:
+        # Move the run to the session history and redraw the whole page once
+        st.session_state.active_run = None
+        st.session_state.runs.insert(0, {**run.inputs, **snapshot})
+        del st.session_state.runs[MAX_RUNS:]
+        st.rerun()
+
+    with st.status(f"Agent working... {snapshot['elapsed_s']:.0f}s (up to {run.inputs['max_iterations']} loops)",
+                   expanded=True):
+        if snapshot["node"]:
+            st.markdown(f"**Running {snapshot['node']}**")
+        if snapshot["live_text"] and snapshot["node"] in ("writer", "editor"):
+            st.markdown(snapshot["live_text"])
+        if st.button("Stop"):
+            run.cancel()
+    if show_trace and snapshot["trace"]:
+        st.subheader("Process Trace (so far)")
+        render_trace(snapshot["trace"], f"live-{snapshot['id']}")
+
 
 # Main Input
 task = st.text_area("Task Description", height=100, placeholder="Describe what to write or how to edit...")
@@ -37,7 +163,8 @@ if mode == "revise":
     user_text = st.text_area("Original Text", height=200, placeholder="Paste text here to revise...")
 
 # Run Button
-if st.button("Run Agent", type="primary"):
+busy = st.session_state.active_run is not None
+if st.button("Run Agent", type="primary", disabled=busy):
     if not task:
         st.error("Please enter a task description.")
     elif mode == "revise" and not user_text:
@@ -45,40 +172,23 @@ if st.button("Run Agent", type="primary"):
     else:
         # Augment task with parameters
         augmented_task = f"{task}\nStyle: {style}\nAudience: {audience}\nLength: {length}"
-        
-        with st.spinner(f"Agent working... (up to {max_iterations} loops)"):
-            try:
-                result = run_text_editor_agent(augmented_task, mode, user_text, max_iterations)
-                
-                # Display Result
-                st.subheader("Final Result")
-                st.success(f"Completed in {result['iterations']} iterations. Stop reason: {result['stopped_by']}")
-                st.text_area("Final Text", value=result['final_text'], height=300)
-                
-                # Trace
-                if show_trace:
-                    st.divider()
-                    st.subheader("Process Trace")
-                    for step in result.get("trace", []):
-                        with st.expander(f"Iteration {step.get('iteration', '?')}"):
-                            # We might have 2 or 3 columns depending on if 'edited' exists
-                            cols = st.columns(3 if 'edited' in step else 2)
-                            
-                            with cols[0]:
-                                st.markdown("**Draft / Content**")
-                                st.code(step.get("draft", ""), language=None)
-                            
-                            with cols[1]:
-                                st.markdown("**Critique**")
-                                if 'critic' in step:
-                                    st.json(step['critic'])
-                                else:
-                                    st.info("No critique produced.")
-                            
-                            if 'edited' in step:
-                                with cols[2]:
-                                    st.markdown("**Edited Version**")
-                                    st.code(step['edited'], language=None)
-                                
-            except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
+        st.session_state.active_run = start_run(augmented_task, mode, user_text, max_iterations)
+        st.rerun()
+
+live_view()
+
+for index, entry in enumerate(st.session_state.runs):
+    if index == 0:
+        st.subheader("Final Result")
+        if entry["status"] == "done":
+            render_result(entry, entry["id"])
+        elif entry["status"] == "cancelled":
+            st.warning("Run stopped.")
+        else:
+            st.error(f"An error occurred: {entry['error']}")
+        if st.session_state.runs[1:]:
+            st.divider()
+            st.subheader("Earlier Runs")
+    elif entry["status"] == "done":
+        with st.expander(f"{entry['task'].splitlines()[0][:80]} — {entry['result']['stopped_by']}"):
+            st.text_area("Final Text", value=entry["result"]["final_text"], height=200, key=f"final-{entry['id']}")